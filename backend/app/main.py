@@ -5,101 +5,374 @@ This module defines a FastAPI application that serves
 as the backend for the project.
 """
 
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import hmac
+import logging
+import os
+from fastapi import Depends, FastAPI, Header, Query, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from datetime import datetime
 import pandas as pd
 from .mymodules.utils import *
+from .mymodules.dataset import DATASETS_DIR
+from .mymodules.manager import DatasetManager
+from .mymodules.export import EXPORT_FORMATS, export_chunks
+from .mymodules.metrics import MetricsMiddleware, expose_metrics, span
+from .mymodules.profiler import ProfilerMiddleware
+from .mymodules.projection import parse_fields
+from .mymodules.suggest import SUGGEST_SORTS, suggest
+from .mymodules.workers import (
+    Overloaded,
+    QueryPool,
+    facets_query,
+    search_query
+)
+from .mymodules.serialization import encode_record_lists, encode_records
+from .mymodules.cache import (
+    ConditionalGetMiddleware,
+    ResponseCache,
+    ResponseCacheMiddleware
+)
 
 
-app = FastAPI()
+# Directory of the CSV files of the catalog.
+DATASETS_DIR = os.environ.get('WINES_DATASETS_DIR', DATASETS_DIR)
+# Seconds between two checks of the CSV files for changes
+# (0 disables the watcher).
+WATCH_INTERVAL = float(os.environ.get('WINES_WATCH_INTERVAL', '2'))
+# Serve a sampling profile of the requests carrying an X-Profile header
+# instead of their response (set to 1 to enable).
+PROFILING = os.environ.get('WINES_PROFILING') == '1'
+# Token required by the admin endpoints, in the X-Admin-Token header
+# (unset to disable them).
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# Worker processes running the search queries (0 runs them in threads).
+QUERY_WORKERS = int(os.environ.get('WINES_QUERY_WORKERS', '2'))
+# Search queries admitted at once, running or waiting for a worker;
+# further ones get a 503 with a Retry-After header.
+MAX_PENDING_QUERIES = int(os.environ.get('WINES_MAX_PENDING_QUERIES', '32'))
 
-df_red = pd.read_csv('/app/app/datasets/Red.csv')
-df_rose = pd.read_csv('/app/app/datasets/Rose.csv')
-df_sparkling = pd.read_csv('/app/app/datasets/Sparkling.csv')
-df_white = pd.read_csv('/app/app/datasets/White.csv')
+logger = logging.getLogger(__name__)
 
-df_red["type"] = "red"
-df_rose["type"] = "rose"
-df_sparkling["type"] = "sparkling"
-df_white["type"] = "white"
+response_cache = ResponseCache()
 
-df_wines = pd.concat([df_red, df_rose, df_sparkling, df_white])
-df_wines.columns = map(str.lower, df_wines.columns)
-df_wines['year'] = pd.to_numeric(
-    df_wines['year'],
-    errors='coerce'
-    ).astype('Int64')
+# Cheap endpoints (precomputed lists, completions) run on the event
+# loop; the search queries run in this pool, so that they neither hold
+# the GIL of the server nor pile up without bound.
+query_pool = QueryPool(
+    lambda: datasets.current,
+    DATASETS_DIR,
+    QUERY_WORKERS,
+    MAX_PENDING_QUERIES
+)
+
+
+def prepare_catalog(df_wines):
+    """
+    Build the indexes of a new catalog, then load it into the query
+    workers, before it is swapped in.
+
+    Parameters:
+        df_wines: The new catalog.
+    """
+    build_indexes(df_wines)
+    query_pool.load(df_wines)
+
+
+# Every endpoint reads datasets.current once, so that a request keeps
+# serving the catalog it started with when a reload swaps in a new one.
+datasets = DatasetManager(
+    DATASETS_DIR,
+    prepare=prepare_catalog,
+    listeners=[lambda df_wines: response_cache.clear()]
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    query_pool.start()
+    if WATCH_INTERVAL > 0:
+        datasets.watch(WATCH_INTERVAL)
+    try:
+        yield
+    finally:
+        try:
+            datasets.stop()
+        finally:
+            query_pool.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+CATALOG_PATHS = [
+    '/top-wines',
+    '/most-recent-wines',
+    '/least-recent-wines',
+    '/countries',
+    '/types',
+    '/advanced-search',
+    '/rankings',
+    '/facets',
+    '/suggest',
+]
+
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cache=response_cache,
+    paths=CATALOG_PATHS,
+    version=lambda: datasets.version
+)
+# Exports are streamed, so they get ETags but are never buffered into
+# the response cache.
+app.add_middleware(
+    ConditionalGetMiddleware,
+    paths=CATALOG_PATHS + ['/export'],
+    version=lambda: datasets.version
+)
+
+
+def records_response(df, columns=None):
+    """
+    Build a JSON response of the rows of a DataFrame, encoded straight
+    from its columns.
+
+    Parameters:
+        df: DataFrame to return.
+        columns: (optional) columns to return (default is all).
+    Returns:
+        Response: JSON array of row objects.
+    """
+    return Response(
+        content=encode_records(df, columns),
+        media_type='application/json'
+    )
+
+
+async def result_columns(fields: str = Query(None)):
+    """
+    Parse the fields query parameter of the list endpoints.
+
+    Parameters:
+        fields (optional): Comma separated columns to return, e.g.
+        'name,price' (default is every column).
+
+    Returns:
+        list: Columns to return (None for all).
+    """
+    try:
+        return parse_fields(datasets.current, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @app.get('/top-wines')
-def get_most_rated_wines(limit: int = 10):
+async def get_most_rated_wines(
+    limit: int = 10,
+    columns: list = Depends(result_columns),
+    distinct: bool = False,
+):
     """
     Endpoint to get the best reviewed wines.
 
     Parameters:
         limit:  (optional) an integer representing the
                 max number of wines that has to be returned
+        fields: (optional) comma separated columns to return
+        distinct: (optional) skip the duplicates of a wine
+                (same name, winery and year)
     Returns:
         dict:   top wines sorted by rating (descending)
     """
-    top_wines_dict = top_wines_by_rating(
+    df_wines = datasets.current
+    top_wines = top_wines_by_rating(
         df_wines,
-        limit
-    ).to_dict(orient='records')
-    return JSONResponse(content=top_wines_dict)
+        limit,
+        distinct
+    )
+    return records_response(top_wines, columns)
 
 
 @app.get('/most-recent-wines')
-def get_most_recent_wines(limit: int = 10):
+async def get_most_recent_wines(
+    limit: int = 10,
+    columns: list = Depends(result_columns),
+    distinct: bool = False,
+):
     """
     Endpoint to get the best reviewed wines.
 
     Parameters:
         limit: (optional) an integer representing the
         max number of wines that has to be returned
+        fields: (optional) comma separated columns to return
+        distinct: (optional) skip the duplicates of a wine
+        (same name, winery and year)
     Returns:
         dict: top wines sorted by rating (descending)
     """
+    df_wines = datasets.current
     most_recent_wine = wines_by_recent_year(
         df_wines,
-        limit
-        ).to_dict(orient='records')
-    return JSONResponse(content=most_recent_wine)
+        limit,
+        distinct
+        )
+    return records_response(most_recent_wine, columns)
+
+
+async def run_query(function, *args):
+    """
+    Run a search query in the query pool.
+
+    Parameters:
+        function: Query function, called with the catalog and args.
+        args: Other arguments of the query.
+    Returns:
+        The result of the query.
+    Raises:
+        HTTPException: 503 with a Retry-After header if too many queries
+        are in progress.
+    """
+    try:
+        with span('query_pool'):
+            return await query_pool.run(function, *args)
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+
+def admit_query():
+    """
+    Admit a query run outside of the query pool, e.g. a streamed
+    export, see QueryPool.admit.
+
+    Returns:
+        float: Admission time, to pass to QueryPool.release.
+    Raises:
+        HTTPException: 503 with a Retry-After header if too many queries
+        are in progress.
+    """
+    try:
+        return query_pool.admit()
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+
+def overloaded_error(e):
+    """
+    Build the 503 response of a rejected query.
+
+    Parameters:
+        e: The Overloaded exception.
+    Returns:
+        HTTPException: 503 with a Retry-After header.
+    """
+    return HTTPException(
+        status_code=503,
+        detail="Too many queries in progress, retry later",
+        headers={'Retry-After': str(e.retry_after)}
+    )
+
+
+async def release_when_done(chunks, admitted):
+    """
+    Stream the chunks of an admitted query from the thread pool, and
+    release the query once they are all sent (or the client is gone).
+
+    Parameters:
+        chunks: Iterator of the chunks.
+        admitted: Admission time of the query, see admit_query.
+    Yields:
+        bytes: The chunks.
+    """
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        query_pool.release(admitted)
 
 
 @app.get('/countries')
-def get_countries():
+async def get_countries():
+    df_wines = datasets.current
     countries = countries_df(df_wines)
     return JSONResponse(content=countries)
 
 
 @app.get('/types')
-def get_types():
+async def get_types():
+    df_wines = datasets.current
     types = types_df(df_wines)
     return JSONResponse(content=types)
 
 
 @app.get('/least-recent-wines')
-def get_least_recent_year(limit: int = 10):
+async def get_least_recent_year(
+    limit: int = 10,
+    columns: list = Depends(result_columns),
+    distinct: bool = False,
+):
     """
     Endpoint to get the best reviewed wines.
 
     Parameters:
         limit: (optional) an integer representing
         the max number of wines that has to be returned
+        fields: (optional) comma separated columns to return
+        distinct: (optional) skip the duplicates of a wine
+        (same name, winery and year)
     Returns:
         dict: top wines sorted by rating (descending)
     """
+    df_wines = datasets.current
     least_recent_wines = wines_by_least_recent_year(
         df_wines,
-        limit
-        ).to_dict(orient='records')
-    return JSONResponse(content=least_recent_wines)
+        limit,
+        distinct
+        )
+    return records_response(least_recent_wines, columns)
 
 
-@app.get('/advanced-search')
-def advanced_search_wines(
+@app.get('/rankings')
+async def get_rankings(
+    lists: str = 'top,recent,oldest',
+    limit: int = 10,
+    columns: list = Depends(result_columns),
+    distinct: bool = False,
+):
+    """
+    Endpoint to get several wine rankings in one call.
+
+    Parameters:
+        lists: (optional) comma separated names of the rankings among
+        'top' (by rating), 'recent' and 'oldest' (by year)
+        limit: (optional) an integer representing the
+        max number of wines per ranking
+        fields: (optional) comma separated columns to return
+        distinct: (optional) skip the duplicates of a wine
+        (same name, winery and year)
+    Returns:
+        dict: wines of every requested ranking, keyed by its name
+    """
+    df_wines = datasets.current
+    names = [name.strip() for name in lists.split(',') if name.strip()]
+    unknown = [name for name in names if name not in RANKINGS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown rankings: {', '.join(unknown)}"
+        )
+
+    return Response(
+        content=encode_record_lists(
+            df_wines,
+            ranking_positions(df_wines, names, limit, distinct),
+            columns
+        ),
+        media_type='application/json'
+    )
+
+
+async def search_filters(
     name: str = Query(None),
     type: str = Query(None),
     country: str = Query(None),
@@ -113,13 +386,14 @@ def advanced_search_wines(
     price_end: float = Query(None),
     year_start: int = Query(None),
     year_end: int = Query(None),
-    limit: int = Query(10),
 ):
     """
-    Endpoint for advanced search of wines.
+    Build the filters of the search endpoints from their query
+    parameters.
 
     Parameters:
-        category (optional): Wine category.
+        name (optional): Wine name.
+        type (optional): Wine type.
         country (optional): Wine country.
         region (optional): Wine region.
         winery (optional): Wine winery.
@@ -127,12 +401,11 @@ def advanced_search_wines(
         num_ratings (optional): Number of ratings for the wine.
         price (optional): Wine price.
         year (optional): Wine year.
-        limit (optional): Max number of wines to return.
 
     Returns:
-        dict: Wines matching the specified criteria.
+        dict: Filters, as accepted by filter_wines.
     """
-    filters = {
+    return {
         "name": name,
         "type": type,
         "country": country,
@@ -152,18 +425,308 @@ def advanced_search_wines(
         ) if year_start and year_end else None,
     }
 
-    result = filter_wines(
-        df_wines,
-        filters
-    ).head(limit).to_dict(orient='records')
 
-    print("RESULT", result)
+@app.get('/advanced-search')
+async def advanced_search_wines(
+    filters: dict = Depends(search_filters),
+    limit: int = Query(10),
+    q: str = Query(None),
+    sort: str = Query(None),
+    order: str = Query('desc'),
+    cursor: str = Query(None),
+    columns: list = Depends(result_columns),
+    distinct: bool = Query(False),
+):
+    """
+    Endpoint for advanced search of wines.
+
+    Parameters:
+        filters: Search criteria, see search_filters.
+        limit (optional): Max number of wines to return.
+        q (optional): Words to search in the name, winery and region,
+        ignoring case and accents and tolerating typos; the wines are
+        then ranked by relevance.
+        sort (optional): Column to sort by: rating, price, year or
+        numberofratings (default is the dataset order).
+        order (optional): asc or desc (default is desc).
+        cursor (optional): Cursor of the previous page, from the
+        X-Next-Cursor header of its response.
+        fields (optional): Comma separated columns to return (default
+        is every column).
+        distinct (optional): Skip the duplicates of a wine (same name,
+        winery and year).
+
+    Returns:
+        dict: Wines matching the specified criteria. When paging (sort
+        or cursor given), the X-Next-Cursor response header holds the
+        cursor of the next page, if any.
+    """
+    if q is not None:
+        if sort is not None or cursor is not None:
+            raise HTTPException(
+                status_code=400,
+                detail="q can't be combined with sort or cursor"
+            )
+        if limit < 0:
+            raise HTTPException(
+                status_code=422,
+                detail="limit can't be negative with q"
+            )
+    elif (sort is not None or cursor is not None) and limit < 1:
+        raise HTTPException(
+            status_code=422,
+            detail="limit must be positive when paging"
+        )
+
+    try:
+        content, next_cursor = await run_query(
+            search_query,
+            filters,
+            limit,
+            q,
+            sort,
+            order,
+            cursor,
+            columns,
+            distinct
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = Response(content=content, media_type='application/json')
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+@app.get('/facets')
+async def get_facets(filters: dict = Depends(search_filters)):
+    """
+    Endpoint to count the wines matching the search criteria per
+    country, type, region, price bucket and year bucket.
+
+    Each facet ignores its own criterion, so its counts tell how many
+    wines every alternative value would return.
+
+    Parameters:
+        filters: Search criteria, see search_filters.
+
+    Returns:
+        dict: total number of matching wines, and value -> count for
+        every facet.
+    """
+    return JSONResponse(content=await run_query(facets_query, filters))
+
+
+@app.get('/suggest')
+async def get_suggestions(
+    q: str = Query(''),
+    limit: int = Query(10),
+    sort: str = Query('numberofratings'),
+):
+    """
+    Endpoint completing the beginning of a wine name, winery or region,
+    for typeahead.
+
+    Parameters:
+        q: What was typed so far, from the beginning of any word
+        (case and accents are ignored).
+        limit (optional): Max number of completions (default is 10).
+        sort (optional): numberofratings (most rated wines first,
+        default) or rating (best rated wines first).
 
-    return JSONResponse(content=result)
+    Returns:
+        list: Completions, best first, with their text, column (name,
+        winery or region), number of wines, best rating and total
+        number of ratings.
+    """
+    df_wines = datasets.current
+    if sort not in SUGGEST_SORTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown sort: {sort}"
+        )
+    return JSONResponse(content=suggest(df_wines, q, limit, sort))
+
+
+@app.get('/export')
+async def export_wines(
+    filters: dict = Depends(search_filters),
+    format: str = Query('ndjson'),
+    columns: list = Depends(result_columns),
+    distinct: bool = Query(False),
+):
+    """
+    Endpoint to export every wine matching the search criteria.
+
+    Rows are streamed in chunks as the catalog is scanned, so the
+    response starts right away and memory stays bounded whatever the
+    size of the result. Exports count as queries in progress, see
+    run_query.
+
+    Parameters:
+        filters: Search criteria, see search_filters.
+        format (optional): ndjson (one JSON object per line, default)
+        or csv.
+        fields (optional): Comma separated columns to export (default
+        is every column).
+        distinct (optional): Skip the duplicates of a wine (same name,
+        winery and year).
+
+    Returns:
+        StreamingResponse: Wines matching the specified criteria.
+    """
+    df_wines = datasets.current
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown export format: {format}"
+        )
+
+    return StreamingResponse(
+        release_when_done(
+            export_chunks(
+                df_wines,
+                filters,
+                format,
+                columns=columns,
+                distinct=distinct
+            ),
+            admit_query()
+        ),
+        media_type=EXPORT_FORMATS[format],
+        headers={
+            'Content-Disposition': f'attachment; filename="wines.{format}"'
+        }
+    )
+
+
+@app.get('/metrics')
+async def get_metrics():
+    """
+    Endpoint exposing the metrics of the backend in the Prometheus
+    text format: request and helper span latency histograms, response
+    and query cache counters, query pool load and the size of the
+    catalog.
+
+    Returns:
+        Response: Prometheus text exposition.
+    """
+    stats = response_cache.stats()
+    samples = [
+        ('wines_response_cache_hits_total', 'counter',
+         'Responses served from the cache.', stats['hits']),
+        ('wines_response_cache_misses_total', 'counter',
+         'Cache lookups that missed.', stats['misses']),
+        ('wines_response_cache_evictions_total', 'counter',
+         'Responses evicted from the cache.', stats['evictions']),
+        ('wines_response_cache_entries', 'gauge',
+         'Responses in the cache.', stats['entries']),
+        ('wines_response_cache_bytes', 'gauge',
+         'Size of the cached responses.', stats['bytes']),
+        ('wines_catalog_rows', 'gauge',
+         'Wines in the catalog being served.', len(datasets.current)),
+        ('wines_query_pool_pending', 'gauge',
+         'Search queries admitted and not finished.', query_pool.pending),
+        ('wines_query_pool_rejected_total', 'counter',
+         'Search queries rejected with a 503.', query_pool.rejected),
+    ]
+    stats = query_pool.query_cache_stats()
+    samples += [
+        ('wines_query_cache_hits_total', 'counter',
+         'Filter results served from the query cache.', stats['hits']),
+        ('wines_query_cache_refinements_total', 'counter',
+         'Filter results refined from a cached broader query.',
+         stats['refinements']),
+        ('wines_query_cache_misses_total', 'counter',
+         'Filter results evaluated on the whole catalog.', stats['misses']),
+        ('wines_query_cache_evictions_total', 'counter',
+         'Filter results evicted from the query cache.', stats['evictions']),
+        ('wines_query_cache_entries', 'gauge',
+         'Filter results in the query cache.', stats['entries']),
+        ('wines_query_cache_bytes', 'gauge',
+         'Size of the cached filter results.', stats['bytes']),
+    ]
+    return Response(
+        content=expose_metrics(samples),
+        media_type='text/plain; version=0.0.4'
+    )
+
+
+@app.get('/cache-stats')
+async def get_cache_stats():
+    """
+    Endpoint to get the response cache counters.
+
+    Returns:
+        dict: hits, misses, evictions, entries and bytes of the response
+        cache, and the counters of the query result cache under
+        'query_cache'.
+    """
+    stats = response_cache.stats()
+    stats['query_cache'] = query_pool.query_cache_stats()
+    return JSONResponse(content=stats)
+
+
+async def check_admin_token(x_admin_token: str = Header(None)):
+    """
+    Check the admin token of a request. The admin endpoints don't
+    exist while ADMIN_TOKEN is unset.
+
+    Parameters:
+        x_admin_token: Value of the X-Admin-Token header.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(
+        (x_admin_token or '').encode(),
+        ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get('/admin/version', dependencies=[Depends(check_admin_token)])
+async def get_dataset_version():
+    """
+    Endpoint to get the version of the wine catalog being served.
+
+    Returns:
+        dict: version, number of rows and load time of the catalog.
+    """
+    return JSONResponse(content=datasets.info())
+
+
+@app.post('/admin/reload', dependencies=[Depends(check_admin_token)])
+def reload_dataset(force: bool = False):
+    """
+    Endpoint to reload the wine catalog from the CSV files.
+
+    The new catalog and its indexes are built while the current one
+    keeps being served, then swapped in; requests in flight finish on
+    the catalog they started with. The query workers load it before
+    the swap; other server processes pick the change up through their
+    own watcher.
+
+    Parameters:
+        force (optional): Reload even if the files did not change.
+
+    Returns:
+        dict: Whether the catalog was reloaded, and its current
+        version, number of rows and load time.
+    """
+    try:
+        reloaded = datasets.reload(force)
+    except Exception:
+        logger.exception("Failed to reload the wine catalog")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Reload failed, still serving {datasets.version}"
+        )
+    return JSONResponse(content={"reloaded": reloaded, **datasets.info()})
 
 
 @app.get('/')
-def read_root():
+async def read_root():
     """
     Root endpoint for the backend.
 
@@ -177,3 +740,13 @@ def read_root():
     }
 
     return JSONResponse(content=info)
+
+
+# Outermost middlewares, added once every route is known: time every
+# request (cache hits included) and, if enabled, profile on demand.
+app.add_middleware(
+    MetricsMiddleware,
+    paths=[route.path for route in app.routes]
+)
+if PROFILING:
+    app.add_middleware(ProfilerMiddleware)
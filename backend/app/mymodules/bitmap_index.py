@@ -0,0 +1,244 @@
+import numpy as np
+
+
+# Number of set bits of every byte value
+POPCOUNT = np.array(
+    [bin(byte).count('1') for byte in range(256)],
+    dtype=np.uint8
+)
+
+
+def empty_bitmap(n_rows):
+    """
+    Get a bitmap of n_rows bits, all clear.
+
+    Bitmaps are packed in little-endian uint64 words: row i is bit
+    i % 64 of word i // 64.
+
+    Parameters:
+        - n_rows (int): Number of rows.
+
+    Returns:
+        - np.ndarray: The words of the bitmap.
+    """
+    return np.zeros((n_rows + 63) // 64, dtype='<u8')
+
+
+def bitmap_from_mask(mask):
+    """
+    Pack a boolean row mask into a bitmap.
+
+    Parameters:
+        - mask (np.ndarray): True for the rows to set.
+
+    Returns:
+        - np.ndarray: The words of the bitmap.
+    """
+    words = empty_bitmap(len(mask))
+    packed = np.packbits(mask, bitorder='little')
+    words.view(np.uint8)[:len(packed)] = packed
+    return words
+
+
+def set_bits(words, positions):
+    """
+    Set the bits of row positions in a bitmap, in place.
+
+    Few positions are sorted and merged word by word; many (over 1 row
+    in 16) go through a boolean mask of the rows, which costs no sort.
+
+    Parameters:
+        - words (np.ndarray): Words of the bitmap.
+        - positions (np.ndarray): Row positions (unique, any order).
+
+    Returns:
+        - np.ndarray: words.
+    """
+    if len(positions) == 0:
+        return words
+    if len(positions) * 16 >= len(words) * 64:
+        mask = np.zeros(len(words) * 64, dtype=bool)
+        mask[positions] = True
+        words |= np.packbits(mask, bitorder='little').view('<u8')
+        return words
+
+    positions = np.sort(positions).astype(np.int64)
+    word = positions >> 6
+    bits = np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64))
+    starts = np.flatnonzero(np.r_[True, word[1:] != word[:-1]])
+    words[word[starts]] |= np.bitwise_or.reduceat(bits, starts)
+    return words
+
+
+def bits_at(words, positions):
+    """
+    Check which row positions are set in a bitmap.
+
+    Parameters:
+        - words (np.ndarray): Words of the bitmap.
+        - positions (np.ndarray): Row positions to check.
+
+    Returns:
+        - np.ndarray: True for the positions whose bit is set.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    shifts = (positions & 63).astype(np.uint64)
+    return (words[positions >> 6] >> shifts) & np.uint64(1) == 1
+
+
+def bitmap_positions(words, n_rows, start=0, stop=None):
+    """
+    Get the row positions set in a bitmap.
+
+    Parameters:
+        - words (np.ndarray): Words of the bitmap.
+        - n_rows (int): Number of rows.
+        - start (int): First row position to consider (default is 0).
+        - stop (int): Row position to stop before (default is n_rows).
+
+    Returns:
+        - np.ndarray: Positions of the set rows, in order.
+    """
+    stop = n_rows if stop is None else stop
+    if start >= stop:
+        return np.empty(0, dtype=np.intp)
+    first = start // 64
+    bits = np.unpackbits(
+        words[first:(stop + 63) // 64].view(np.uint8),
+        bitorder='little'
+    )
+    offset = first * 64
+    return np.flatnonzero(bits[start - offset:stop - offset]) + start
+
+
+def popcount(words):
+    """
+    Count the set bits of a bitmap.
+
+    Parameters:
+        - words (np.ndarray): Words of the bitmap.
+
+    Returns:
+        - int: Number of set rows.
+    """
+    return int(POPCOUNT[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """
+    Bitmap index of a dictionary-encoded column: the rows of every
+    category code, combined with bitwise operations.
+
+    Like the containers of a roaring bitmap, every value gets the
+    smaller of two representations: a packed bitmap of the catalog
+    for values on more than 1 row in 32, sorted row positions for the
+    others. The index thus costs at most 4 bytes per row for the
+    positions, plus n_rows / 8 bytes for each of the (at most 32)
+    frequent values.
+
+    Attributes:
+        n_rows (int): Number of rows.
+        codes (np.ndarray): Category code of every row.
+        counts (np.ndarray): Number of rows of every code.
+        offsets (np.ndarray): Rows of code c are
+        positions[offsets[c]:offsets[c + 1]].
+        positions (np.ndarray): Row positions, grouped by code.
+        is_dense (np.ndarray): True for the codes of frequent values.
+        dense (dict): Code -> bitmap of the frequent values.
+    """
+
+    def __init__(self, codes, n_categories):
+        """
+        Build the index.
+
+        Parameters:
+            - codes (np.ndarray): Category code of every row, -1 for
+            missing values.
+            - n_categories (int): Number of categories of the column.
+        """
+        self.n_rows = len(codes)
+        self.codes = codes
+        order = np.argsort(codes, kind='stable')
+        missing = int(np.count_nonzero(codes < 0))
+        self.counts = np.bincount(codes[codes >= 0], minlength=n_categories)
+        self.offsets = np.r_[0, np.cumsum(self.counts)]
+        self.positions = order[missing:].astype(np.int32)
+        self.is_dense = self.counts * 32 > self.n_rows
+        self.dense = {
+            int(code): set_bits(empty_bitmap(self.n_rows), self.rows(code))
+            for code in np.flatnonzero(self.is_dense)
+        }
+
+    def rows(self, code):
+        """
+        Get the row positions of a code, in order.
+        """
+        return self.positions[self.offsets[code]:self.offsets[code + 1]]
+
+    def select(self, codes):
+        """
+        Get the row positions of any of several codes.
+
+        Parameters:
+            - codes (np.ndarray): Distinct category codes.
+
+        Returns:
+            - np.ndarray: Row positions, in order.
+        """
+        codes = np.asarray(codes, dtype=np.intp)
+        if len(codes) == 1:
+            return self.rows(codes[0]).astype(np.intp)
+        if self.counts[codes].sum() * 16 >= self.n_rows:
+            lookup = np.zeros(len(self.counts) + 1, dtype=bool)
+            lookup[codes] = True
+            return np.flatnonzero(lookup[self.codes])
+        return np.sort(self._gather(codes)).astype(np.intp)
+
+    def bitmap(self, codes):
+        """
+        Get the bitmap of the rows of any of several codes.
+
+        Frequent values are OR-ed word by word; the rows of the others
+        are gathered, or when they are many, selected with a single
+        pass over the codes.
+
+        Parameters:
+            - codes (np.ndarray): Distinct category codes.
+
+        Returns:
+            - np.ndarray: Words of the bitmap.
+        """
+        codes = np.asarray(codes, dtype=np.intp)
+        words = empty_bitmap(self.n_rows)
+        for code in codes[self.is_dense[codes]]:
+            words |= self.dense[int(code)]
+        sparse = codes[~self.is_dense[codes]]
+        if self.counts[sparse].sum() * 16 >= self.n_rows:
+            # The extra last slot is hit by the -1 code of missing values.
+            lookup = np.zeros(len(self.counts) + 1, dtype=bool)
+            lookup[sparse] = True
+            words |= bitmap_from_mask(lookup[self.codes])
+        elif len(sparse):
+            set_bits(words, self._gather(sparse))
+        return words
+
+    def _gather(self, codes):
+        """
+        Get the row positions of several codes, grouped by code.
+        """
+        lengths = self.counts[codes]
+        firsts = np.cumsum(lengths) - lengths
+        within = np.arange(lengths.sum()) - np.repeat(firsts, lengths)
+        return self.positions[np.repeat(self.offsets[codes], lengths) + within]
+
+    def count(self, codes):
+        """
+        Count the rows of any of several codes.
+
+        Parameters:
+            - codes (np.ndarray): Distinct category codes.
+
+        Returns:
+            - int: Number of rows.
+        """
+        return int(self.counts[np.asarray(codes, dtype=np.intp)].sum())
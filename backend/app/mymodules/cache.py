@@ -0,0 +1,299 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+
+
+class ResponseCache:
+    """
+    Bounded in-memory cache of encoded responses, with LRU eviction
+    and a time-to-live.
+
+    Attributes:
+        max_entries (int): Max number of cached responses.
+        max_bytes (int): Max total size of the cached bodies.
+        ttl (float): Seconds after which an entry expires.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups not found (or expired).
+        evictions (int): Number of entries dropped to make room.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 2 ** 20, ttl=300,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Parameters:
+            - key: Cache key of the response.
+
+        Returns:
+            - The cached value, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, size):
+        """
+        Cache a response, evicting the least recently used ones if
+        the cache is full.
+
+        Parameters:
+            - key: Cache key of the response.
+            - value: The response to cache.
+            - size (int): Size of the response body in bytes.
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self.clock() + self.ttl, value, size)
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries or
+                self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached response, e.g. when the dataset is reloaded.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            - dict: hits, misses, evictions, entries and bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+
+def normalize_query(query_string):
+    """
+    Normalize a raw query string into a hashable cache key part,
+    independent of the order of the parameters.
+
+    Parameters:
+        - query_string (bytes): Raw query string of the request.
+
+    Returns:
+        - tuple: Sorted (name, value) pairs.
+    """
+    return tuple(sorted(parse_qsl(
+        query_string.decode('latin-1'),
+        keep_blank_values=True
+    )))
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware answering GET requests on the given paths from a
+    ResponseCache.
+
+    Successful responses are cached as sent (headers and body bytes),
+    keyed by dataset version, path and normalized query parameters,
+    so a reloaded dataset never serves responses of the previous one.
+    Requests with a 'Cache-Control: no-cache' header skip the lookup
+    (their response still refreshes the cache).
+    """
+
+    def __init__(self, app, cache, paths, version):
+        """
+        Parameters:
+            - app: The ASGI application to wrap.
+            - cache (ResponseCache): Cache to use.
+            - paths (iterable): Paths whose responses are cached.
+            - version (callable): Returns the current dataset version.
+        """
+        self.app = app
+        self.cache = cache
+        self.paths = frozenset(paths)
+        self.version = version
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http' or
+            scope['method'] != 'GET' or
+            scope['path'] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = (
+            self.version(),
+            scope['path'],
+            normalize_query(scope['query_string'])
+        )
+        cached = None
+        if (b'cache-control', b'no-cache') not in scope['headers']:
+            cached = self.cache.get(key)
+        if cached is not None:
+            headers, body = cached
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': headers,
+            })
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if start['status'] == 200 and not message.get('more_body'):
+                    body = b''.join(chunks)
+                    headers = list(start.get('headers', []))
+                    self.cache.put(key, (headers, body), len(body))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+
+def make_etag(version, path, query_string):
+    """
+    Build the strong ETag of a catalog response.
+
+    The catalog only changes with the dataset, so the response to a
+    request is identified by the dataset version and the request itself.
+
+    Parameters:
+        - version (str): Current dataset version.
+        - path (str): Path of the request.
+        - query_string (bytes): Raw query string of the request.
+
+    Returns:
+        - str: Quoted ETag value.
+    """
+    digest = hashlib.sha256(
+        repr((path, normalize_query(query_string))).encode()
+    ).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+
+    Parameters:
+        - if_none_match (str): Value of the If-None-Match header.
+        - etag (str): Current ETag of the resource.
+
+    Returns:
+        - bool: True if the client's copy is current.
+    """
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (
+        tag[2:] if tag.startswith('W/') else tag for tag in candidates
+    )
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware adding ETag and Cache-Control headers to GET
+    responses on the given paths, and answering If-None-Match requests
+    for an unchanged resource with 304 Not Modified without running the
+    endpoint.
+    """
+
+    def __init__(self, app, paths, version, max_age=60):
+        """
+        Parameters:
+            - app: The ASGI application to wrap.
+            - paths (iterable): Paths the ETags apply to.
+            - version (callable): Returns the current dataset version.
+            - max_age (int): Seconds clients may reuse a response
+            before revalidating it (default is 60).
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+        self.version = version
+        self.cache_control = f'public, max-age={max_age}'.encode()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http' or
+            scope['method'] != 'GET' or
+            scope['path'] not in self.paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        etag = make_etag(
+            self.version(),
+            scope['path'],
+            scope['query_string']
+        )
+        validators = [
+            (b'etag', etag.encode()),
+            (b'cache-control', self.cache_control),
+        ]
+
+        for name, value in scope['headers']:
+            if name == b'if-none-match' and etag_matches(
+                value.decode('latin-1'),
+                etag
+            ):
+                await send({
+                    'type': 'http.response.start',
+                    'status': 304,
+                    'headers': validators,
+                })
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+
+        async def add_validators(message):
+            if (
+                message['type'] == 'http.response.start' and
+                message['status'] == 200
+            ):
+                message = dict(message)
+                message['headers'] = list(message.get('headers', [])) + (
+                    validators
+                )
+            await send(message)
+
+        await self.app(scope, receive, add_validators)
@@ -0,0 +1,230 @@
+import glob
+import hashlib
+import os
+import shutil
+import pandas as pd
+from .encoding import CATEGORY_COLUMNS, encode_category
+from .snapshot import SNAPSHOT_FORMAT, read_snapshot, write_snapshot
+
+
+DATASETS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'datasets'
+)
+
+SNAPSHOT_DIR = os.path.join(DATASETS_DIR, '.snapshot')
+
+WINE_FILES = {
+    "red": "Red.csv",
+    "rose": "Rose.csv",
+    "sparkling": "Sparkling.csv",
+    "white": "White.csv",
+}
+
+
+def read_wines(datasets_dir=DATASETS_DIR):
+    """
+    Read the per-type CSV files into a single DataFrame.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+
+    Returns:
+        - pd.DataFrame: All wines, with lowercase column names,
+        a 'type' column and nullable integer years.
+    """
+    frames = []
+    for wine_type, file_name in WINE_FILES.items():
+        df = pd.read_csv(os.path.join(datasets_dir, file_name))
+        df["type"] = wine_type
+        frames.append(df)
+
+    df_wines = pd.concat(frames)
+    df_wines.columns = map(str.lower, df_wines.columns)
+    df_wines['year'] = pd.to_numeric(
+        df_wines['year'],
+        errors='coerce'
+        ).astype('Int64')
+    return df_wines
+
+
+def dataset_version(datasets_dir=DATASETS_DIR):
+    """
+    Compute the version of the CSV files: a checksum of their content.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+
+    Returns:
+        - str: Hex digest identifying the current content of the files.
+    """
+    digest = hashlib.sha256(f"format {SNAPSHOT_FORMAT}".encode())
+    for wine_type, file_name in WINE_FILES.items():
+        digest.update(wine_type.encode())
+        with open(os.path.join(datasets_dir, file_name), 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def parse_wines(datasets_dir=DATASETS_DIR):
+    """
+    Parse the wine catalog from the CSV files, with the type, country,
+    region and winery columns dictionary-encoded as categoricals.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+
+    Returns:
+        - pd.DataFrame: DataFrame containing wine information.
+    """
+    df_wines = read_wines(datasets_dir)
+    for column in CATEGORY_COLUMNS:
+        df_wines[column] = encode_category(df_wines[column])
+    return df_wines
+
+
+def load_wines(datasets_dir=DATASETS_DIR, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Load the wine catalog, from its columnar snapshot when it is up to
+    date with the CSV files.
+
+    Otherwise the CSV files are parsed and a new snapshot is written for
+    the next start (stale snapshots are removed). A snapshot that can't
+    be written, e.g. on a read-only filesystem, is silently skipped.
+
+    Snapshot columns are memory-mapped read-only: every worker process
+    loading the same snapshot shares one copy of the numeric and
+    categorical columns through the page cache.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+        - snapshot_dir (str): Directory of the snapshots (None to always
+        parse the CSV files).
+
+    Returns:
+        - pd.DataFrame: DataFrame containing wine information. Its
+        attrs['version'] identifies the content of the CSV files.
+    """
+    version = dataset_version(datasets_dir)
+    if snapshot_dir is None:
+        df_wines = parse_wines(datasets_dir)
+        df_wines.attrs['version'] = version
+        return df_wines
+
+    path = os.path.join(snapshot_dir, version)
+    try:
+        return read_snapshot(path)
+    except (OSError, ValueError, KeyError):
+        pass
+
+    df_wines = parse_wines(datasets_dir)
+    df_wines.attrs['version'] = version
+    try:
+        # Another worker may have written the snapshot while we parsed:
+        # map its copy, so that every worker shares the same pages.
+        df_snapshot = read_or_discard_snapshot(path)
+        if df_snapshot is not None:
+            return df_snapshot
+        write_snapshot(df_wines, path)
+        for stale in glob.glob(os.path.join(snapshot_dir, '*')):
+            if stale != path:
+                shutil.rmtree(stale, ignore_errors=True)
+        # Serve the mapped snapshot rather than the parsed frame, so that
+        # workers that had to parse the CSVs share the same pages too.
+        return read_snapshot(path)
+    except (OSError, ValueError, KeyError):
+        return df_wines
+
+
+def read_or_discard_snapshot(path):
+    """
+    Read a snapshot, removing it if it exists but can't be read.
+
+    A readable snapshot is never replaced: workers that mapped it keep
+    sharing its pages with the ones that will.
+
+    Parameters:
+        - path (str): Directory of the snapshot.
+
+    Returns:
+        - pd.DataFrame: The snapshot, or None if there was none to read.
+    """
+    try:
+        return read_snapshot(path)
+    except (OSError, ValueError, KeyError):
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+        return None
+
+
+def load_catalog(datasets_dir=DATASETS_DIR):
+    """
+    Load the wine catalog of a directory, keeping its snapshots in a
+    .snapshot directory next to the CSV files.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+
+    Returns:
+        - pd.DataFrame: See load_wines.
+    """
+    return load_wines(datasets_dir, catalog_snapshot_dir(datasets_dir))
+
+
+def load_catalog_version(datasets_dir, version):
+    """
+    Load a given version of the catalog of a directory: from its
+    snapshot, or from the CSV files if they still have that version.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+        - version (str): Version of the catalog, see dataset_version.
+
+    Returns:
+        - pd.DataFrame: See load_wines.
+
+    Raises:
+        - ValueError: If neither has that version anymore.
+    """
+    try:
+        return read_snapshot(
+            os.path.join(catalog_snapshot_dir(datasets_dir), version)
+        )
+    except (OSError, ValueError, KeyError):
+        pass
+    df_wines = load_catalog(datasets_dir)
+    if df_wines.attrs.get('version') != version:
+        raise ValueError(f"Version {version} of the catalog is gone")
+    return df_wines
+
+
+def catalog_snapshot_dir(datasets_dir):
+    """
+    Get the directory of the snapshots of the catalog of a directory.
+    """
+    return os.path.join(datasets_dir, '.snapshot')
+
+
+def build_snapshot(datasets_dir=DATASETS_DIR, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Compile the CSV files into a columnar snapshot, unless a readable
+    one of the same version is already there.
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+        - snapshot_dir (str): Directory of the snapshots.
+
+    Returns:
+        - str: Path of the written snapshot.
+    """
+    version = dataset_version(datasets_dir)
+    path = os.path.join(snapshot_dir, version)
+    if read_or_discard_snapshot(path) is None:
+        df_wines = parse_wines(datasets_dir)
+        df_wines.attrs['version'] = version
+        write_snapshot(df_wines, path)
+    return path
+
+
+if __name__ == '__main__':
+    print(build_snapshot())
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from .indexes import derived_index
+
+
+CATEGORY_COLUMNS = ('type', 'country', 'region', 'winery')
+
+
+def encode_category(series):
+    """
+    Dictionary-encode a text column as a pandas Categorical.
+
+    Categories are kept in order of first appearance, so that the
+    category dictionary lists values the same way Series.unique does.
+
+    Parameters:
+        - series (pd.Series): Text column to encode.
+
+    Returns:
+        - pd.Series: Categorical column with integer codes.
+    """
+    return series.astype(
+        pd.CategoricalDtype(categories=series.dropna().unique())
+    )
+
+
+def is_categorical(series):
+    """
+    Check whether a column is dictionary-encoded.
+
+    Parameters:
+        - series (pd.Series): Column to check.
+
+    Returns:
+        - bool: True if the column is a pandas Categorical.
+    """
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def category_values(df, column):
+    """
+    Get the distinct values of a column, in order of first appearance.
+
+    Dictionary-encoded columns are served from their category
+    dictionary without scanning the rows.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - list: Distinct values of the column, as strings.
+    """
+    series = df[column]
+    if is_categorical(series):
+        return [str(value) for value in series.cat.categories]
+    return series.astype(str).unique().tolist()
+
+
+def category_codes(df, column):
+    """
+    Get the integer codes of a dictionary-encoded column
+    (cached per DataFrame).
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of a categorical column.
+
+    Returns:
+        - np.ndarray: Category code of every row, -1 for missing values.
+    """
+    return derived_index(
+        df,
+        'codes:' + column,
+        lambda df: df[column].cat.codes.to_numpy()
+    )
+
+
+def rows_with_codes(codes, n_categories, matching, candidates=None):
+    """
+    Select the rows whose code is one of the matching codes.
+
+    Parameters:
+        - codes (np.ndarray): Category code of every row.
+        - n_categories (int): Number of categories of the column.
+        - matching (np.ndarray): Codes to keep.
+        - candidates (np.ndarray): Row positions to check (None for all).
+
+    Returns:
+        - np.ndarray: Positions of the selected rows, in order.
+    """
+    # The extra last slot is hit by the -1 code of missing values.
+    lookup = np.zeros(n_categories + 1, dtype=bool)
+    lookup[matching] = True
+    if candidates is None:
+        return np.flatnonzero(lookup[codes])
+    return candidates[lookup[codes[candidates]]]
@@ -0,0 +1,67 @@
+from .query import query_positions
+from .serialization import encode_rows
+
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_BLOCK_ROWS = 4096
+
+
+def export_chunks(df_wines, filters, format="ndjson",
+                  block_rows=EXPORT_BLOCK_ROWS, columns=None,
+                  distinct=False):
+    """
+    Generate the wines matching filters as NDJSON or CSV text, chunk
+    by chunk.
+
+    The catalog is scanned block_rows rows at a time and the matches
+    of each block are encoded and yielded before the next block is
+    scanned, so memory stays bounded by the block size and the first
+    chunk is produced before the scan finishes.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+        - format (str): 'ndjson' (one JSON object per line) or 'csv'
+        (with a header line).
+        - block_rows (int): Number of rows scanned per chunk.
+        - columns (list): Columns to export, in order (default is all).
+        - distinct (bool): Skip the duplicates of a wine, see
+        build_distinct_rows (default is every row).
+
+    Yields:
+        - bytes: UTF-8 encoded chunk of rows.
+
+    Raises:
+        - ValueError: If the format is unknown.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+
+    if columns is None:
+        columns = list(df_wines.columns)
+    column_positions = df_wines.columns.get_indexer(columns)
+
+    if format == "csv":
+        header = df_wines.iloc[:0, column_positions]
+        yield header.to_csv(index=False).encode('utf-8')
+
+    for start in range(0, len(df_wines), block_rows):
+        positions = query_positions(
+            df_wines,
+            filters,
+            start=start,
+            stop=start + block_rows,
+            distinct=distinct
+        )
+        if len(positions) == 0:
+            continue
+
+        rows = df_wines.iloc[positions, column_positions]
+        if format == "csv":
+            yield rows.to_csv(index=False, header=False).encode('utf-8')
+        else:
+            yield ('\n'.join(encode_rows(rows)) + '\n').encode('utf-8')
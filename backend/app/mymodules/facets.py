@@ -0,0 +1,152 @@
+import numpy as np
+from .encoding import category_codes, is_categorical
+from .indexes import derived_index
+from .metrics import timed
+from .query import numeric_values, query_count, query_positions
+
+
+CATEGORY_FACETS = ('country', 'type', 'region')
+FACETS = CATEGORY_FACETS + ('price', 'year')
+
+# Lower bounds of the price buckets; the last bucket is open-ended.
+PRICE_BUCKETS = (0, 10, 20, 30, 50, 100, 200, 500)
+PRICE_LABELS = ['0-10', '10-20', '20-30', '30-50', '50-100', '100-200',
+                '200-500', '500+']
+
+# Lower bounds of the year buckets after 'before 2000'; non-vintage
+# wines get the last bucket.
+YEAR_BUCKETS = (2000, 2005, 2010, 2015, 2020)
+YEAR_LABELS = ['before 2000', '2000-2004', '2005-2009', '2010-2014',
+               '2015-2019', '2020+', 'N.V.']
+
+
+def build_facet_codes(df_wines):
+    """
+    Compute the facet value of every row: category codes for the
+    categorical facets and bucket numbers for price and year.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: Facet name -> (value of every row, labels of the
+        values). Rows without a value get len(labels).
+    """
+    facets = {}
+    for column in CATEGORY_FACETS:
+        if is_categorical(df_wines[column]):
+            codes = category_codes(df_wines, column)
+            labels = [str(value) for value in df_wines[column].cat.categories]
+        else:
+            codes, uniques = df_wines[column].factorize()
+            labels = [str(value) for value in uniques]
+        facets[column] = (
+            np.where(codes < 0, len(labels), codes).astype(np.intp),
+            labels
+        )
+
+    price = numeric_values(df_wines, 'price')
+    price_codes = np.searchsorted(PRICE_BUCKETS, price, side='right') - 1
+    price_codes[np.isnan(price) | (price_codes < 0)] = len(PRICE_LABELS)
+    facets['price'] = (price_codes, PRICE_LABELS)
+
+    year = numeric_values(df_wines, 'year')
+    year_codes = np.searchsorted(YEAR_BUCKETS, year, side='right')
+    year_codes[np.isnan(year)] = len(YEAR_LABELS) - 1
+    facets['year'] = (year_codes, YEAR_LABELS)
+    return facets
+
+
+def facet_codes(df_wines):
+    """
+    Get the (cached) facet values of every row, see build_facet_codes.
+    """
+    return derived_index(df_wines, 'facet-codes', build_facet_codes)
+
+
+def count_facet(df_wines, facet, positions=None):
+    """
+    Count the rows per value of a facet, without materializing them.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - facet (str): Name of the facet.
+        - positions (np.ndarray): Rows to count (None for all).
+
+    Returns:
+        - np.ndarray: Count of every value, in the order of the labels.
+    """
+    codes, labels = facet_codes(df_wines)[facet]
+    if positions is not None:
+        codes = codes[positions]
+    return np.bincount(codes, minlength=len(labels) + 1)[:len(labels)]
+
+
+def catalog_facets(df_wines):
+    """
+    Get the (cached) facet counts of the whole catalog, computed once
+    per catalog (see build_indexes).
+
+    Returns:
+        - dict: Facet name -> counts of its values.
+    """
+    return derived_index(
+        df_wines,
+        'facets',
+        lambda df: {facet: count_facet(df, facet) for facet in FACETS}
+    )
+
+
+@timed('wine_facets')
+def wine_facets(df_wines, filters):
+    """
+    Count the wines matching filters per country, type, region, price
+    bucket and year bucket.
+
+    Each facet is counted over the wines matching every filter but its
+    own (e.g. country counts ignore the country filter), so the counts
+    tell how many wines each alternative value would return. Counts are
+    bincounts over the matching positions; facets without any other
+    filter use the counts precomputed for the catalog. The total is
+    counted on the bitmap indexes when only categorical filters are
+    set.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+
+    Returns:
+        - dict: 'total' (number of wines matching every filter) and, per
+        facet, value -> count in catalog order. Categorical values
+        without a match are left out; every bucket is listed.
+    """
+    active = {column: value for column, value in filters.items() if value}
+    matches = {}
+
+    def positions_without(column):
+        """
+        Positions of the rows matching every filter but column's
+        (None for all rows), evaluated once per distinct filter set.
+        """
+        key = tuple(sorted(c for c in active if c != column))
+        if key not in matches:
+            matches[key] = query_positions(
+                df_wines,
+                {c: active[c] for c in key}
+            ) if key else None
+        return matches[key]
+
+    facets = {'total': query_count(df_wines, active)}
+    for facet in FACETS:
+        positions = positions_without(facet)
+        if positions is None:
+            counts = catalog_facets(df_wines)[facet]
+        else:
+            counts = count_facet(df_wines, facet, positions)
+        labels = facet_codes(df_wines)[facet][1]
+        facets[facet] = {
+            label: int(count)
+            for label, count in zip(labels, counts)
+            if count or facet not in CATEGORY_FACETS
+        }
+    return facets
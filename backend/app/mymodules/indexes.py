@@ -0,0 +1,209 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+
+_derived = {}
+_derived_lock = threading.RLock()
+
+
+def derived_index(df, name, builder):
+    """
+    Get a structure derived from a DataFrame, building it on first use.
+
+    Derived structures are cached per DataFrame object: a new DataFrame
+    (e.g. a reloaded catalog) gets its own structures, built on first
+    use. Updating a DataFrame in place does not rebuild them; call
+    invalidate_indexes after such an update.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame the structure is derived from
+        (any weak-referenceable object works, e.g. a categorical's
+        categories).
+        - name (str): Name of the derived structure.
+        - builder (callable): Function building the structure from df.
+
+    Returns:
+        - The cached (or freshly built) structure.
+    """
+    key = id(df)
+    with _derived_lock:
+        entry = _derived.get(key)
+        if entry is None or entry[0]() is not df:
+            entry = (
+                weakref.ref(df, lambda _, key=key: _derived.pop(key, None)),
+                {},
+            )
+            _derived[key] = entry
+        structures = entry[1]
+        if name not in structures:
+            structures[name] = builder(df)
+        return structures[name]
+
+
+def invalidate_indexes(df):
+    """
+    Drop the structures derived from a DataFrame, so that they are
+    rebuilt from its current content on next use.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame that was updated in place.
+    """
+    with _derived_lock:
+        _derived.pop(id(df), None)
+
+
+def column_values(df, column):
+    """
+    Get a numeric column as a float64 NumPy array, with NaN for missing
+    or non-numeric values (e.g. 'N.V.' years).
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - np.ndarray: Column values as float64.
+    """
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(
+        dtype='float64',
+        na_value=np.nan
+    )
+
+
+def _order(values, descending):
+    """
+    Stable argsort of values, missing values last.
+    """
+    return np.argsort(-values if descending else values, kind='stable')
+
+
+def build_sort_index(df_wines):
+    """
+    Build the positional sort orders used by the ranking endpoints.
+
+    Wines without a rating are ranked last; non-vintage wines (missing
+    or 'N.V.' year) are left out of the year orders.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: Row positions keyed by 'rating_desc', 'year_desc'
+        and 'year_asc'.
+    """
+    rating = column_values(df_wines, 'rating')
+    year = column_values(df_wines, 'year')
+    vintage = np.flatnonzero(~np.isnan(year))
+
+    return {
+        'rating_desc': _order(rating, descending=True),
+        'year_desc': vintage[_order(year[vintage], descending=True)],
+        'year_asc': vintage[_order(year[vintage], descending=False)],
+    }
+
+
+def sort_index(df_wines):
+    """
+    Get the (cached) sort orders of a wine DataFrame.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: See build_sort_index.
+    """
+    return derived_index(df_wines, 'sort', build_sort_index)
+
+
+def build_keyset_order(df_wines, column, descending):
+    """
+    Build the sort order of a numeric column for keyset pagination.
+
+    Rows are sorted by value, ties broken by row position; missing
+    values come last.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the sort column.
+        - descending (bool): Sort from the highest value.
+
+    Returns:
+        - dict: 'order' (row positions in sort order), 'keys' (sort key
+        of every rank: the value, negated when descending), 'ranks'
+        (rank of every row position) and 'sorted' (number of ranks
+        with a value).
+    """
+    values = column_values(df_wines, column)
+    order = _order(values, descending)
+    keys = (-values if descending else values)[order]
+    ranks = np.empty(len(order), dtype=np.intp)
+    ranks[order] = np.arange(len(order))
+    return {
+        'order': order,
+        'keys': keys,
+        'ranks': ranks,
+        'sorted': int(np.count_nonzero(~np.isnan(keys))),
+    }
+
+
+def keyset_order(df_wines, column, descending):
+    """
+    Get the (cached) keyset sort order of a column.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the sort column.
+        - descending (bool): Sort from the highest value.
+
+    Returns:
+        - dict: See build_keyset_order.
+    """
+    return derived_index(
+        df_wines,
+        f"keyset:{column}:{'desc' if descending else 'asc'}",
+        lambda df: build_keyset_order(df, column, descending)
+    )
+
+
+def build_range_index(df_wines, column):
+    """
+    Build the sorted index of a numeric column used to answer range
+    predicates by binary search.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the numeric column.
+
+    Returns:
+        - dict: 'values' (column values, NaN for missing ones),
+        'order' (positions of the rows with a value, sorted by value)
+        and 'sorted' (their values, ascending).
+    """
+    values = column_values(df_wines, column)
+    present = np.flatnonzero(~np.isnan(values))
+    order = present[np.argsort(values[present], kind='stable')]
+    return {
+        'values': values,
+        'order': order,
+        'sorted': values[order],
+    }
+
+
+def range_index(df_wines, column):
+    """
+    Get the (cached) range index of a numeric column.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the numeric column.
+
+    Returns:
+        - dict: See build_range_index.
+    """
+    return derived_index(
+        df_wines,
+        'range:' + column,
+        lambda df: build_range_index(df, column)
+    )
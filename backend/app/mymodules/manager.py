@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from .dataset import DATASETS_DIR, WINE_FILES, dataset_version, load_catalog
+
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetManager:
+    """
+    Holder of the current wine catalog, able to reload it from the CSV
+    files while the application keeps serving requests.
+
+    A reload loads and prepares (e.g. indexes) the new catalog aside,
+    then swaps it in with a single assignment. Requests read the
+    current catalog once and keep using it until they finish, so a
+    reload never changes the data under a request in flight.
+
+    Attributes:
+        current (pd.DataFrame): The catalog being served.
+        loaded_at (float): Time (epoch seconds) the catalog was loaded.
+        datasets_dir (str): Directory containing the CSV files.
+    """
+
+    def __init__(self, datasets_dir=DATASETS_DIR, loader=load_catalog,
+                 prepare=None, listeners=()):
+        """
+        Parameters:
+            - datasets_dir (str): Directory containing the CSV files.
+            - loader (callable): Loads the catalog from datasets_dir.
+            - prepare (callable): Called with a new catalog before it is
+            swapped in, e.g. to build its indexes (default is none).
+            - listeners (iterable): Called with the new catalog right
+            after each swap, e.g. to clear caches.
+        """
+        self.datasets_dir = datasets_dir
+        self.loader = loader
+        self.prepare = prepare
+        self.listeners = list(listeners)
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._signature = self._files_signature()
+        self._swap(self._load())
+
+    @property
+    def version(self):
+        """
+        str: Version of the catalog being served.
+        """
+        return self.current.attrs.get('version')
+
+    def info(self):
+        """
+        Describe the catalog being served.
+
+        Returns:
+            - dict: version, rows and loaded_at of the catalog.
+        """
+        current = self.current
+        return {
+            "version": current.attrs.get('version'),
+            "rows": len(current),
+            "loaded_at": self.loaded_at,
+        }
+
+    def reload(self, force=False):
+        """
+        Reload the catalog if the CSV files changed since it was loaded.
+
+        Concurrent reloads are serialized; the catalog being served is
+        left untouched if loading the new one fails.
+
+        Parameters:
+            - force (bool): Reload even if the files did not change.
+
+        Returns:
+            - bool: True if a new catalog was swapped in.
+        """
+        with self._reload_lock:
+            signature = self._files_signature()
+            if not force and (
+                dataset_version(self.datasets_dir) == self.version
+            ):
+                self._signature = signature
+                return False
+            self._swap(self._load())
+            # Only recorded on success, so the watcher retries a reload
+            # that failed on e.g. a half-written file.
+            self._signature = signature
+            logger.info("Wine catalog reloaded, version %s", self.version)
+            return True
+
+    def watch(self, interval=2.0):
+        """
+        Start a background thread reloading the catalog whenever the
+        CSV files change (checked every interval seconds).
+
+        Parameters:
+            - interval (float): Seconds between two checks.
+        """
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch,
+            args=(interval,),
+            name="dataset-watcher",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop(self):
+        """
+        Stop the watcher thread, if any.
+        """
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if self._files_signature() != self._signature:
+                    self.reload()
+            except Exception:
+                logger.exception("Failed to reload the wine catalog")
+
+    def _load(self):
+        df_wines = self.loader(self.datasets_dir)
+        if self.prepare is not None:
+            self.prepare(df_wines)
+        return df_wines
+
+    def _swap(self, df_wines):
+        self.current = df_wines
+        self.loaded_at = time.time()
+        for listener in self.listeners:
+            listener(df_wines)
+
+    def _files_signature(self):
+        """
+        Cheap fingerprint (size and modification time) of the CSV files,
+        checked by the watcher before computing their version.
+        """
+        signature = []
+        for file_name in WINE_FILES.values():
+            try:
+                stat = os.stat(os.path.join(self.datasets_dir, file_name))
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
@@ -0,0 +1,286 @@
+import contextvars
+import functools
+from contextlib import contextmanager
+import sys
+import threading
+import time
+from bisect import bisect_left
+from .profiler import request_profiler
+
+
+# Upper bounds (seconds) of the latency histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0)
+
+# Spans of the request being served: list of (name, seconds), or None
+# outside of a request.
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets, one series per label set.
+    """
+
+    def __init__(self, name, help, labels, buckets=BUCKETS):
+        """
+        Parameters:
+            - name (str): Metric name.
+            - help (str): Metric description.
+            - labels (tuple): Names of the labels of the series.
+            - buckets (tuple): Increasing upper bounds of the buckets.
+        """
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record one observation.
+
+        Parameters:
+            - value (float): Observed value, in seconds.
+            - label_values: Values of the labels, in order.
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def expose(self):
+        """
+        Render the histogram in the Prometheus text format.
+
+        Returns:
+            - list: Lines of the exposition.
+        """
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted(
+                (values, counts[:], total)
+                for values, (counts, total) in self._series.items()
+            )
+        for values, counts, total in series:
+            labels = ','.join(
+                f'{name}="{escape_label(value)}"'
+                for name, value in zip(self.labels, values)
+            )
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+def escape_label(value):
+    """
+    Escape a label value for the Prometheus text format.
+    """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+REQUEST_SECONDS = Histogram(
+    'wines_request_duration_seconds',
+    'Time spent serving HTTP requests.',
+    ('method', 'path', 'status')
+)
+
+SPAN_SECONDS = Histogram(
+    'wines_span_duration_seconds',
+    'Time spent in instrumented helpers.',
+    ('span',)
+)
+
+
+class span:
+    """
+    Context manager timing a named section of code.
+
+    The duration is recorded in the span histogram, and in the spans
+    of the current request, reported in its Server-Timing header. When
+    the request is profiled, the code of the span is sampled.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profiler = request_profiler()
+        if self.profiler is not None:
+            self.marker = self.profiler.enter(sys._getframe(1))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.leave(self.marker)
+        SPAN_SECONDS.observe(elapsed, self.name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.name, elapsed))
+
+
+def timed(name):
+    """
+    Decorator running every call of a function in a span.
+
+    Parameters:
+        - name (str): Name of the span.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def collect_spans():
+    """
+    Collect the spans of a section of code run on behalf of a request
+    but away from it, e.g. in a worker process, to be passed back to
+    record_spans.
+
+    Yields:
+        - list: (name, seconds) of the spans, filled in as they end.
+    """
+    spans = []
+    token = _request_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _request_spans.reset(token)
+
+
+def record_spans(spans):
+    """
+    Record spans collected with collect_spans, in the span histogram
+    and in the spans of the current request.
+
+    Parameters:
+        - spans (list): (name, seconds) pairs.
+    """
+    current = _request_spans.get()
+    for name, elapsed in spans:
+        SPAN_SECONDS.observe(elapsed, name)
+        if current is not None:
+            current.append((name, elapsed))
+
+
+def server_timing(spans, total):
+    """
+    Build a Server-Timing header value from the spans of a request.
+
+    Spans of the same name are summed.
+
+    Parameters:
+        - spans (list): (name, seconds) pairs.
+        - total (float): Duration of the whole request, in seconds.
+
+    Returns:
+        - str: Header value, durations in milliseconds.
+    """
+    durations = {}
+    for name, elapsed in spans:
+        durations[name] = durations.get(name, 0.0) + elapsed
+    durations['total'] = total
+    return ', '.join(
+        f'{name.replace(".", "-")};dur={elapsed * 1000:.3f}'
+        for name, elapsed in durations.items()
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request into the request
+    histogram, and reporting the spans of the request in a
+    Server-Timing response header.
+    """
+
+    def __init__(self, app, paths):
+        """
+        Parameters:
+            - app: The ASGI application to wrap.
+            - paths (iterable): Paths reported as is; any other path is
+            reported as 'other', to bound the number of series.
+        """
+        self.app = app
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path'] if scope['path'] in self.paths else 'other'
+        spans = []
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        status = 500
+
+        async def add_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message = dict(message)
+                message['headers'] = list(message.get('headers', [])) + [(
+                    b'server-timing',
+                    server_timing(
+                        spans,
+                        time.perf_counter() - start
+                    ).encode('latin-1')
+                )]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, add_timing)
+        finally:
+            _request_spans.reset(token)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope['method'],
+                path,
+                str(status)
+            )
+
+
+def expose_metrics(samples=()):
+    """
+    Render every metric in the Prometheus text format.
+
+    Parameters:
+        - samples (iterable): Extra (name, type, help, value) metrics
+        without labels, type being 'counter' or 'gauge'.
+
+    Returns:
+        - str: The exposition, one sample per line.
+    """
+    lines = REQUEST_SECONDS.expose() + SPAN_SECONDS.expose()
+    for name, kind, help, value in samples:
+        lines += [
+            f'# HELP {name} {help}',
+            f'# TYPE {name} {kind}',
+            f'{name} {value}',
+        ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,80 @@
+from collections import defaultdict
+import numpy as np
+
+
+def ngrams(text, n=3):
+    """
+    Get the set of distinct n-grams of a string.
+
+    Parameters:
+        - text (str): The string to split.
+        - n (int): Length of the n-grams (default is 3).
+
+    Returns:
+        - set: The n-grams of text (empty if text is shorter than n).
+    """
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """
+    Inverted n-gram index over a lower-cased text column.
+
+    Maps every n-gram to the sorted positions of the rows containing it,
+    so a substring search only has to verify the rows sharing all the
+    n-grams of the searched string.
+
+    Attributes:
+        n (int): Length of the indexed n-grams.
+        postings (dict): n-gram -> np.ndarray of row positions.
+    """
+
+    def __init__(self, texts, n=3):
+        """
+        Build the index.
+
+        Parameters:
+            - texts (iterable): Lower-cased text of every row, in order.
+            - n (int): Length of the indexed n-grams (default is 3).
+        """
+        postings = defaultdict(list)
+        for position, text in enumerate(texts):
+            for gram in ngrams(text, n):
+                postings[gram].append(position)
+
+        self.n = n
+        self.postings = {
+            gram: np.array(positions, dtype=np.int32)
+            for gram, positions in postings.items()
+        }
+
+    def candidates(self, needle):
+        """
+        Get the rows that may contain a (lower-cased) substring.
+
+        Parameters:
+            - needle (str): The lower-cased substring to search for.
+
+        Returns:
+            - np.ndarray or None: Sorted positions of the rows containing
+            every n-gram of needle, or None when needle is too short
+            to be looked up and all rows are candidates.
+        """
+        grams = ngrams(needle, self.n)
+        if not grams:
+            return None
+
+        lists = []
+        for gram in grams:
+            positions = self.postings.get(gram)
+            if positions is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(positions)
+
+        lists.sort(key=len)
+        result = lists[0]
+        for positions in lists[1:]:
+            result = np.intersect1d(result, positions, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+import math
+import numpy as np
+from .indexes import keyset_order
+from .metrics import timed
+from .query import compile_filters, numeric_values, query_positions
+
+
+SORT_COLUMNS = ('rating', 'price', 'year', 'numberofratings')
+SORT_ORDERS = ('asc', 'desc')
+
+
+def encode_cursor(sort, order, key, position):
+    """
+    Encode the position of the last row of a page as an opaque cursor.
+
+    Parameters:
+        - sort (str): Sort column (None for dataset order).
+        - order (str): 'asc' or 'desc'.
+        - key (float): Sort value of the last row (None if missing).
+        - position (int): Row position of the last row.
+
+    Returns:
+        - str: URL-safe cursor.
+    """
+    payload = json.dumps(
+        [sort, order, key, position],
+        separators=(',', ':')
+    ).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor built by encode_cursor.
+
+    Parameters:
+        - cursor (str): Cursor received from a client.
+
+    Returns:
+        - tuple: (sort, order, key, position).
+
+    Raises:
+        - ValueError: If the cursor is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort, order, key, position = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+    if (
+        (sort is not None and sort not in SORT_COLUMNS) or
+        order not in SORT_ORDERS or
+        not (key is None or isinstance(key, (int, float))) or
+        not isinstance(position, int) or
+        position < 0
+    ):
+        raise ValueError("Invalid cursor")
+    return sort, order, key, position
+
+
+def keyset_start(keyset, key, position):
+    """
+    Find the rank following a row in a keyset sort order, by binary
+    search on its (sort key, row position).
+
+    Parameters:
+        - keyset (dict): Sort order, as built by build_keyset_order.
+        - key (float): Sort key of the row (None if missing).
+        - position (int): Row position of the row.
+
+    Returns:
+        - int: First rank after the row.
+    """
+    keys = keyset['keys']
+    valid = keyset['sorted']
+    if key is None or math.isnan(key):
+        low, high = valid, len(keys)
+    else:
+        low = int(np.searchsorted(keys[:valid], key, side='left'))
+        high = int(np.searchsorted(keys[:valid], key, side='right'))
+
+    # Rows of equal key are sorted by position (stable sort).
+    ties = keyset['order'][low:high]
+    return low + int(np.searchsorted(ties, position, side='right'))
+
+
+@timed('page_positions')
+def page_positions(df_wines, filters, limit, sort=None, order='desc',
+                   cursor=None, distinct=False):
+    """
+    Get one page of the wines matching filters, resuming after a cursor.
+
+    Pages follow the order of a numeric column (ties by row position,
+    missing values last) or, without a sort column, the dataset order.
+    The cursor holds the sort key and position of the last row of the
+    previous page; the next page is found by binary search on the sort
+    order, so a deep page costs the same as the first one.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+        - limit (int): Number of wines per page (positive).
+        - sort (str): Sort column among SORT_COLUMNS (default is the
+        dataset order).
+        - order (str): 'asc' or 'desc' (default is 'desc').
+        - cursor (str): Cursor of the previous page (None for the first).
+        - distinct (bool): Skip the duplicates of a wine, see
+        build_distinct_rows (default is every row).
+
+    Returns:
+        - tuple: (positions of the rows of the page, cursor of the next
+        page or None after the last page).
+
+    Raises:
+        - ValueError: If the cursor is malformed or was built for
+        another sort.
+    """
+    if sort is not None and sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column: {sort}")
+    if order not in SORT_ORDERS:
+        raise ValueError(f"Unknown sort order: {order}")
+
+    after = None
+    if cursor is not None:
+        cursor_sort, cursor_order, key, after = decode_cursor(cursor)
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise ValueError("Cursor was built for another sort")
+
+    if sort is None:
+        start = 0 if after is None else after + 1
+        positions = query_positions(
+            df_wines,
+            filters,
+            limit + 1,
+            start,
+            distinct=distinct
+        )
+    else:
+        descending = order == 'desc'
+        keyset = keyset_order(df_wines, sort, descending)
+        start = 0
+        if after is not None:
+            if descending and key is not None:
+                key = -key
+            start = keyset_start(keyset, key, after)
+        if distinct or compile_filters(df_wines, filters):
+            ranks = keyset['ranks'][
+                query_positions(df_wines, filters, distinct=distinct)
+            ]
+            ranks = ranks[ranks >= start]
+            if len(ranks) > limit + 1:
+                ranks = np.partition(ranks, limit)[:limit + 1]
+            ranks.sort()
+        else:
+            ranks = np.arange(start, min(start + limit + 1, len(df_wines)))
+        positions = keyset['order'][ranks]
+
+    if len(positions) <= limit:
+        return positions, None
+
+    positions = positions[:limit]
+    last = int(positions[-1])
+    key = None
+    if sort is not None:
+        value = numeric_values(df_wines, sort)[last]
+        key = None if math.isnan(value) else float(value)
+    return positions, encode_cursor(sort, order, key, last)
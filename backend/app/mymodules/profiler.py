@@ -0,0 +1,205 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# Profiler of the request being served, or None if it isn't profiled.
+_request_profiler = contextvars.ContextVar('request_profiler', default=None)
+
+
+def request_profiler():
+    """
+    Get the profiler of the request being served.
+
+    Returns:
+        - SamplingProfiler: The profiler, or None if the request isn't
+        profiled.
+    """
+    return _request_profiler.get()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the Python stacks of the threads
+    serving a request at a fixed interval, from a background thread.
+
+    The code serving the request marks the frames it runs in (the
+    profiler middleware and every span do). A thread is only sampled
+    while one of its marked frames is on its stack, so idle threads
+    (e.g. the dataset watcher) and other requests sharing a thread
+    (e.g. on the event loop) are left out.
+
+    Attributes:
+        interval (float): Seconds between two samples.
+        samples (Counter): Folded stack -> number of samples.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._frames = {}
+        self._frames_lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Start sampling.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample,
+            name='sampling-profiler',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling.
+        """
+        self._stop.set()
+        self._thread.join()
+
+    def enter(self, frame):
+        """
+        Mark a frame of the current thread as serving the request.
+
+        Parameters:
+            - frame (frame): The frame to mark.
+
+        Returns:
+            - tuple: Marker of the frame, to pass to leave.
+        """
+        marker = (threading.get_ident(), frame)
+        with self._frames_lock:
+            self._frames.setdefault(marker[0], []).append(frame)
+        return marker
+
+    def leave(self, marker):
+        """
+        Unmark a frame marked with enter.
+
+        Parameters:
+            - marker (tuple): The marker returned by enter.
+        """
+        thread_id, frame = marker
+        with self._frames_lock:
+            frames = self._frames[thread_id]
+            frames.remove(frame)
+            if not frames:
+                del self._frames[thread_id]
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            with self._frames_lock:
+                marked = {
+                    thread_id: list(frames)
+                    for thread_id, frames in self._frames.items()
+                }
+            current = sys._current_frames()
+            for thread_id, frames in marked.items():
+                frame = current.get(thread_id)
+                stack = []
+                serving = False
+                while frame is not None:
+                    serving = serving or any(frame is f for f in frames)
+                    code = frame.f_code
+                    stack.append(
+                        f'{code.co_name} '
+                        f'({os.path.basename(code.co_filename)}'
+                        f':{code.co_firstlineno})'
+                    )
+                    frame = frame.f_back
+                if serving:
+                    self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        """
+        Render the samples as folded stacks, the input format of
+        flame graph tools (e.g. flamegraph.pl, speedscope, inferno).
+
+        Returns:
+            - str: One 'frame;frame;... count' line per distinct stack.
+        """
+        return ''.join(
+            f'{stack} {count}\n'
+            for stack, count in self.samples.most_common()
+        )
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling single requests on demand.
+
+    A request carrying the X-Profile header is served as usual, bypassing
+    the response cache and conditional GET, but its response body is
+    replaced by the folded stacks sampled while it ran. Other requests
+    are passed through untouched.
+    """
+
+    def __init__(self, app, interval=0.001):
+        """
+        Parameters:
+            - app: The ASGI application to wrap.
+            - interval (float): Seconds between two samples.
+        """
+        self.app = app
+        self.interval = interval
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not any(
+            name == b'x-profile' for name, _ in scope['headers']
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        scope = dict(scope)
+        scope['headers'] = [
+            (name, value) for name, value in scope['headers']
+            if name not in (b'if-none-match', b'cache-control')
+        ] + [(b'cache-control', b'no-cache')]
+
+        status = None
+
+        async def discard(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        start = time.perf_counter()
+        with SamplingProfiler(self.interval) as profiler:
+            token = _request_profiler.set(profiler)
+            marker = profiler.enter(sys._getframe())
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.leave(marker)
+                _request_profiler.reset(token)
+        elapsed = time.perf_counter() - start
+
+        body = profiler.folded().encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/plain; charset=utf-8'),
+                (b'content-length', str(len(body)).encode()),
+                (b'x-profile-status', str(status).encode()),
+                (b'x-profile-duration', f'{elapsed * 1000:.3f}'.encode()),
+                (b'x-profile-samples', str(
+                    sum(profiler.samples.values())
+                ).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
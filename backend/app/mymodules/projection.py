@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from .encoding import category_codes, is_categorical
+from .indexes import column_values, derived_index, sort_index
+
+
+# Columns identifying a wine: rows sharing them are duplicates (e.g.
+# the same wine listed in two of the per-type CSV files).
+DISTINCT_COLUMNS = ('name', 'winery', 'year')
+
+
+def parse_fields(df_wines, fields):
+    """
+    Parse the comma separated columns a client asked for.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - fields (str): Comma separated column names (None for all).
+
+    Returns:
+        - list: Columns to return, in the requested order (None for all).
+
+    Raises:
+        - ValueError: If a column is unknown.
+    """
+    if fields is None:
+        return None
+    columns = list(dict.fromkeys(
+        field.strip() for field in fields.split(',') if field.strip()
+    ))
+    unknown = [column for column in columns if column not in df_wines.columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return columns or None
+
+
+def column_keys(df_wines, column):
+    """
+    Get an integer key per row of a column, equal for equal values
+    (missing values included).
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - tuple: (key of every row, number of distinct keys).
+    """
+    series = df_wines[column]
+    if is_categorical(series):
+        n_keys = len(series.cat.categories) + 1
+        return category_codes(df_wines, column) + 1, n_keys
+    if series.dtype == object:
+        codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+        return codes + 1, len(uniques) + 1
+    _, codes = np.unique(
+        column_values(df_wines, column),
+        return_inverse=True
+    )
+    return codes, int(codes.max(initial=-1)) + 1
+
+
+def build_distinct_rows(df_wines):
+    """
+    Find the first occurrence of every wine, keyed on DISTINCT_COLUMNS.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: 'mask' (True for the first row of every wine) and
+        'positions' (their positions, in dataset order).
+    """
+    key = np.zeros(len(df_wines), dtype=np.int64)
+    for column in DISTINCT_COLUMNS:
+        codes, n_keys = column_keys(df_wines, column)
+        key = key * n_keys + codes
+        # Re-number the combined keys so they can't overflow
+        _, key = np.unique(key, return_inverse=True)
+
+    _, first = np.unique(key, return_index=True)
+    positions = np.sort(first)
+    mask = np.zeros(len(df_wines), dtype=bool)
+    mask[positions] = True
+    return {'mask': mask, 'positions': positions}
+
+
+def distinct_rows(df_wines):
+    """
+    Get the (cached) first occurrences of every wine, see
+    build_distinct_rows.
+    """
+    return derived_index(df_wines, 'distinct', build_distinct_rows)
+
+
+def distinct_sort_index(df_wines):
+    """
+    Get the (cached) sort orders of the ranking endpoints without the
+    duplicate wines.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: See build_sort_index.
+    """
+    def build(df):
+        mask = distinct_rows(df)['mask']
+        return {
+            name: order[mask[order]]
+            for name, order in sort_index(df).items()
+        }
+    return derived_index(df_wines, 'sort-distinct', build)
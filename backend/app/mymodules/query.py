@@ -0,0 +1,776 @@
+import numpy as np
+import pandas as pd
+from .bitmap_index import BitmapIndex, bitmap_from_mask, bitmap_positions
+from .bitmap_index import popcount
+from .encoding import CATEGORY_COLUMNS, category_codes, is_categorical
+from .encoding import rows_with_codes
+from .indexes import derived_index, range_index
+from .metrics import timed
+from .ngram_index import NgramIndex
+from .projection import distinct_rows
+from .result_cache import QueryResultCache, filter_key, residual_predicates
+from .search_index import SearchIndex, top_k
+
+
+RANGE_COLUMNS = ('year', 'price', 'numberofratings', 'rating')
+NGRAM_COLUMNS = ('name', 'winery', 'region')
+
+# Columns of the full-text search, with their weight in the score
+SEARCH_FIELDS = {'name': 2.0, 'winery': 1.0, 'region': 0.5}
+
+
+def text_values(df, column):
+    """
+    Get a text column, lower-cased, as a NumPy object array
+    (cached per DataFrame).
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - np.ndarray: Lower-cased column values, with missing values as ''.
+    """
+    return derived_index(
+        df,
+        'text:' + column,
+        lambda df: lower_values(df[column])
+    )
+
+
+def category_texts(df, column):
+    """
+    Get the category dictionary of a categorical column, lower-cased
+    (cached per DataFrame).
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of a categorical column.
+
+    Returns:
+        - np.ndarray: Lower-cased category of every code.
+    """
+    return derived_index(
+        df,
+        'category-text:' + column,
+        lambda df: lower_values(df[column].cat.categories.to_series())
+    )
+
+
+def lower_values(series):
+    """
+    Lower-case a text Series into a NumPy object array, with missing
+    values as ''.
+    """
+    return series.astype(object).fillna('').astype(str).str.lower(
+        ).to_numpy(dtype=object)
+
+
+def ngram_index(df, column):
+    """
+    Get the trigram index of a text column (cached per DataFrame).
+
+    Categorical columns are indexed over their category dictionary,
+    so the index returns category codes instead of row positions.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - NgramIndex: Index over the lower-cased column values.
+    """
+    if is_categorical(df[column]):
+        return derived_index(
+            df,
+            'ngram:' + column,
+            lambda df: NgramIndex(category_texts(df, column))
+        )
+    return derived_index(
+        df,
+        'ngram:' + column,
+        lambda df: NgramIndex(text_values(df, column))
+    )
+
+
+def build_search_index(df_wines):
+    """
+    Build the full-text search index over SEARCH_FIELDS.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - SearchIndex: Index over the rows of df_wines.
+    """
+    fields = []
+    for column, weight in SEARCH_FIELDS.items():
+        if column not in df_wines.columns:
+            continue
+        if is_categorical(df_wines[column]):
+            texts = df_wines[column].cat.categories
+            codes = category_codes(df_wines, column)
+        else:
+            codes, texts = pd.factorize(df_wines[column].to_numpy(object))
+        fields.append((texts, codes, weight))
+    return SearchIndex(fields, len(df_wines))
+
+
+def search_index(df_wines):
+    """
+    Get the (cached) full-text search index of a wine DataFrame.
+    """
+    return derived_index(df_wines, 'search', build_search_index)
+
+
+def numeric_values(df, column):
+    """
+    Get a numeric column as a float64 NumPy array (cached per DataFrame).
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the column.
+
+    Returns:
+        - np.ndarray: Column values, with NaN for missing values.
+    """
+    return range_index(df, column)['values']
+
+
+def compile_filters(df_wines, filters):
+    """
+    Compile a filters dict into an ordered list of predicates.
+
+    Range predicates are answered from the sorted range indexes and
+    run first. Text predicates on categorical columns come next, as
+    they are answered from the bitmap indexes; the remaining text
+    predicates scan the rows that survived, longest (most selective)
+    search string first.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+
+    Returns:
+        - list: (kind, column, value) tuples, kind being 'range' or 'text'.
+    """
+    ranges = []
+    texts = []
+    for column, value in filters.items():
+        if not value or column not in df_wines.columns:
+            continue
+        if column in RANGE_COLUMNS:
+            if column == 'rating' and None in value:
+                continue
+            ranges.append(('range', column, tuple(value)))
+        else:
+            texts.append(('text', column, value))
+
+    texts.sort(key=lambda predicate: (
+        not is_categorical(df_wines[predicate[1]]),
+        -len(str(predicate[2]))
+    ))
+    return ranges + texts
+
+
+def range_bounds(index, min_value, max_value):
+    """
+    Find the rows of a range index within closed bounds, by binary
+    search.
+
+    Parameters:
+        - index (dict): Range index, as built by build_range_index.
+        - min_value: Lower bound (None for unbounded).
+        - max_value: Upper bound (None for unbounded).
+
+    Returns:
+        - tuple: (low, high) such that index['order'][low:high] holds
+        the positions of the rows within the bounds.
+    """
+    values = index['sorted']
+    low = 0 if min_value is None else int(
+        np.searchsorted(values, min_value, side='left')
+    )
+    high = len(values) if max_value is None else int(
+        np.searchsorted(values, max_value, side='right')
+    )
+    return low, max(low, high)
+
+
+@timed('range_positions')
+def range_positions(df_wines, ranges, start, stop):
+    """
+    Evaluate range predicates with the sorted range indexes.
+
+    Every predicate is turned into a slice of its index by binary
+    search. The smallest slice gives the candidate rows, which are then
+    checked against the other predicates, smallest first, so a narrow
+    range costs time in proportion to its matches rather than to the
+    catalog size. When even the smallest slice covers a large part of
+    the catalog, the columns are compared as a whole instead.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - ranges (list): ('range', column, (min, max)) predicates.
+        - start (int): First row position to consider.
+        - stop (int): Row position to stop before.
+
+    Returns:
+        - np.ndarray: Positions of the matching rows, in dataset order.
+    """
+    slices = []
+    for predicate in ranges:
+        _, column, (min_value, max_value) = predicate
+        index = range_index(df_wines, column)
+        low, high = range_bounds(index, min_value, max_value)
+        slices.append((high - low, index, low, high, predicate))
+    slices.sort(key=lambda predicate: predicate[0])
+
+    _, index, low, high, _ = slices[0]
+    if (high - low) * 16 >= len(df_wines):
+        # Wide ranges: comparing whole columns beats gathering values.
+        mask = np.ones(stop - start, dtype=bool)
+        for _, index, _, _, (_, _, (min_value, max_value)) in slices:
+            values = index['values'][start:stop]
+            if min_value is not None:
+                np.logical_and(mask, values >= min_value, out=mask)
+            if max_value is not None:
+                np.logical_and(mask, values <= max_value, out=mask)
+        return np.flatnonzero(mask) + start
+
+    candidates = index['order'][low:high]
+    if start or stop < len(df_wines):
+        candidates = candidates[(candidates >= start) & (candidates < stop)]
+
+    return np.sort(check_ranges(
+        df_wines,
+        [predicate for *_, predicate in slices[1:]],
+        candidates
+    ))
+
+
+def range_size(df_wines, ranges):
+    """
+    Get the number of rows within the narrowest of range predicates,
+    by binary search.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - ranges (list): ('range', column, (min, max)) predicates.
+
+    Returns:
+        - int: Number of rows.
+    """
+    sizes = []
+    for _, column, (min_value, max_value) in ranges:
+        low, high = range_bounds(
+            range_index(df_wines, column),
+            min_value,
+            max_value
+        )
+        sizes.append(high - low)
+    return min(sizes)
+
+
+def check_ranges(df_wines, ranges, candidates):
+    """
+    Keep the candidate rows within range predicates, gathering their
+    values.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - ranges (list): ('range', column, (min, max)) predicates.
+        - candidates (np.ndarray): Row positions to check.
+
+    Returns:
+        - np.ndarray: The candidates within every range, in order.
+    """
+    for _, column, (min_value, max_value) in ranges:
+        if len(candidates) == 0:
+            break
+        values = range_index(df_wines, column)['values'][candidates]
+        keep = np.ones(len(candidates), dtype=bool)
+        if min_value is not None:
+            keep &= values >= min_value
+        if max_value is not None:
+            keep &= values <= max_value
+        candidates = candidates[keep]
+    return candidates
+
+
+@timed('match_text')
+def match_text(df, column, candidates, value, limit=None):
+    """
+    Keep the candidate rows whose text contains a substring
+    (case insensitive, value taken literally). Both sides are compared
+    lower-cased, as str.contains(case=False) does.
+
+    Columns with a trigram index are first narrowed down to the rows
+    sharing every trigram of value; only those are verified.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the text column.
+        - candidates (np.ndarray): Row positions to check (None for all).
+        - value (str): Substring to search for.
+        - limit (int): Stop after this many matches (default is all).
+
+    Returns:
+        - np.ndarray: Matching row positions, in order.
+    """
+    needle = str(value).lower()
+    if is_categorical(df[column]):
+        return match_category(df, column, candidates, needle)
+
+    values = text_values(df, column)
+
+    if column in NGRAM_COLUMNS:
+        hits = ngram_index(df, column).candidates(needle)
+        if hits is not None:
+            if candidates is None:
+                candidates = hits
+            else:
+                candidates = np.intersect1d(
+                    candidates,
+                    hits,
+                    assume_unique=True
+                )
+    if candidates is None:
+        candidates = np.arange(len(values))
+
+    if limit is None:
+        keep = [needle in text for text in values[candidates]]
+        return candidates[np.array(keep, dtype=bool)]
+
+    matches = []
+    for position in candidates:
+        if needle in values[position]:
+            matches.append(position)
+            if len(matches) >= limit:
+                break
+    return np.array(matches, dtype=np.intp)
+
+
+def bitmap_index(df, column):
+    """
+    Get the (cached) bitmap index of a categorical column, see
+    BitmapIndex.
+    """
+    return derived_index(
+        df,
+        'bitmap:' + column,
+        lambda df: BitmapIndex(
+            category_codes(df, column),
+            len(df[column].cat.categories)
+        )
+    )
+
+
+def matching_categories(df, column, needle):
+    """
+    Find the categories of a categorical column containing a
+    lower-cased substring, checking the category dictionary only.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the categorical column.
+        - needle (str): Lower-cased substring to search for.
+
+    Returns:
+        - np.ndarray: Codes of the matching categories.
+    """
+    categories = category_texts(df, column)
+    codes = None
+    if column in NGRAM_COLUMNS:
+        codes = ngram_index(df, column).candidates(needle)
+    if codes is None:
+        codes = np.arange(len(categories))
+    return codes[
+        np.array([needle in categories[code] for code in codes], dtype=bool)
+    ]
+
+
+def category_matches(df, predicates):
+    """
+    Find the categories matching text predicates on categorical
+    columns, see matching_categories.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - predicates (list): ('text', column, value) predicates on
+        categorical columns.
+
+    Returns:
+        - list: (column, codes of the matching categories) of every
+        predicate.
+    """
+    return [
+        (column, matching_categories(df, column, str(value).lower()))
+        for _, column, value in predicates
+    ]
+
+
+def category_bitmap(df, matches):
+    """
+    Evaluate text predicates on categorical columns as a bitmap of the
+    rows: the bitmaps of the categories matching a predicate are OR-ed,
+    those of the predicates AND-ed.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - matches (list): Matching categories of the predicates (at
+        least one), as returned by category_matches.
+
+    Returns:
+        - np.ndarray: Words of the bitmap, see empty_bitmap.
+    """
+    words = None
+    for column, codes in matches:
+        rows = bitmap_index(df, column).bitmap(codes)
+        words = rows if words is None else np.bitwise_and(
+            words,
+            rows,
+            out=words
+        )
+    return words
+
+
+def match_category(df, column, candidates, needle):
+    """
+    Keep the candidate rows of a categorical column whose value
+    contains a lower-cased substring.
+
+    The substring is only checked against the category dictionary;
+    rows are then selected from the bitmap index of the column, or
+    candidates by their integer codes.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame containing wine information.
+        - column (str): Name of the categorical column.
+        - candidates (np.ndarray): Row positions to check (None for all).
+        - needle (str): Lower-cased substring to search for.
+
+    Returns:
+        - np.ndarray: Matching row positions, in order.
+    """
+    codes = matching_categories(df, column, needle)
+    if candidates is None:
+        return bitmap_index(df, column).select(codes)
+    return rows_with_codes(
+        category_codes(df, column),
+        len(category_texts(df, column)),
+        codes,
+        candidates
+    )
+
+
+def query_cache(df_wines):
+    """
+    Get the (cached) query result cache of a wine DataFrame, see
+    QueryResultCache.
+    """
+    return derived_index(
+        df_wines,
+        'query-cache',
+        lambda df: QueryResultCache(len(df))
+    )
+
+
+@timed('query_positions')
+def query_positions(df_wines, filters, limit=None, start=0, stop=None,
+                    distinct=False):
+    """
+    Evaluate filters over the column arrays of a DataFrame.
+
+    Queries over the whole catalog go through its query result cache:
+    the rows of a query already answered are reused as is, and a query
+    refining one already answered (e.g. type=red, then type=red and
+    country=italy) only evaluates its extra predicates, on those rows.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+        - limit (int): Max number of positions to return (default is all).
+        A negative limit drops that many positions from the end,
+        like DataFrame.head.
+        - start (int): Only consider rows from this position on
+        (default is the first row).
+        - stop (int): Only consider rows before this position
+        (default is up to the last row).
+        - distinct (bool): Only consider the first row of every wine,
+        see build_distinct_rows (default is every row).
+
+    Returns:
+        - np.ndarray: Positions of the matching rows, in dataset order.
+    """
+    predicates = compile_filters(df_wines, filters)
+    stop = len(df_wines) if stop is None else min(stop, len(df_wines))
+    start = min(start, stop)
+    scan_limit = limit if limit is not None and limit >= 0 else None
+
+    if predicates and start == 0 and stop == len(df_wines):
+        candidates = cached_positions(
+            df_wines,
+            predicates,
+            scan_limit,
+            distinct
+        )
+    else:
+        candidates = evaluate_predicates(
+            df_wines,
+            predicates,
+            scan_limit,
+            start,
+            stop,
+            distinct
+        )
+    if limit is not None:
+        candidates = candidates[:limit]
+    return candidates
+
+
+def cached_positions(df_wines, predicates, scan_limit, distinct):
+    """
+    Evaluate predicates over the whole catalog through its query result
+    cache, see query_positions.
+
+    Results are only cached when complete: a text scan stopped at
+    scan_limit matches is not (categorical predicates are always
+    evaluated in full).
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - predicates (list): Predicates, as returned by compile_filters.
+        - scan_limit (int): Number of matches the text scan may stop
+        after (None for all).
+        - distinct (bool): Only consider the first row of every wine.
+
+    Returns:
+        - np.ndarray: Positions of the matching rows, in dataset order
+        (at least the first scan_limit).
+    """
+    cache = query_cache(df_wines)
+    key = filter_key(predicates, distinct)
+    positions = cache.get(key)
+    if positions is not None:
+        return positions
+
+    within = None
+    cached = cache.superset(key)
+    if cached is not None:
+        general, within = cached
+        predicates = residual_predicates(predicates, general)
+        distinct = distinct and not general[2]
+
+    positions = evaluate_predicates(
+        df_wines,
+        predicates,
+        scan_limit,
+        0,
+        len(df_wines),
+        distinct,
+        within
+    )
+    texts = [column for kind, column, _ in predicates if kind == 'text']
+    if (
+        scan_limit is None or len(positions) < scan_limit or not texts or
+        is_categorical(df_wines[texts[-1]])
+    ):
+        cache.put(key, positions)
+    return positions
+
+
+def evaluate_predicates(df_wines, predicates, scan_limit, start, stop,
+                        distinct, within=None):
+    """
+    Evaluate predicates over the column arrays of a DataFrame.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - predicates (list): Predicates, as returned by compile_filters.
+        - scan_limit (int): Number of matches the text scan may stop
+        after (None for all).
+        - start (int): Only consider rows from this position on.
+        - stop (int): Only consider rows before this position.
+        - distinct (bool): Only consider the first row of every wine.
+        - within (np.ndarray): Only consider these sorted row positions
+        (default is every row from start to stop).
+
+    Returns:
+        - np.ndarray: Positions of the matching rows, in dataset order.
+    """
+    ranges = [p for p in predicates if p[0] == 'range']
+    texts = [p for p in predicates if p[0] == 'text']
+    categories = [p for p in texts if is_categorical(df_wines[p[1]])]
+    texts = [p for p in texts if not is_categorical(df_wines[p[1]])]
+
+    # Categorical predicates are AND-ed as bitmaps (a single one selects
+    # its rows from its index), unless fewer rows are to be checked:
+    # those of a cached result or of a range predicate narrower than
+    # every categorical one.
+    matches = category_matches(df_wines, categories)
+    if matches and within is None and (not ranges or min(
+        bitmap_index(df_wines, column).count(codes)
+        for column, codes in matches
+    ) <= range_size(df_wines, ranges)):
+        if len(matches) == 1:
+            column, codes = matches[0]
+            within = bitmap_index(df_wines, column).select(codes)
+            if start or stop < len(df_wines):
+                within = within[
+                    np.searchsorted(within, start):
+                    np.searchsorted(within, stop)
+                ]
+        else:
+            within = bitmap_positions(
+                category_bitmap(df_wines, matches),
+                len(df_wines),
+                start,
+                stop
+            )
+        matches = []
+
+    candidates = None
+    if within is not None or ranges:
+        if within is not None:
+            candidates = check_ranges(df_wines, ranges, within)
+        else:
+            candidates = range_positions(df_wines, ranges, start, stop)
+        for column, codes in matches:
+            candidates = rows_with_codes(
+                category_codes(df_wines, column),
+                len(category_texts(df_wines, column)),
+                codes,
+                candidates
+            )
+        if distinct:
+            first = distinct_rows(df_wines)['mask']
+            candidates = candidates[first[candidates]]
+        if len(candidates) == 0:
+            return candidates
+    elif distinct:
+        candidates = distinct_rows(df_wines)['positions']
+        if start or stop < len(df_wines):
+            candidates = candidates[
+                np.searchsorted(candidates, start):
+                np.searchsorted(candidates, stop)
+            ]
+    elif start or stop < len(df_wines):
+        candidates = np.arange(start, stop)
+
+    for i, (_, column, value) in enumerate(texts):
+        if candidates is not None and len(candidates) == 0:
+            break
+        last = i == len(texts) - 1
+        candidates = match_text(
+            df_wines,
+            column,
+            candidates,
+            value,
+            scan_limit if last else None
+        )
+
+    if candidates is None:
+        candidates = np.arange(len(df_wines))
+    return candidates
+
+
+@timed('query_count')
+def query_count(df_wines, filters, distinct=False):
+    """
+    Count the rows matching filters.
+
+    Filters only on categorical columns are counted on their bitmap
+    (popcount), without listing the rows; a single one is the sum of
+    the row counts of its matching categories.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+        - distinct (bool): Only count the first row of every wine, see
+        build_distinct_rows (default is every row).
+
+    Returns:
+        - int: Number of matching rows.
+    """
+    predicates = compile_filters(df_wines, filters)
+    if not predicates or not all(
+        kind == 'text' and is_categorical(df_wines[column])
+        for kind, column, _ in predicates
+    ):
+        return len(query_positions(df_wines, filters, distinct=distinct))
+
+    matches = category_matches(df_wines, predicates)
+    if len(matches) == 1 and not distinct:
+        column, codes = matches[0]
+        return bitmap_index(df_wines, column).count(codes)
+    words = category_bitmap(df_wines, matches)
+    if distinct:
+        words &= derived_index(
+            df_wines,
+            'distinct-bitmap',
+            lambda df: bitmap_from_mask(distinct_rows(df)['mask'])
+        )
+    return popcount(words)
+
+
+@timed('search_positions')
+def search_positions(df_wines, text, filters, limit=None, distinct=False):
+    """
+    Full-text search of the wines matching filters, best match first.
+
+    Every word of text must match a word of the name, winery or region
+    of a wine, ignoring case and accents; a word found nowhere in the
+    catalog matches the words one typo away, for a lower score. Wines
+    are ranked by BM25 score, name matches weighing the most; only the
+    limit best are sorted.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - text (str): The searched words.
+        - filters (dict): Dictionary of filters, as accepted by filter_wines.
+        - limit (int): Max number of positions to return (default is all).
+        - distinct (bool): Skip the duplicates of a wine, see
+        build_distinct_rows (default is every row).
+
+    Returns:
+        - np.ndarray: Positions of the matching rows, best match first;
+        in dataset order if text has no word.
+    """
+    hits = search_index(df_wines).search(text)
+    if hits is None:
+        return query_positions(df_wines, filters, limit, distinct=distinct)
+
+    rows, scores = hits
+    keep = np.ones(len(rows), dtype=bool)
+    if distinct:
+        keep &= distinct_rows(df_wines)['mask'][rows]
+    if compile_filters(df_wines, filters):
+        keep &= np.isin(
+            rows,
+            query_positions(df_wines, filters),
+            assume_unique=True
+        )
+    return top_k(rows[keep], scores[keep], limit)
+
+
+def build_query_indexes(df_wines):
+    """
+    Build the range indexes of the numeric columns, the bitmap indexes
+    of the categorical columns, the trigram indexes of the searchable
+    text columns and the full-text search index ahead of the first
+    request.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+    """
+    for column in RANGE_COLUMNS:
+        if column in df_wines.columns:
+            range_index(df_wines, column)
+    for column in CATEGORY_COLUMNS:
+        if column in df_wines.columns and is_categorical(df_wines[column]):
+            bitmap_index(df_wines, column)
+    for column in NGRAM_COLUMNS:
+        if column in df_wines.columns:
+            ngram_index(df_wines, column)
+    search_index(df_wines)
@@ -0,0 +1,272 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def filter_key(predicates, distinct=False):
+    """
+    Normalize compiled predicates into a hashable cache key,
+    independent of the order of the filters and of the case of the
+    searched strings.
+
+    Parameters:
+        - predicates (list): (kind, column, value) tuples, as returned
+        by compile_filters.
+        - distinct (bool): Whether only the first row of every wine is
+        considered.
+
+    Returns:
+        - tuple: (ranges, texts, distinct), ranges and texts being
+        sorted (column, value) pairs.
+    """
+    ranges = tuple(sorted(
+        (column, tuple(value))
+        for kind, column, value in predicates if kind == 'range'
+    ))
+    texts = tuple(sorted(
+        (column, str(value).lower())
+        for kind, column, value in predicates if kind == 'text'
+    ))
+    return ranges, texts, bool(distinct)
+
+
+def key_columns(key):
+    """
+    Get the columns a filter key has predicates on.
+    """
+    ranges, texts, _ = key
+    return frozenset(column for column, _ in ranges + texts)
+
+
+def subsumes(general, specific):
+    """
+    Check whether every row matching a filter key matches another one,
+    i.e. whether specific refines general.
+
+    It does if every predicate of general is implied by a predicate of
+    specific on the same column: a range within its range, or a
+    substring containing its substring (e.g. 'pinot noir' refines
+    'pinot'); specific may have more predicates.
+
+    Parameters:
+        - general (tuple): Filter key, see filter_key.
+        - specific (tuple): Filter key, see filter_key.
+
+    Returns:
+        - bool: True if the rows of specific are a subset of those of
+        general.
+    """
+    general_ranges, general_texts, general_distinct = general
+    specific_ranges, specific_texts, specific_distinct = specific
+    if general_distinct and not specific_distinct:
+        return False
+
+    ranges = dict(specific_ranges)
+    for column, (min_value, max_value) in general_ranges:
+        if column not in ranges:
+            return False
+        specific_min, specific_max = ranges[column]
+        if min_value is not None and (
+            specific_min is None or specific_min < min_value
+        ):
+            return False
+        if max_value is not None and (
+            specific_max is None or specific_max > max_value
+        ):
+            return False
+
+    texts = dict(specific_texts)
+    return all(
+        column in texts and needle in texts[column]
+        for column, needle in general_texts
+    )
+
+
+def residual_predicates(predicates, general):
+    """
+    Get the predicates still to evaluate on the rows of a cached
+    filter key refined by predicates: those not already in it.
+
+    Parameters:
+        - predicates (list): Compiled predicates of the refined query.
+        - general (tuple): Filter key of the cached rows.
+
+    Returns:
+        - list: The predicates missing from general, in order.
+    """
+    ranges, texts, _ = general
+    known = set(ranges) | set(texts)
+    return [
+        (kind, column, value)
+        for kind, column, value in predicates
+        if (column, tuple(value) if kind == 'range'
+            else str(value).lower()) not in known
+    ]
+
+
+class QueryResultCache:
+    """
+    Bounded in-memory cache of the rows matching filter combinations,
+    with LRU eviction, able to answer refinements of cached queries.
+
+    Every entry holds the positions of the rows matching a filter key,
+    stored as sorted int32 positions or as a packed bitmap of the
+    catalog rows, whichever is smaller. A query missing from the cache
+    looks for its smallest cached superset (see subsumes), so that only
+    its extra predicates get evaluated, on those rows. Users refine
+    their own recent queries: only the max_candidates most recently
+    used entries on a subset of its columns are considered, so the
+    lookup stays cheap however many entries are cached.
+
+    Attributes:
+        n_rows (int): Number of rows of the catalog.
+        max_entries (int): Max number of cached results.
+        max_bytes (int): Max total size of the cached results.
+        max_candidates (int): Max number of entries checked for a
+        superset of a query.
+        hits (int): Number of lookups answered from the cache.
+        refinements (int): Number of lookups answered by refining a
+        cached result.
+        misses (int): Number of lookups evaluated on the whole catalog.
+        evictions (int): Number of entries dropped to make room.
+    """
+
+    def __init__(self, n_rows, max_entries=256, max_bytes=16 * 2 ** 20,
+                 max_candidates=16):
+        self.n_rows = n_rows
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_candidates = max_candidates
+        self.hits = 0
+        self.refinements = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up the rows matching a filter key.
+
+        Parameters:
+            - key (tuple): Filter key, see filter_key.
+
+        Returns:
+            - np.ndarray or None: Sorted row positions, or None if not
+            cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._decode(entry)
+
+    def superset(self, key):
+        """
+        Find the cached result with the fewest rows among the recently
+        used ones refined by a filter key.
+
+        Parameters:
+            - key (tuple): Filter key, see filter_key.
+
+        Returns:
+            - tuple or None: (filter key, sorted row positions) of the
+            cached result, or None (counted as a miss) if there is none.
+        """
+        columns = key_columns(key)
+        with self._lock:
+            best = None
+            candidates = 0
+            for cached in reversed(self._entries):
+                entry = self._entries[cached]
+                if not entry[3] <= columns:
+                    continue
+                if (
+                    (best is None or entry[2] < best[1][2]) and
+                    subsumes(cached, key)
+                ):
+                    best = (cached, entry)
+                candidates += 1
+                if candidates >= self.max_candidates:
+                    break
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best[0])
+            self.refinements += 1
+        return best[0], self._decode(best[1])
+
+    def put(self, key, positions):
+        """
+        Cache the rows matching a filter key, evicting the least
+        recently used results if the cache is full.
+
+        Parameters:
+            - key (tuple): Filter key, see filter_key.
+            - positions (np.ndarray): Sorted positions of all the
+            matching rows.
+        """
+        entry = self._encode(positions) + (key_columns(key),)
+        size = entry[1].nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while (
+                len(self._entries) > self.max_entries or
+                self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached result.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+            - dict: hits, refinements, misses, evictions, entries and
+            bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "refinements": self.refinements,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _encode(self, positions):
+        """
+        Encode row positions as (kind, data, count), kind being
+        'positions' or 'bitmap'.
+        """
+        if len(positions) * 32 > self.n_rows:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[positions] = True
+            return 'bitmap', np.packbits(mask), len(positions)
+        return 'positions', positions.astype(np.int32), len(positions)
+
+    def _decode(self, entry):
+        kind, data = entry[:2]
+        if kind == 'bitmap':
+            return np.flatnonzero(np.unpackbits(data, count=self.n_rows))
+        return data.astype(np.intp)
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[1].nbytes
@@ -0,0 +1,358 @@
+import functools
+import re
+import unicodedata
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+
+TOKEN = re.compile(r'\w+')
+
+# Tokens shorter than this must match exactly; longer ones that are not
+# in the vocabulary match the terms one typo away.
+MIN_FUZZY_LENGTH = 4
+
+# Score weight of a term matched one typo away.
+FUZZY_WEIGHT = 0.5
+
+
+def fold(text):
+    """
+    Fold a string for matching: accents are stripped and case is folded,
+    so e.g. 'Château' and 'CHATEAU' both become 'chateau'.
+
+    Parameters:
+        - text (str): The string to fold.
+
+    Returns:
+        - str: The folded string.
+    """
+    if text.isascii():
+        return text.casefold()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(
+        char for char in decomposed if not unicodedata.combining(char)
+    ).casefold()
+
+
+# Words repeat a lot across a catalog: fold each of them once
+_fold_word = functools.lru_cache(maxsize=1 << 16)(fold)
+
+
+def tokenize(text):
+    """
+    Split a string into folded word tokens.
+
+    Parameters:
+        - text (str): The string to split.
+
+    Returns:
+        - list: The tokens of text, in order.
+    """
+    words = TOKEN.findall(unicodedata.normalize('NFC', text))
+    return [_fold_word(word) for word in words]
+
+
+def deletes(term):
+    """
+    Get the strings obtained by deleting one character of a term.
+    """
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Compute the optimal string alignment distance of two strings
+    (insertions, deletions, substitutions and transpositions of
+    adjacent characters), giving up early past max_distance.
+
+    Parameters:
+        - a (str): First string.
+        - b (str): Second string.
+        - max_distance (int): Largest distance of interest.
+
+    Returns:
+        - int: The distance, or max_distance + 1 if it is larger.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            row[j] = min(
+                previous[j] + 1,
+                row[j - 1] + 1,
+                previous[j - 1] + cost
+            )
+            if (
+                i > 1 and j > 1 and
+                a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+            ):
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+    return row[-1]
+
+
+def top_k(rows, scores, k=None):
+    """
+    Order rows by decreasing score (ties by row position), keeping the
+    k best.
+
+    The k best are first selected in linear time (np.partition), so
+    only they get sorted.
+
+    Parameters:
+        - rows (np.ndarray): Row positions, in increasing order.
+        - scores (np.ndarray): Score of every row.
+        - k (int): Number of rows to keep (default is all).
+
+    Returns:
+        - np.ndarray: The kept row positions, best first.
+    """
+    if k is not None and k < len(rows):
+        if k <= 0:
+            return rows[:0]
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        selected = np.concatenate([above, ties])
+        rows, scores = rows[selected], scores[selected]
+    return rows[np.lexsort((rows, -scores))]
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over folded word tokens of several text fields,
+    with typo tolerance.
+
+    Every (term, row) posting stores its precomputed BM25 score, summed
+    over the fields (each with its own weight), so a query only adds up
+    the postings of its terms. Query tokens missing from the vocabulary
+    are taken for typos: the terms one typo away are found with a
+    symmetric delete index, the vocabulary being indexed by the strings
+    obtained by deleting one of their characters.
+
+    Attributes:
+        n_rows (int): Number of indexed rows.
+        terms (list): Vocabulary; a term id is its position.
+        term_ids (dict): Term -> term id.
+        offsets (np.ndarray): Postings of term t are
+        rows[offsets[t]:offsets[t + 1]].
+        rows (np.ndarray): Row positions of the postings, sorted per term.
+        scores (np.ndarray): BM25 score of the postings.
+    """
+
+    def __init__(self, fields, n_rows, k1=1.2, b=0.75):
+        """
+        Build the index.
+
+        Fields are dictionary-encoded: their distinct texts are only
+        tokenized once, then the postings are spread over the rows by
+        their codes.
+
+        Parameters:
+            - fields (list): (texts, codes, weight) of every field:
+            distinct texts of the field, text position of every row
+            (-1 for missing) and weight of the field in the score.
+            - n_rows (int): Number of rows.
+            - k1 (float): BM25 term frequency saturation.
+            - b (float): BM25 length normalization.
+        """
+        self.n_rows = n_rows
+        self.terms = []
+        self.term_ids = {}
+
+        all_terms, all_rows, all_scores = [], [], []
+        for texts, codes, weight in fields:
+            terms, rows, frequencies, lengths = self._field_postings(
+                texts,
+                np.asarray(codes)
+            )
+            if len(rows) == 0:
+                continue
+            frequency = np.bincount(terms, minlength=len(self.terms))[terms]
+            idf = np.log(
+                1 + (n_rows - frequency + 0.5) / (frequency + 0.5)
+            )
+            norm = k1 * (1 - b + b * lengths[rows] / max(lengths.mean(), 1))
+            all_terms.append(terms)
+            all_rows.append(rows)
+            all_scores.append(
+                weight * idf * frequencies * (k1 + 1) / (frequencies + norm)
+            )
+
+        terms = np.concatenate(all_terms + [np.empty(0, np.int64)])
+        rows = np.concatenate(all_rows + [np.empty(0, np.int64)])
+        scores = np.concatenate(all_scores + [np.empty(0)])
+
+        # One posting per (term, row), summing the scores of the fields
+        keys = terms * max(n_rows, 1) + rows
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        keys = keys[starts]
+        self.rows = (keys % max(n_rows, 1)).astype(np.int32)
+        self.scores = np.add.reduceat(
+            scores[order], starts
+        ).astype(np.float32) if len(starts) else np.empty(0, np.float32)
+        self.offsets = np.searchsorted(
+            keys // max(n_rows, 1),
+            np.arange(len(self.terms) + 1)
+        )
+
+        self.deletes = {}
+        for term_id, term in enumerate(self.terms):
+            if len(term) >= MIN_FUZZY_LENGTH:
+                for key in deletes(term):
+                    self.deletes.setdefault(key, []).append(term_id)
+
+    def _field_postings(self, texts, codes):
+        """
+        Tokenize the distinct texts of a field and spread their term
+        frequencies over the rows.
+
+        Returns:
+            - tuple: (term id, row, term frequency) of every posting
+            and the number of tokens of every row.
+        """
+        tokens = [tokenize(str(text)) for text in texts]
+        text_lengths = np.zeros(len(texts) + 1, dtype=np.int64)
+        text_lengths[:len(texts)] = [len(words) for words in tokens]
+
+        # Global term id of every token, assigning ids to new terms
+        codes_of_tokens, words = pd.factorize(
+            np.array(list(chain.from_iterable(tokens)), dtype=object)
+        )
+        word_ids = np.empty(len(words), dtype=np.int64)
+        for word_id, word in enumerate(words):
+            term_id = self.term_ids.get(word)
+            if term_id is None:
+                term_id = self.term_ids[word] = len(self.terms)
+                self.terms.append(word)
+            word_ids[word_id] = term_id
+
+        # Term frequency of every (text, term) pair
+        pairs, frequencies = np.unique(
+            np.repeat(np.arange(len(texts)), text_lengths[:len(texts)]) *
+            max(len(words), 1) + codes_of_tokens,
+            return_counts=True
+        )
+        text_ids = pairs // max(len(words), 1)
+        text_terms = word_ids[pairs % max(len(words), 1)]
+
+        # Rows grouped by text, missing values (-1) first
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(texts))
+        starts = np.cumsum(counts) - counts + np.count_nonzero(codes < 0)
+
+        per_posting = counts[text_ids]
+        firsts = np.cumsum(per_posting) - per_posting
+        within = np.arange(per_posting.sum()) - np.repeat(firsts, per_posting)
+        rows = order[np.repeat(starts[text_ids], per_posting) + within]
+        return (
+            np.repeat(text_terms, per_posting),
+            rows.astype(np.int64),
+            np.repeat(frequencies.astype(np.float64), per_posting),
+            text_lengths[codes].astype(np.float64),
+        )
+
+    def variants(self, token):
+        """
+        Get the terms matching a query token: the token itself if it
+        is in the vocabulary, else (if it is long enough) the terms one
+        typo away.
+
+        Parameters:
+            - token (str): Folded query token.
+
+        Returns:
+            - dict: Term id -> score weight (1 for the token itself,
+            FUZZY_WEIGHT for a typo).
+        """
+        if token in self.term_ids:
+            return {self.term_ids[token]: 1.0}
+        matches = {}
+        if len(token) < MIN_FUZZY_LENGTH:
+            return matches
+
+        candidates = set(self.deletes.get(token, ()))
+        for key in deletes(token):
+            if key in self.term_ids:
+                candidates.add(self.term_ids[key])
+            candidates.update(self.deletes.get(key, ()))
+        for term_id in candidates:
+            if edit_distance(
+                token, self.terms[term_id], 1
+            ) <= 1:
+                matches[term_id] = FUZZY_WEIGHT
+        return matches
+
+    def postings(self, token):
+        """
+        Get the rows matching a query token, with their score.
+
+        A row matching several variants of the token gets the score of
+        its best one.
+
+        Parameters:
+            - token (str): Folded query token.
+
+        Returns:
+            - tuple: (sorted row positions, score of every row).
+        """
+        parts = [
+            (
+                self.rows[self.offsets[term_id]:self.offsets[term_id + 1]],
+                self.scores[self.offsets[term_id]:self.offsets[term_id + 1]]
+                * weight
+            )
+            for term_id, weight in self.variants(token).items()
+        ]
+        if not parts:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        if len(parts) == 1:
+            return parts[0]
+
+        rows = np.concatenate([part[0] for part in parts])
+        scores = np.concatenate([part[1] for part in parts])
+        order = np.lexsort((-scores, rows))
+        rows, scores = rows[order], scores[order]
+        first = np.r_[True, rows[1:] != rows[:-1]]
+        return rows[first], scores[first]
+
+    def search(self, text):
+        """
+        Find the rows matching every token of a query, with their score.
+
+        Parameters:
+            - text (str): The query.
+
+        Returns:
+            - tuple or None: (sorted row positions, BM25 score of every
+            row), or None if text has no token.
+        """
+        tokens = list(dict.fromkeys(tokenize(text)))
+        if not tokens:
+            return None
+
+        matches = sorted(
+            (self.postings(token) for token in tokens),
+            key=lambda match: len(match[0])
+        )
+        rows, scores = matches[0]
+        scores = scores.astype(np.float64)
+        for token_rows, token_scores in matches[1:]:
+            if len(rows) == 0:
+                break
+            rows, mine, theirs = np.intersect1d(
+                rows,
+                token_rows,
+                assume_unique=True,
+                return_indices=True
+            )
+            scores = scores[mine] + token_scores[theirs]
+        return rows.astype(np.intp), scores
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from .encoding import is_categorical
+
+
+SNAPSHOT_FORMAT = 1
+
+
+def write_snapshot(df, path):
+    """
+    Write a DataFrame as a columnar snapshot directory.
+
+    Every column is stored as one or more .npy files that can be
+    memory-mapped back: numeric columns as is, nullable integers as
+    values plus a missing-value mask, categoricals as integer codes
+    (categories go to meta.json) and text as a UTF-8 blob plus
+    character offsets.
+
+    The snapshot is written to a temporary directory and renamed into
+    place, so readers never see a partial snapshot. If path already
+    exists (e.g. another worker wrote it first), it is left untouched.
+
+    Parameters:
+        - df (pd.DataFrame): DataFrame to store.
+        - path (str): Directory of the snapshot.
+    """
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        columns = []
+        for i, column in enumerate(df.columns):
+            columns.append(_write_column(df[column], tmp, f"c{i}"))
+            columns[-1]["name"] = column
+        np.save(os.path.join(tmp, "index.npy"), df.index.to_numpy())
+
+        meta = {
+            "format": SNAPSHOT_FORMAT,
+            "rows": len(df),
+            "columns": columns,
+            "attrs": df.attrs,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+
+
+def _write_column(series, directory, prefix):
+    """
+    Write one column of a snapshot and describe it for meta.json.
+    """
+    def save(suffix, array):
+        np.save(os.path.join(directory, f"{prefix}.{suffix}.npy"), array)
+
+    if is_categorical(series):
+        save("codes", series.cat.codes.to_numpy())
+        return {
+            "kind": "category",
+            "categories": [str(c) for c in series.cat.categories],
+        }
+    if isinstance(series.dtype, pd.Int64Dtype):
+        save("values", series.to_numpy(dtype="int64", na_value=0))
+        save("mask", series.isna().to_numpy())
+        return {"kind": "nullable-int"}
+    if series.dtype.kind in "biuf":
+        save("values", series.to_numpy())
+        return {"kind": "numeric"}
+
+    values = [str(value) for value in series]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in values], out=offsets[1:])
+    save("blob", np.frombuffer("".join(values).encode("utf-8"), np.uint8))
+    save("offsets", offsets)
+    return {"kind": "text"}
+
+
+def read_snapshot(path, mmap_mode="r"):
+    """
+    Read a snapshot directory written by write_snapshot.
+
+    Parameters:
+        - path (str): Directory of the snapshot.
+        - mmap_mode (str): Passed to np.load; "r" memory-maps the
+        column files read-only (default), None reads them in memory.
+
+    Returns:
+        - pd.DataFrame: The stored DataFrame. With mmap_mode "r", its
+        numeric and categorical columns are read-only views of the
+        snapshot files, shared with any other process reading them;
+        text columns are decoded into each process.
+    """
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["format"] != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {meta['format']}")
+
+    def load(prefix, suffix):
+        return np.load(
+            os.path.join(path, f"{prefix}.{suffix}.npy"),
+            mmap_mode=mmap_mode
+        )
+
+    data = {}
+    for i, column in enumerate(meta["columns"]):
+        prefix = f"c{i}"
+        kind = column["kind"]
+        if kind == "category":
+            data[column["name"]] = pd.Categorical.from_codes(
+                load(prefix, "codes"),
+                categories=column["categories"]
+            )
+        elif kind == "nullable-int":
+            data[column["name"]] = pd.arrays.IntegerArray(
+                np.asarray(load(prefix, "values")),
+                np.asarray(load(prefix, "mask"))
+            )
+        elif kind == "numeric":
+            data[column["name"]] = load(prefix, "values")
+        else:
+            text = load(prefix, "blob").tobytes().decode("utf-8")
+            offsets = load(prefix, "offsets").tolist()
+            data[column["name"]] = np.array([
+                text[start:end]
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ], dtype=object)
+
+    # copy=False keeps the columns as views of the memory-mapped files,
+    # so every process reading the same snapshot shares their pages.
+    df = pd.DataFrame(
+        data,
+        index=np.load(os.path.join(path, "index.npy"), mmap_mode=mmap_mode),
+        copy=False
+    )
+    df.attrs.update(meta["attrs"])
+    return df
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from .indexes import derived_index
+from .metrics import timed
+from .query import numeric_values
+from .search_index import tokenize
+
+
+# Columns completed by /suggest
+SUGGEST_COLUMNS = ('name', 'winery', 'region')
+
+# Orders of the completions: total number of ratings of their wines,
+# or best rating of their wines
+SUGGEST_SORTS = ('numberofratings', 'rating')
+
+# Vintage at the end of a wine name, left out of its completions
+VINTAGE = r'\s+(\d{4}|N\.V\.)$'
+
+
+def build_suggest_index(df_wines):
+    """
+    Build the prefix index of the completions of SUGGEST_COLUMNS.
+
+    Completions are the distinct values of the columns, wine names
+    without their vintage. Every completion is indexed under each of
+    its words, folded like the search index does (e.g. 'Château
+    Margaux' under 'chateau margaux' and 'margaux'), in a sorted array,
+    so the completions of a prefix are a slice found by binary search.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+
+    Returns:
+        - dict: 'keys' (sorted folded keys) and 'texts' (completion of
+        every key); 'text', 'column', 'rating', 'numberofratings' and
+        'wines' of every completion; per sort, 'ranks:<sort>' (rank of
+        the completion of every key) and 'by_rank:<sort>' (completion
+        of every rank).
+    """
+    rating = numeric_values(df_wines, 'rating')
+    number_of_ratings = numeric_values(df_wines, 'numberofratings')
+
+    completions = []
+    for column in SUGGEST_COLUMNS:
+        if column not in df_wines.columns:
+            continue
+        values = df_wines[column].astype(object)
+        if column == 'name':
+            values = values.str.replace(VINTAGE, '', regex=True)
+        stats = pd.DataFrame({
+            'text': values.to_numpy(),
+            'rating': rating,
+            'numberofratings': np.nan_to_num(number_of_ratings),
+        }).groupby('text', sort=False).agg(
+            rating=('rating', 'max'),
+            numberofratings=('numberofratings', 'sum'),
+            wines=('rating', 'size'),
+        ).reset_index()
+        stats['column'] = column
+        completions.append(stats)
+    completions = pd.concat(completions, ignore_index=True)
+
+    keys, texts = [], []
+    for text_id, text in enumerate(completions['text']):
+        words = tokenize(str(text))
+        for i, word in enumerate(words):
+            if not word.isdigit():
+                keys.append(' '.join(words[i:]))
+                texts.append(text_id)
+    keys = np.array(keys, dtype=object)
+    texts = np.array(texts, dtype=np.intp)
+    order = np.argsort(keys, kind='stable')
+
+    index = {
+        'keys': keys[order],
+        'texts': texts[order],
+        'text': completions['text'].to_numpy(dtype=object),
+        'column': completions['column'].to_numpy(dtype=object),
+        'rating': completions['rating'].to_numpy(dtype=np.float64),
+        'numberofratings': completions['numberofratings'].to_numpy(
+            dtype=np.int64
+        ),
+        'wines': completions['wines'].to_numpy(dtype=np.int64),
+    }
+    for sort in SUGGEST_SORTS:
+        other = SUGGEST_SORTS[1 - SUGGEST_SORTS.index(sort)]
+        by_rank = np.lexsort((
+            index['text'].astype(str),
+            -np.nan_to_num(index[other], nan=-1),
+            -np.nan_to_num(index[sort], nan=-1),
+        ))
+        ranks = np.empty(len(by_rank), dtype=np.intp)
+        ranks[by_rank] = np.arange(len(by_rank))
+        index['by_rank:' + sort] = by_rank
+        index['ranks:' + sort] = ranks[index['texts']]
+    return index
+
+
+def suggest_index(df_wines):
+    """
+    Get the (cached) prefix index of a wine DataFrame, see
+    build_suggest_index.
+    """
+    return derived_index(df_wines, 'suggest', build_suggest_index)
+
+
+@timed('suggest')
+def suggest(df_wines, text, limit=10, sort='numberofratings'):
+    """
+    Complete the beginning of a wine name, winery or region.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - text (str): What was typed so far; it may start at any word of
+        the completion and is matched ignoring case and accents.
+        - limit (int): Max number of completions (default is 10).
+        - sort (str): 'numberofratings' (most rated wines first,
+        default) or 'rating' (best rated wines first).
+
+    Returns:
+        - list: Completions, best first, as dicts with their 'text',
+        'column' ('name', 'winery' or 'region'), number of 'wines',
+        best 'rating' and total 'numberofratings'.
+
+    Raises:
+        - ValueError: If the sort is unknown.
+    """
+    if sort not in SUGGEST_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    prefix = ' '.join(tokenize(text))
+    if not prefix or limit <= 0:
+        return []
+
+    index = suggest_index(df_wines)
+    low = np.searchsorted(index['keys'], prefix, side='left')
+    high = np.searchsorted(index['keys'], prefix + '\U0010ffff', side='left')
+    ranks = index['ranks:' + sort][low:high]
+
+    # The best ranks, each completion once (its keys share its rank):
+    # select the smallest ranks, widening until enough are distinct.
+    size = limit
+    while True:
+        if size >= len(ranks):
+            best = np.unique(ranks)
+            break
+        best = np.unique(np.partition(ranks, size)[:size])
+        if len(best) >= limit:
+            break
+        size *= 4
+
+    return [
+        {
+            'text': index['text'][completion],
+            'column': index['column'][completion],
+            'wines': int(index['wines'][completion]),
+            'rating': (
+                None if np.isnan(index['rating'][completion])
+                else float(index['rating'][completion])
+            ),
+            'numberofratings': int(index['numberofratings'][completion]),
+        }
+        for completion in index['by_rank:' + sort][best[:limit]]
+    ]
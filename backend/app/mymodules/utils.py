@@ -1,23 +1,52 @@
 import numpy as np
 import pandas as pd
-from .filter_functions import filter_contains, filter_range
+from .encoding import category_values
+from .facets import catalog_facets
+from .indexes import sort_index
+from .metrics import timed
+from .projection import distinct_sort_index
+from .query import query_count, query_positions, build_query_indexes
+from .suggest import suggest_index
 
 
-def top_wines_by_rating(df_wines, limit=10):
+def ranking_orders(df_wines, distinct=False):
+    """
+    Get the (cached) sort orders of the rankings.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - distinct (bool): Leave out the duplicates of a wine, keyed on
+        name, winery and year (default is False).
+
+    Returns:
+        - dict: See build_sort_index.
+    """
+    if distinct:
+        return distinct_sort_index(df_wines)
+    return sort_index(df_wines)
+
+
+@timed('top_wines_by_rating')
+def top_wines_by_rating(df_wines, limit=10, distinct=False):
     """
     Get the top wines based on rating.
 
     Parameters:
         - df_wines (pd.DataFrame): DataFrame containing wine information.
         - limit (int): Number of top wines to return (default is 10).
+        - distinct (bool): Skip the duplicates of a wine (default is
+        False).
 
     Returns:
         - pd.DataFrame: Top wines sorted by rating in descending order.
     """
-    return df_wines.sort_values(by="rating", ascending=False).head(limit)
+    return df_wines.iloc[
+        ranking_orders(df_wines, distinct)['rating_desc'][:limit]
+    ]
 
 
-def wines_by_recent_year(df_wines, limit=10):
+@timed('wines_by_recent_year')
+def wines_by_recent_year(df_wines, limit=10, distinct=False):
     """
     Get the most recently reviewed wines.
 
@@ -26,16 +55,20 @@ def wines_by_recent_year(df_wines, limit=10):
         wine information.
         - limit (int): Number of wines to return (default
         is 10).
+        - distinct (bool): Skip the duplicates of a wine
+        (default is False).
 
     Returns:
         - pd.DataFrame: Most recently reviewed wines sorted
-        by year in descending order.
+        by year in descending order. Non-vintage wines are excluded.
     """
-    df_wines = df_wines[df_wines['year'] != 'N.V.']
-    return df_wines.sort_values(by="year", ascending=False).head(limit)
+    return df_wines.iloc[
+        ranking_orders(df_wines, distinct)['year_desc'][:limit]
+    ]
 
 
-def wines_by_least_recent_year(df_wines, limit=10):
+@timed('wines_by_least_recent_year')
+def wines_by_least_recent_year(df_wines, limit=10, distinct=False):
     """
     Get the least recently reviewed wines.
 
@@ -44,13 +77,46 @@ def wines_by_least_recent_year(df_wines, limit=10):
         wine information.
         - limit (int): Number of wines to return
         (default is 10).
+        - distinct (bool): Skip the duplicates of a wine
+        (default is False).
 
     Returns:
         - pd.DataFrame: Least recently reviewed wines sorted
-        by year in ascending order.
+        by year in ascending order. Non-vintage wines are excluded.
+    """
+    return df_wines.iloc[
+        ranking_orders(df_wines, distinct)['year_asc'][:limit]
+    ]
+
+
+RANKINGS = {
+    "top": "rating_desc",
+    "recent": "year_desc",
+    "oldest": "year_asc",
+}
+
+
+@timed('ranking_positions')
+def ranking_positions(df_wines, lists, limit=10, distinct=False):
+    """
+    Get several rankings of the wines at once, as row positions.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - lists (list): Names of the rankings, among 'top' (by rating),
+        'recent' and 'oldest' (by year, non-vintage wines excluded).
+        - limit (int): Number of wines per ranking (default is 10).
+        - distinct (bool): Skip the duplicates of a wine (default is
+        False).
+
+    Returns:
+        - dict: Ranking name -> positions of its wines in df_wines.
+
+    Raises:
+        - KeyError: If a ranking name is unknown.
     """
-    df_wines = df_wines[df_wines['year'] != 'N.V.']
-    return df_wines.sort_values(by="year", ascending=True).head(limit)
+    orders = ranking_orders(df_wines, distinct)
+    return {name: orders[RANKINGS[name]][:limit] for name in lists}
 
 
 def countries_df(df_wines):
@@ -63,8 +129,7 @@ def countries_df(df_wines):
     Returns:
         - list: List of unique countries.
     """
-    countries = df_wines['country'].astype(str).unique()
-    return countries.tolist()
+    return category_values(df_wines, 'country')
 
 
 def types_df(df_wines):
@@ -77,33 +142,61 @@ def types_df(df_wines):
     Returns:
         - list: List of unique wine types.
     """
-    types = df_wines['type'].astype(str).unique()
-    return types.tolist()
+    return category_values(df_wines, 'type')
+
+
+def build_indexes(df_wines):
+    """
+    Build the indexes used by the query helpers, so that the first
+    requests don't pay for them.
 
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+    """
+    sort_index(df_wines)
+    distinct_sort_index(df_wines)
+    build_query_indexes(df_wines)
+    catalog_facets(df_wines)
+    suggest_index(df_wines)
 
-def filter_wines(df_wines, filters):
+
+@timed('filter_wines')
+def filter_wines(df_wines, filters, limit=None, distinct=False):
     """
     Filter wines based on specified criteria.
 
+    The filters are evaluated as a single pass over the column arrays
+    and only the matching rows are materialized.
+
     Parameters:
         - df_wines (pd.DataFrame): DataFrame containing wine information.
         - filters (dict): Dictionary of filters to apply to the DataFrame.
+        - limit (int): Max number of wines to return (default is all).
+        - distinct (bool): Skip the duplicates of a wine, keyed on name,
+        winery and year (default is False).
 
     Returns:
         - pd.DataFrame: Filtered DataFrame containing wines
         that match the specified criteria.
     """
-    filtered_wines = df_wines.copy()
-    for column, value in filters.items():
-        if value and column in df_wines.columns:
-            if (
-                column == 'year' or
-                column == 'price' or
-                column == 'numberofratings' or
-                column == 'rating' and None not in value
-            ):
-                filtered_wines = filter_range(filtered_wines, column, *value)
-            else:
-                filtered_wines = filter_contains(filtered_wines, column, value)
-
-    return filtered_wines
+    return df_wines.iloc[
+        query_positions(df_wines, filters, limit, distinct=distinct)
+    ]
+
+
+def count_wines(df_wines, filters, distinct=False):
+    """
+    Count the wines matching specified criteria, without materializing
+    them.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters, as accepted by
+        filter_wines.
+        - distinct (bool): Count the duplicates of a wine once, keyed on
+        name, winery and year (default is False).
+
+    Returns:
+        - int: Number of wines filter_wines would return.
+    """
+    return query_count(df_wines, filters, distinct)
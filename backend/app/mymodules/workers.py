@@ -0,0 +1,378 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from starlette.concurrency import run_in_threadpool
+from .dataset import load_catalog_version
+from .facets import wine_facets
+from .metrics import collect_spans, record_spans, span
+from .pagination import page_positions
+from .profiler import request_profiler
+from .query import query_cache, search_positions
+from .serialization import encode_records
+from .utils import build_indexes, filter_wines
+
+
+class Overloaded(Exception):
+    """
+    Raised when a query is rejected because too many are in progress.
+
+    Attributes:
+        retry_after (int): Seconds after which the client may retry.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Overloaded, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+class QueryPool:
+    """
+    Bounded pool running the CPU-bound queries away from the event loop,
+    with admission control.
+
+    Queries run in worker processes, each holding its own copy of the
+    catalog and of its indexes, so they neither hold the GIL of the
+    server process nor wait for each other's. Workers load the catalog
+    when the pool starts, and every new version of it through load,
+    before it is served: a query runs on the exact version it was
+    admitted with, and never waits for a catalog to load. Queries on a
+    version no worker is ready to serve (e.g. while they load it, or
+    before start) run in the server's thread pool instead, with the
+    same admission control, as do profiled requests.
+
+    The spans of a query are reported by the server whichever process
+    ran it, as the 'query' span and the spans of the helpers it calls.
+
+    At most max_pending queries are admitted at once, running or
+    waiting for a worker; any other query is rejected right away with
+    Overloaded, whose retry_after estimates when the backlog will have
+    drained, rather than queued for ever longer.
+
+    Attributes:
+        workers (int): Number of worker processes (0 for none).
+        max_pending (int): Max number of queries admitted at once.
+        pending (int): Number of queries admitted and not finished.
+        rejected (int): Number of queries rejected so far.
+        worker_cache_stats (dict): Process id -> query result cache
+        counters of every worker process, as of its last query.
+    """
+
+    def __init__(self, catalog, datasets_dir, workers, max_pending):
+        """
+        Parameters:
+            - catalog (callable): Returns the catalog being served (e.g.
+            DatasetManager.current).
+            - datasets_dir (str): Directory of the CSV files, whose
+            snapshots the worker processes load.
+            - workers (int): Number of worker processes (0 for none).
+            - max_pending (int): Max number of queries admitted at once.
+        """
+        self.catalog = catalog
+        self.datasets_dir = datasets_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.worker_cache_stats = {}
+        self._seconds = None
+        self._processes = []
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the worker processes, and wait for each of them to load
+        the catalog being served.
+        """
+        if self.workers > 0 and not self._processes:
+            self._processes = [
+                _WorkerProcess() for _ in range(self.workers)
+            ]
+            self._load(self._processes, self.catalog())
+
+    def stop(self):
+        """
+        Stop the worker processes, once their running queries are
+        finished; queries still waiting for one are cancelled.
+        """
+        processes, self._processes = self._processes, []
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        for process in processes:
+            process.executor.shutdown(wait=True)
+        self.worker_cache_stats = {}
+
+    def load(self, df_wines):
+        """
+        Load a new version of the catalog into the worker processes, one
+        at a time so that the others keep serving queries meanwhile,
+        e.g. before a reload swaps it in.
+
+        Parameters:
+            - df_wines (pd.DataFrame): The catalog, loaded from the
+            snapshots of datasets_dir.
+
+        Raises:
+            - ValueError: If the worker processes can't load it.
+        """
+        for process in list(self._processes):
+            self._load([process], df_wines)
+
+    def _load(self, processes, df_wines):
+        version = df_wines.attrs.get('version')
+        if version is None:
+            return
+        for process in processes:
+            process.loading = True
+        try:
+            futures = [
+                process.executor.submit(
+                    _load_worker_catalog,
+                    self.datasets_dir,
+                    version
+                )
+                for process in processes
+            ]
+            for process, future in zip(processes, futures):
+                process.versions = future.result()
+        finally:
+            for process in processes:
+                process.loading = False
+
+    def query_cache_stats(self):
+        """
+        Get the query result cache counters of the processes running
+        the queries, summed.
+
+        Returns:
+            - dict: See QueryResultCache.stats.
+        """
+        workers = list(self.worker_cache_stats.values())
+        if not self._processes or not workers:
+            return query_cache(self.catalog()).stats()
+        return {
+            name: sum(stats[name] for stats in workers)
+            for name in workers[0]
+        }
+
+    def retry_after(self):
+        """
+        Estimate the seconds needed to drain the admitted queries, from
+        the average duration of the recent ones.
+
+        Returns:
+            - int: Seconds, at least 1.
+        """
+        seconds = self._seconds or 0.1
+        return max(1, math.ceil(
+            self.pending * seconds / max(self.workers, 1)
+        ))
+
+    async def run(self, function, *args):
+        """
+        Run function(df_wines, *args) on the catalog being served.
+
+        Parameters:
+            - function (callable): Module-level function, so that it
+            can be sent to a worker process.
+            - args: Other arguments of function (picklable).
+
+        Returns:
+            - The result of function.
+
+        Raises:
+            - Overloaded: If max_pending queries are already admitted.
+            - Exception: Any exception raised by function.
+        """
+        admitted = self.admit()
+        try:
+            df_wines = self.catalog()
+            version = df_wines.attrs.get('version')
+            process = self._pick_process(version)
+            if process is None or request_profiler() is not None:
+                return await run_in_threadpool(
+                    _run_in_thread,
+                    function,
+                    df_wines,
+                    args
+                )
+
+            future = process.executor.submit(
+                _run_in_worker,
+                version,
+                function,
+                args
+            )
+            with self._futures_lock:
+                self._futures.add(future)
+            future.add_done_callback(self._forget)
+            process.pending += 1
+            try:
+                pid, stats, spans, result = await asyncio.wrap_future(future)
+            finally:
+                process.pending -= 1
+            self.worker_cache_stats[pid] = stats
+            record_spans(spans)
+            return result
+        finally:
+            self.release(admitted)
+
+    def admit(self):
+        """
+        Admit a query run by the caller itself (e.g. a streamed export),
+        from the event loop; run admits its own queries.
+
+        Returns:
+            - float: Admission time, to pass to release once the query
+            is finished.
+
+        Raises:
+            - Overloaded: If max_pending queries are already admitted.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+        self.pending += 1
+        return time.perf_counter()
+
+    def release(self, admitted):
+        """
+        Release a query admitted with admit, from the event loop.
+
+        Parameters:
+            - admitted (float): Admission time returned by admit.
+        """
+        self.pending -= 1
+        elapsed = time.perf_counter() - admitted
+        self._seconds = elapsed if self._seconds is None else (
+            0.9 * self._seconds + 0.1 * elapsed
+        )
+
+    def _forget(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def _pick_process(self, version):
+        """
+        Get the least busy worker process holding a catalog version and
+        not loading another one, if any.
+        """
+        ready = [
+            process for process in self._processes
+            if not process.loading and version in process.versions
+        ]
+        return min(ready, key=lambda process: process.pending, default=None)
+
+
+class _WorkerProcess:
+    """
+    Worker process of a QueryPool.
+
+    Attributes:
+        executor (ProcessPoolExecutor): Runs the tasks of the process,
+        one at a time and in order.
+        versions (tuple): Catalog versions the process holds.
+        loading (bool): Whether the process is loading a catalog.
+        pending (int): Number of queries sent to it and not finished.
+    """
+
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self.versions = ()
+        self.loading = False
+        self.pending = 0
+
+
+# Catalogs of a worker process: version -> catalog, oldest first
+_worker_catalogs = {}
+# Catalog versions a worker process keeps: the one being served, and
+# the previous one for the queries admitted before a reload.
+WORKER_CATALOGS = 2
+
+
+def _load_worker_catalog(datasets_dir, version):
+    """
+    Load a version of the catalog into a worker process, unless it
+    already holds it, dropping the oldest ones past WORKER_CATALOGS.
+
+    Returns:
+        - tuple: Catalog versions held by the process.
+    """
+    if version not in _worker_catalogs:
+        df_wines = load_catalog_version(datasets_dir, version)
+        build_indexes(df_wines)
+        _worker_catalogs[version] = df_wines
+        while len(_worker_catalogs) > WORKER_CATALOGS:
+            del _worker_catalogs[next(iter(_worker_catalogs))]
+    return tuple(_worker_catalogs)
+
+
+def _run_in_worker(version, function, args):
+    """
+    Run a query in a worker process, on a catalog version it holds.
+
+    Returns:
+        - tuple: (process id, query result cache counters, spans of the
+        query, result).
+    """
+    df_wines = _worker_catalogs[version]
+    with collect_spans() as spans:
+        with span('query'):
+            result = function(df_wines, *args)
+    return os.getpid(), query_cache(df_wines).stats(), spans, result
+
+
+def _run_in_thread(function, df_wines, args):
+    """
+    Run a query in a thread of the server.
+    """
+    with span('query'):
+        return function(df_wines, *args)
+
+
+def search_query(df_wines, filters, limit, q, sort, order, cursor, columns,
+                 distinct):
+    """
+    Run an /advanced-search query, see advanced_search_wines.
+
+    Returns:
+        - tuple: (JSON array of the wines, cursor of the next page or
+        None).
+
+    Raises:
+        - ValueError: If the sort or the cursor is invalid.
+    """
+    if q is not None:
+        positions = search_positions(df_wines, q, filters, limit, distinct)
+        return encode_records(df_wines.iloc[positions], columns), None
+
+    if sort is None and cursor is None:
+        result = filter_wines(df_wines, filters, limit, distinct)
+        return encode_records(result, columns), None
+
+    positions, next_cursor = page_positions(
+        df_wines,
+        filters,
+        limit,
+        sort,
+        order,
+        cursor,
+        distinct
+    )
+    return encode_records(df_wines.iloc[positions], columns), next_cursor
+
+
+def facets_query(df_wines, filters):
+    """
+    Run a /facets query, see wine_facets.
+    """
+    return wine_facets(df_wines, filters)
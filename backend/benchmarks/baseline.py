@@ -0,0 +1,72 @@
+"""
+Reference implementations of the loader and query helpers as they
+were before the columnar catalog and query engine, used as the
+baseline by the benchmarks and as the oracle by the tests.
+"""
+
+import os
+import pandas as pd
+from app.mymodules.filter_functions import filter_contains, filter_range
+
+
+def baseline_filter_wines(df_wines, filters, limit=None):
+    """
+    Filter wines the original way: copy the whole frame, then
+    materialize a new frame after every filter.
+
+    Parameters:
+        - df_wines (pd.DataFrame): DataFrame containing wine information.
+        - filters (dict): Dictionary of filters to apply to the DataFrame.
+        - limit (int): Max number of wines to return (default is all).
+
+    Returns:
+        - pd.DataFrame: Filtered DataFrame containing wines
+        that match the specified criteria.
+    """
+    filtered_wines = df_wines.copy()
+    for column, value in filters.items():
+        if value and column in df_wines.columns:
+            if (
+                column == 'year' or
+                column == 'price' or
+                column == 'numberofratings' or
+                column == 'rating' and None not in value
+            ):
+                filtered_wines = filter_range(filtered_wines, column, *value)
+            else:
+                filtered_wines = filter_contains(filtered_wines, column, value)
+
+    if limit is not None:
+        filtered_wines = filtered_wines.head(limit)
+    return filtered_wines
+
+
+def baseline_load_wines(datasets_dir):
+    """
+    Load the catalog the original way: object-dtype text columns, and
+    the per-type frames kept alive next to the concatenated one (they
+    were module-level globals in app/main.py).
+
+    Parameters:
+        - datasets_dir (str): Directory containing the CSV files.
+
+    Returns:
+        - tuple: (df_wines, [df_red, df_rose, df_sparkling, df_white]).
+    """
+    df_red = pd.read_csv(os.path.join(datasets_dir, 'Red.csv'))
+    df_rose = pd.read_csv(os.path.join(datasets_dir, 'Rose.csv'))
+    df_sparkling = pd.read_csv(os.path.join(datasets_dir, 'Sparkling.csv'))
+    df_white = pd.read_csv(os.path.join(datasets_dir, 'White.csv'))
+
+    df_red["type"] = "red"
+    df_rose["type"] = "rose"
+    df_sparkling["type"] = "sparkling"
+    df_white["type"] = "white"
+
+    df_wines = pd.concat([df_red, df_rose, df_sparkling, df_white])
+    df_wines.columns = map(str.lower, df_wines.columns)
+    df_wines['year'] = pd.to_numeric(
+        df_wines['year'],
+        errors='coerce'
+        ).astype('Int64')
+    return df_wines, [df_red, df_rose, df_sparkling, df_white]
@@ -0,0 +1,74 @@
+"""
+Benchmark of filter_wines against the original frame-copying
+implementation (benchmarks/baseline.py).
+
+Reports mean latency and peak traced allocation per request for a
+mix of /advanced-search style queries.
+
+Usage:
+    python benchmarks/bench_filter_wines.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.utils import filter_wines
+from benchmarks.baseline import baseline_filter_wines
+
+
+df_wines = datasets.current
+QUERIES = [
+    {"type": "red"},
+    {"country": "italy", "year": (2012, 2015)},
+    {"name": "reserva", "price": (10, 40), "rating": (3.5, 5.0)},
+    {
+        "name": "pinot",
+        "type": "red",
+        "country": "france",
+        "rating": (3.0, 5.0),
+        "price": (0, 1000000),
+        "year": (1500, 2023),
+    },
+]
+LIMIT = 24
+REPEAT = 20
+
+
+def measure(function, filters):
+    function(df_wines, filters, LIMIT)
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(df_wines, filters, LIMIT)
+    elapsed = (time.perf_counter() - start) / REPEAT
+
+    tracemalloc.start()
+    function(df_wines, filters, LIMIT)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def main():
+    print(f"{'query':<60} {'impl':<8} {'ms':>8} {'peak KiB':>10}")
+    for filters in QUERIES:
+        label = ",".join(sorted(filters))
+        for name, function in (
+            ("baseline", baseline_filter_wines),
+            ("engine", filter_wines),
+        ):
+            elapsed, peak = measure(function, filters)
+            print(
+                f"{label:<60} {name:<8} "
+                f"{elapsed * 1000:>8.2f} {peak / 1024:>10.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Replay of step by step refinement sessions against query_positions,
+with and without the query result cache.
+
+Every session starts from a random wine of the catalog and narrows the
+search down towards it, as a user refining /advanced-search would:
+    type -> + country -> + price band -> + narrower band
+         -> + start of a word of the name -> + the whole word
+Sessions are replayed in order on a cold cache, once returning every
+match (as /facets and the full-text search filters do) and once with
+limit=24 (as the frontend's result page does). Results are checked
+against the uncached evaluation.
+
+Usage:
+    python benchmarks/bench_query_cache.py [--datasets DIR]
+        [--sessions N] [--seed N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.mymodules.dataset import DATASETS_DIR, load_catalog
+from app.mymodules.query import compile_filters, evaluate_predicates
+from app.mymodules.query import query_cache, query_positions
+from app.mymodules.search_index import tokenize
+from app.mymodules.utils import build_indexes
+
+
+STEPS = ['type', 'country', 'price', 'narrower', 'word start', 'word']
+
+
+def session(df_wines, row):
+    """
+    Build the refinement steps of a session leading to a wine.
+    """
+    wine = df_wines.iloc[row]
+    price = float(wine['price'])
+    words = [word for word in tokenize(str(wine['name'])) if len(word) > 4]
+    word = words[0] if words else str(wine['name'])[:5].lower()
+
+    filters = {'type': str(wine['type'])}
+    steps = [dict(filters)]
+    filters['country'] = str(wine['country'])
+    steps.append(dict(filters))
+    filters['price'] = (round(price * 0.5, 2), round(price * 2, 2))
+    steps.append(dict(filters))
+    filters['price'] = (round(price * 0.8, 2), round(price * 1.25, 2))
+    steps.append(dict(filters))
+    filters['name'] = word[:4]
+    steps.append(dict(filters))
+    filters['name'] = word
+    steps.append(dict(filters))
+    return steps
+
+
+def replay(df_wines, sessions, limit):
+    """
+    Replay sessions, every query evaluated without the cache then
+    through it, returning the seconds spent per step by both.
+    """
+    uncached = np.zeros(len(STEPS))
+    cached = np.zeros(len(STEPS))
+    for steps in sessions:
+        for step, filters in enumerate(steps):
+            start = time.perf_counter()
+            evaluate_predicates(
+                df_wines,
+                compile_filters(df_wines, filters),
+                limit,
+                0,
+                len(df_wines),
+                False
+            )
+            middle = time.perf_counter()
+            query_positions(df_wines, filters, limit)
+            uncached[step] += middle - start
+            cached[step] += time.perf_counter() - middle
+    return uncached, cached
+
+
+def check(df_wines, sessions):
+    for steps in sessions:
+        for filters in steps:
+            expected = evaluate_predicates(
+                df_wines,
+                compile_filters(df_wines, filters),
+                None,
+                0,
+                len(df_wines),
+                False
+            )
+            assert np.array_equal(
+                query_positions(df_wines, filters),
+                expected
+            ), filters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--datasets', default=DATASETS_DIR)
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df_wines = load_catalog(args.datasets)
+    build_indexes(df_wines)
+    rng = np.random.default_rng(args.seed)
+    priced = np.flatnonzero(df_wines['price'].notna().to_numpy())
+    sessions = [
+        session(df_wines, row)
+        for row in rng.choice(priced, args.sessions)
+    ]
+    cache = query_cache(df_wines)
+    print(f"{len(df_wines)} wines, {len(sessions)} sessions")
+
+    for limit in (None, 24):
+        cache.clear()
+        before = cache.stats()
+        uncached, cached = replay(df_wines, sessions, limit)
+        stats = cache.stats()
+        lookups = len(sessions) * len(STEPS)
+        hits = stats['hits'] - before['hits']
+        refinements = stats['refinements'] - before['refinements']
+
+        print()
+        print(f"limit={limit}: hit rate {hits / lookups:.0%}, "
+              f"refinement rate {refinements / lookups:.0%}, "
+              f"{stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+        print(f"{'step':<12} {'uncached ms':>12} {'cached ms':>10} "
+              f"{'speedup':>8}")
+        for name, before_ms, after_ms in zip(
+            STEPS + ['session'],
+            list(uncached * 1000 / len(sessions)) + [
+                uncached.sum() * 1000 / len(sessions)
+            ],
+            list(cached * 1000 / len(sessions)) + [
+                cached.sum() * 1000 / len(sessions)
+            ],
+        ):
+            print(f"{name:<12} {before_ms:>12.3f} {after_ms:>10.3f} "
+                  f"{before_ms / after_ms:>7.1f}x")
+
+    check(df_wines, sessions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Scaling curves of the backend on synthetic catalogs
+(benchmarks/synthetic_catalog.py).
+
+For every catalog size, in a fresh interpreter:
+    - parse:     load_wines from the CSV files, without a snapshot
+    - cold:      load_catalog writing the snapshot, then mapping it
+    - warm:      load_catalog from the up-to-date snapshot
+    - indexes:   build_indexes (sort, range, trigram and search indexes)
+    - queries:   median latency of filter_wines over a query mix,
+                 of the top-wines ranking and of a first and a deep
+                 sorted page of /advanced-search
+
+The same catalog can be load-tested through the API with
+    python benchmarks/load_test.py --datasets DIR
+
+Usage:
+    python benchmarks/bench_scaling.py [--sizes 13834,100000,1000000]
+        [--seed N] [--keep DIR] [--save results.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+from benchmarks.synthetic_catalog import generate_catalog, write_catalog
+
+
+PROBE = """
+import json, statistics, sys, time
+sys.path.insert(0, {backend_dir!r})
+from app.mymodules.dataset import load_catalog, load_wines
+from app.mymodules.pagination import encode_cursor, page_positions
+from app.mymodules.indexes import keyset_order
+from app.mymodules.utils import build_indexes, filter_wines
+from app.mymodules.utils import top_wines_by_rating
+
+QUERIES = {{
+    "text": {{"name": "reserva"}},
+    "categorical": {{"country": "italy", "type": "red"}},
+    "narrow-range": {{"price": (12.5, 12.9)}},
+    "ranges": {{"price": (10, 40), "year": (2012, 2015)}},
+    "combined": {{
+        "name": "pinot",
+        "type": "red",
+        "country": "france",
+        "rating": (3.5, 5.0),
+        "price": (10, 60),
+        "year": (2010, 2020),
+    }},
+}}
+
+
+def timed(function, repeat=1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+results = {{}}
+_, results["parse_ms"] = timed(lambda: load_wines({datasets_dir!r}, None))
+_, results["cold_ms"] = timed(lambda: load_catalog({datasets_dir!r}))
+df, results["warm_ms"] = timed(lambda: load_catalog({datasets_dir!r}))
+_, results["indexes_ms"] = timed(lambda: build_indexes(df))
+results["rows"] = len(df)
+
+for name, filters in QUERIES.items():
+    filter_wines(df, filters, 24)
+    _, results["query_" + name + "_ms"] = timed(
+        lambda: filter_wines(df, filters, 24), {repeat}
+    )
+_, results["top_wines_ms"] = timed(
+    lambda: top_wines_by_rating(df, 10), {repeat}
+)
+
+keyset = keyset_order(df, "price", False)
+middle = int(keyset["order"][len(df) // 2])
+cursor = encode_cursor(
+    "price", "asc", float(df["price"].iloc[middle]), middle
+)
+filters = {{"type": "red"}}
+_, results["first_page_ms"] = timed(
+    lambda: page_positions(df, filters, 24, "price", "asc"), {repeat}
+)
+_, results["deep_page_ms"] = timed(
+    lambda: page_positions(df, filters, 24, "price", "asc", cursor),
+    {repeat}
+)
+print(json.dumps(results))
+"""
+
+COLUMNS = ['rows', 'parse_ms', 'cold_ms', 'warm_ms', 'indexes_ms',
+           'query_text_ms', 'query_categorical_ms', 'query_narrow-range_ms',
+           'query_ranges_ms', 'query_combined_ms', 'top_wines_ms',
+           'first_page_ms', 'deep_page_ms']
+
+
+def measure(datasets_dir, repeat):
+    output = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            PROBE.format(
+                backend_dir=BACKEND_DIR,
+                datasets_dir=datasets_dir,
+                repeat=repeat
+            )
+        ],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='13834,100000,1000000')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keep',
+                        help='keep the generated catalogs in this directory')
+    parser.add_argument('--save', help='write the results to this file')
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix='wines-')
+    results = []
+    try:
+        for size in (int(size) for size in args.sizes.split(',')):
+            datasets_dir = os.path.join(root, str(size))
+            write_catalog(generate_catalog(size, args.seed), datasets_dir)
+            results.append(measure(datasets_dir, args.repeat))
+            print(' '.join(
+                f"{column}={results[-1][column]:.1f}"
+                for column in COLUMNS
+            ), flush=True)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print()
+    print(' '.join(f"{column.replace('_ms', ''):>14}" for column in COLUMNS))
+    for result in results:
+        print(' '.join(f"{result[column]:>14.1f}" for column in COLUMNS))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Microbenchmark of the response encoding: to_dict(orient='records') +
+JSONResponse against the column-wise encode_records.
+
+Usage:
+    python benchmarks/bench_serialization.py
+"""
+
+import os
+import sys
+import timeit
+from fastapi.responses import JSONResponse
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.serialization import encode_records
+
+
+df_wines = datasets.current
+SIZES = [10, 100, 1000, len(df_wines)]
+
+
+def baseline_encode(df):
+    return JSONResponse(content=df.to_dict(orient='records')).body
+
+
+def main():
+    print(f"{'rows':>6} {'baseline ms':>12} {'columns ms':>11} {'speedup':>8}")
+    for size in SIZES:
+        df = df_wines.iloc[:size]
+        assert baseline_encode(df) == encode_records(df)
+        number = max(1, 2000 // size)
+        baseline = min(timeit.repeat(
+            lambda: baseline_encode(df), number=number, repeat=5
+        )) / number
+        columns = min(timeit.repeat(
+            lambda: encode_records(df), number=number, repeat=5
+        )) / number
+        print(
+            f"{size:>6} {baseline * 1000:>12.3f} {columns * 1000:>11.3f} "
+            f"{baseline / columns:>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
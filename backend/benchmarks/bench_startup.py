@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark of the backend catalog.
+
+Times, each in a fresh interpreter:
+    - baseline: the original CSV loader (benchmarks/baseline.py)
+    - csv:      load_wines without a snapshot (parse + write snapshot)
+    - snapshot: load_wines from an up-to-date snapshot
+    - app:      importing app.main (loading + index building)
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {backend_dir!r})
+import pandas
+from app.mymodules.dataset import DATASETS_DIR, SNAPSHOT_DIR, load_wines
+from benchmarks.baseline import baseline_load_wines
+
+start = time.perf_counter()
+if {mode!r} == 'baseline':
+    baseline_load_wines(DATASETS_DIR)
+elif {mode!r} == 'app':
+    import app.main
+else:
+    load_wines(DATASETS_DIR, {snapshot_dir!r})
+print(time.perf_counter() - start)
+"""
+
+
+def run(mode, snapshot_dir=None):
+    output = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            PROBE.format(
+                backend_dir=BACKEND_DIR,
+                mode=mode,
+                snapshot_dir=snapshot_dir
+            )
+        ],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return float(output)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    timings = {'baseline': [], 'csv': [], 'snapshot': [], 'app': []}
+
+    for _ in range(runs):
+        timings['baseline'].append(run('baseline'))
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            timings['csv'].append(run('csv', snapshot_dir))
+            timings['snapshot'].append(run('snapshot', snapshot_dir))
+        timings['app'].append(run('app'))
+
+    print(f"{'mode':<10} {'median ms':>10} {'min ms':>8}")
+    for mode, values in timings.items():
+        print(
+            f"{mode:<10} {statistics.median(values) * 1000:>10.1f} "
+            f"{min(values) * 1000:>8.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
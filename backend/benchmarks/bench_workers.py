@@ -0,0 +1,96 @@
+"""
+Catalog memory across concurrently running worker processes.
+
+Starts N processes that each load the catalog, either parsed from the
+CSV files into private memory ("parsed") or memory-mapped from the
+columnar snapshot ("mapped"), and sums the growth of their proportional
+set size (PSS): pages shared by k processes count 1/k in each of them,
+so the sum is the physical memory the catalog costs for N workers.
+
+Linux only (reads /proc/self/smaps_rollup).
+
+Usage:
+    python benchmarks/bench_workers.py [max_workers]
+"""
+
+import ctypes
+import gc
+import multiprocessing
+import os
+import sys
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.mymodules.dataset import DATASETS_DIR, SNAPSHOT_DIR, load_wines
+
+
+def pss():
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def release():
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except OSError:
+        pass
+
+
+def worker(snapshot_dir, loaded, measured, results):
+    # A first load pulls in the lazily imported modules, which are not
+    # part of the catalog.
+    load_wines(DATASETS_DIR, snapshot_dir)
+    release()
+    before = pss()
+    df_wines = load_wines(DATASETS_DIR, snapshot_dir)
+    release()
+    # Touch every column, as serving requests would.
+    for column in df_wines.columns:
+        df_wines[column].to_numpy()
+    loaded.wait()
+    results.put(pss() - before)
+    measured.wait()
+
+
+def measure(workers, snapshot_dir):
+    context = multiprocessing.get_context('spawn')
+    loaded = context.Barrier(workers)
+    measured = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=worker,
+            args=(snapshot_dir, loaded, measured, results)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    total = sum(results.get(timeout=120) for _ in processes)
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    load_wines(DATASETS_DIR, SNAPSHOT_DIR)
+
+    print(f"{'workers':>7} {'parsed MiB':>11} {'mapped MiB':>11}")
+    workers = 1
+    while workers <= max_workers:
+        parsed = measure(workers, None)
+        mapped = measure(workers, SNAPSHOT_DIR)
+        print(
+            f"{workers:>7} {parsed / 2 ** 20:>11.1f} "
+            f"{mapped / 2 ** 20:>11.1f}"
+        )
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
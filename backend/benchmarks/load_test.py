@@ -0,0 +1,434 @@
+"""
+Load test of the backend API.
+
+Drives every route of app.main with a weighted, randomized mix of
+requests (including text, range and combined /advanced-search
+filters), either in-process through the httpx ASGI transport or over
+HTTP against a local uvicorn server, and reports per route:
+    - p50/p95/p99 latency and the number of requests
+    - peak traced allocation per request (in-process only)
+and the overall throughput.
+
+Results can be saved as a JSON baseline, and a later run compared
+against it: routes whose p95 latency regressed by more than the
+threshold are listed and the script exits with status 1.
+
+Usage:
+    python benchmarks/load_test.py [--mode inprocess|uvicorn|both]
+        [--requests N] [--concurrency N] [--workers N] [--seed N]
+        [--no-cache] [--datasets DIR] [--save results.json]
+        [--compare baseline.json] [--threshold 0.25]
+
+--datasets serves the CSV files of another directory, e.g. a
+synthetic catalog from benchmarks/synthetic_catalog.py.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+NAMES = ['reserva', 'pinot', 'rosso', 'cabernet', 'brut', 'riesling',
+         'chianti', 'merlot', 'blanc', 'gran']
+COUNTRIES = ['Italy', 'France', 'Spain', 'Portugal', 'Germany',
+             'United States', 'Argentina', 'South Africa']
+TYPES = ['red', 'white', 'rose', 'sparkling']
+REGIONS = ['toscana', 'bordeaux', 'rioja', 'piemonte', 'mendoza']
+SORTS = ['rating', 'price', 'year', 'numberofratings']
+
+# Noise floor under which a p95 difference is never a regression.
+MIN_REGRESSION_MS = 0.5
+# Admin token of the tested server, sent along with every request.
+ADMIN_TOKEN = 'load-test'
+
+
+def price_band(rng):
+    low = round(rng.uniform(5, 80), 2)
+    return {"price_start": low, "price_end": round(low * 1.5, 2)}
+
+
+def year_band(rng):
+    start = rng.randint(1990, 2018)
+    return {"year_start": start, "year_end": start + rng.randint(1, 5)}
+
+
+def rating_band(rng):
+    start = round(rng.uniform(3.0, 4.4), 1)
+    return {"rating_start": start, "rating_end": 5.0}
+
+
+# name, weight, method, path, query parameters factory
+SCENARIOS = [
+    ('root', 1, 'GET', '/', lambda rng: {}),
+    ('top-wines', 6, 'GET', '/top-wines',
+     lambda rng: {"limit": rng.choice([6, 10, 24])}),
+    ('most-recent-wines', 4, 'GET', '/most-recent-wines',
+     lambda rng: {"limit": rng.choice([6, 10, 24])}),
+    ('least-recent-wines', 4, 'GET', '/least-recent-wines',
+     lambda rng: {"limit": rng.choice([6, 10, 24])}),
+    ('rankings', 6, 'GET', '/rankings',
+     lambda rng: {"lists": "top,recent,oldest", "limit": 6}),
+    ('countries', 2, 'GET', '/countries', lambda rng: {}),
+    ('types', 2, 'GET', '/types', lambda rng: {}),
+    ('search-text', 8, 'GET', '/advanced-search',
+     lambda rng: {"name": rng.choice(NAMES), "limit": 24}),
+    ('search-categorical', 6, 'GET', '/advanced-search',
+     lambda rng: {
+         "type": rng.choice(TYPES),
+         "country": rng.choice(COUNTRIES),
+         "limit": 24,
+     }),
+    ('search-range', 8, 'GET', '/advanced-search',
+     lambda rng: {**price_band(rng), **year_band(rng), "limit": 24}),
+    ('search-combined', 10, 'GET', '/advanced-search',
+     lambda rng: {
+         "name": rng.choice(NAMES),
+         "type": rng.choice(TYPES),
+         "country": rng.choice(COUNTRIES),
+         **rating_band(rng),
+         **price_band(rng),
+         **year_band(rng),
+         "limit": 24,
+     }),
+    ('search-region', 3, 'GET', '/advanced-search',
+     lambda rng: {"region": rng.choice(REGIONS), "limit": 24}),
+    ('search-sorted', 4, 'GET', '/advanced-search',
+     lambda rng: {
+         "type": rng.choice(TYPES),
+         "sort": rng.choice(SORTS),
+         "order": rng.choice(['asc', 'desc']),
+         "limit": 24,
+     }),
+    ('export-ndjson', 1, 'GET', '/export',
+     lambda rng: {"country": rng.choice(COUNTRIES), "type": "red"}),
+    ('export-csv', 1, 'GET', '/export',
+     lambda rng: {"region": rng.choice(REGIONS), "format": "csv"}),
+    ('cache-stats', 1, 'GET', '/cache-stats', lambda rng: {}),
+    ('admin-version', 1, 'GET', '/admin/version', lambda rng: {}),
+    ('admin-reload', 1, 'POST', '/admin/reload', lambda rng: {}),
+]
+
+
+def build_requests(count, seed):
+    """
+    Draw a reproducible sequence of requests from the scenarios.
+
+    Every scenario appears at least once; the rest follows the weights.
+
+    Returns:
+        - list: (scenario name, method, path, params) tuples.
+    """
+    rng = random.Random(seed)
+    weights = [scenario[1] for scenario in SCENARIOS]
+    picked = list(SCENARIOS) + rng.choices(
+        SCENARIOS,
+        weights=weights,
+        k=max(0, count - len(SCENARIOS))
+    )
+    rng.shuffle(picked)
+    return [
+        (name, method, path, params(rng))
+        for name, _, method, path, params in picked
+    ]
+
+
+async def drive(client, requests, concurrency):
+    """
+    Send the requests with at most concurrency of them in flight.
+
+    Returns:
+        - tuple: (latencies in seconds keyed by scenario, wall time).
+    """
+    latencies = {}
+    queue = iter(requests)
+
+    async def worker():
+        for name, method, path, params in queue:
+            start = time.perf_counter()
+            response = await client.request(method, path, params=params)
+            await response.aread()
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"{method} {path} {params}: {response.status_code}"
+                )
+            latencies.setdefault(name, []).append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def measure_allocations(client, requests, clear_cache,
+                              per_scenario=20):
+    """
+    Measure the peak traced allocation of requests sent one at a time,
+    with the response cache cleared before each of them.
+
+    Returns:
+        - dict: Mean peak allocation in KiB keyed by scenario.
+    """
+    peaks = {}
+    for name, method, path, params in requests:
+        if len(peaks.get(name, [])) >= per_scenario:
+            continue
+        clear_cache()
+        tracemalloc.start()
+        try:
+            response = await client.request(method, path, params=params)
+            await response.aread()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.setdefault(name, []).append(peak / 1024)
+    return {name: float(np.mean(values)) for name, values in peaks.items()}
+
+
+def summarize(latencies, wall, allocations=None):
+    """
+    Summarize latencies (and allocations) per scenario.
+
+    Returns:
+        - dict: Overall figures and per-scenario statistics.
+    """
+    scenarios = {}
+    for name in sorted(latencies):
+        values = np.array(latencies[name]) * 1000
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        scenarios[name] = {
+            "requests": len(values),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+        }
+        if allocations and name in allocations:
+            scenarios[name]["alloc_kib"] = round(allocations[name], 1)
+
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "requests": total,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(total / wall, 1),
+        "scenarios": scenarios,
+    }
+
+
+async def run_inprocess(requests, warmup, concurrency, cache=True):
+    # Without the lifespan, the app does not start its dataset watcher.
+    from app import main
+    from app.main import app, datasets, response_cache
+
+    main.ADMIN_TOKEN = ADMIN_TOKEN
+    if not cache:
+        response_cache.max_bytes = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url='http://backend',
+        headers={'X-Admin-Token': ADMIN_TOKEN}
+    ) as client:
+        await drive(client, warmup, concurrency)
+        latencies, wall = await drive(client, requests, concurrency)
+        allocations = await measure_allocations(
+            client,
+            requests,
+            response_cache.clear
+        )
+    summary = summarize(latencies, wall, allocations)
+    summary["rows"] = len(datasets.current)
+    return summary
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(requests, warmup, concurrency, workers):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'uvicorn', 'app.main:app',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning',
+        ],
+        cwd=BACKEND_DIR,
+        env={
+            **os.environ,
+            'WINES_WATCH_INTERVAL': '0',
+            'ADMIN_TOKEN': ADMIN_TOKEN
+        }
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f'http://127.0.0.1:{port}',
+            limits=httpx.Limits(max_connections=concurrency),
+            headers={'X-Admin-Token': ADMIN_TOKEN},
+            timeout=60
+        ) as client:
+            deadline = time.monotonic() + 120
+            while True:
+                try:
+                    version = await client.get('/admin/version')
+                    break
+                except httpx.TransportError:
+                    if (
+                        server.poll() is not None or
+                        time.monotonic() > deadline
+                    ):
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.2)
+
+            await drive(client, warmup, concurrency)
+            latencies, wall = await drive(client, requests, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary = summarize(latencies, wall)
+    summary["rows"] = version.json()["rows"]
+    summary["workers"] = workers
+    return summary
+
+
+def compare(results, baseline, threshold):
+    """
+    List the routes whose p95 latency regressed against a baseline.
+
+    Returns:
+        - list: (mode, scenario, baseline p95, current p95) tuples.
+    """
+    regressions = []
+    for mode, summary in results["modes"].items():
+        reference = baseline.get("modes", {}).get(mode)
+        if reference is None:
+            continue
+        for name, stats in summary["scenarios"].items():
+            before = reference["scenarios"].get(name)
+            if before is None:
+                continue
+            if (
+                stats["p95_ms"] > before["p95_ms"] * (1 + threshold) and
+                stats["p95_ms"] - before["p95_ms"] > MIN_REGRESSION_MS
+            ):
+                regressions.append(
+                    (mode, name, before["p95_ms"], stats["p95_ms"])
+                )
+    return regressions
+
+
+def print_summary(mode, summary, reference=None):
+    print(
+        f"\n{mode}: {summary['requests']} requests over "
+        f"{summary['rows']} wines, {summary['throughput_rps']} req/s"
+    )
+    print(
+        f"{'route':<20} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'KiB':>8} {'p95 vs base':>12}"
+    )
+    for name, stats in summary["scenarios"].items():
+        change = ''
+        if reference and name in reference["scenarios"]:
+            before = reference["scenarios"][name]["p95_ms"]
+            change = f"{(stats['p95_ms'] / before - 1) * 100:+.0f}%"
+        print(
+            f"{name:<20} {stats['requests']:>6} {stats['p50_ms']:>8.2f} "
+            f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+            f"{stats.get('alloc_kib', float('nan')):>8.1f} {change:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--mode', default='inprocess',
+                        choices=['inprocess', 'uvicorn', 'both'])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='uvicorn worker processes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='disable the response cache (in-process only)')
+    parser.add_argument('--datasets',
+                        help='directory of the CSV files to serve')
+    parser.add_argument('--save', help='write the results to this file')
+    parser.add_argument('--compare', help='baseline results to compare to')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='tolerated relative p95 increase')
+    args = parser.parse_args()
+
+    if args.datasets:
+        # Read by app.main, in-process and in the uvicorn server.
+        os.environ['WINES_DATASETS_DIR'] = os.path.abspath(args.datasets)
+
+    requests = build_requests(args.requests, args.seed)
+    # Drawn from another seed, so that warming up does not pre-fill the
+    # response cache with the measured requests.
+    warmup = build_requests(args.warmup, args.seed + 1)
+    modes = ['inprocess', 'uvicorn'] if args.mode == 'both' else [args.mode]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "cache": not args.no_cache,
+        "datasets": args.datasets,
+        "modes": {},
+    }
+    for mode in modes:
+        if mode == 'inprocess':
+            summary = asyncio.run(run_inprocess(
+                requests, warmup, args.concurrency, not args.no_cache
+            ))
+        else:
+            summary = asyncio.run(run_uvicorn(
+                requests, warmup, args.concurrency, args.workers
+            ))
+        results["modes"][mode] = summary
+        print_summary(
+            mode,
+            summary,
+            baseline and baseline.get("modes", {}).get(mode)
+        )
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for mode, name, before, after in regressions:
+            print(
+                f"REGRESSION {mode} {name}: p95 {before:.2f} -> "
+                f"{after:.2f} ms"
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
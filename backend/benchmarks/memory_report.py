@@ -0,0 +1,92 @@
+"""
+Memory report of the wine catalog: original loader vs dictionary-encoded
+columns.
+
+Each loader runs in a fresh interpreter, so that the reported resident
+set size (RSS) growth only covers that loader. RSS is linux-only
+(/proc/self/status); elsewhere only the DataFrame sizes are meaningful.
+
+Usage:
+    python benchmarks/memory_report.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROBE = """
+import ctypes, gc, json, sys
+sys.path.insert(0, {backend_dir!r})
+
+
+def release():
+    # Hand freed heap pages back to the OS, so RSS reflects live data.
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except OSError:
+        pass
+
+
+def rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+import pandas as pd
+from app.mymodules.dataset import DATASETS_DIR, load_wines
+from benchmarks.baseline import baseline_load_wines
+
+release()
+before = rss()
+if {mode!r} == 'baseline':
+    df_wines, frames = baseline_load_wines(DATASETS_DIR)
+    frames_bytes = sum(
+        int(df.memory_usage(deep=True).sum()) for df in frames
+    )
+else:
+    df_wines = load_wines(DATASETS_DIR)
+    frames_bytes = 0
+release()
+print(json.dumps({{
+    'rss': rss() - before,
+    'frame': int(df_wines.memory_usage(deep=True).sum()),
+    'per_type_frames': frames_bytes,
+}}))
+"""
+
+
+def measure(mode):
+    output = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            PROBE.format(backend_dir=BACKEND_DIR, mode=mode)
+        ],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    print(f"{'loader':<10} {'RSS MiB':>9} {'df_wines MiB':>13} "
+          f"{'per-type MiB':>13}")
+    for mode in ('baseline', 'encoded'):
+        report = measure(mode)
+        print(
+            f"{mode:<10} {report['rss'] / 2 ** 20:>9.1f} "
+            f"{report['frame'] / 2 ** 20:>13.1f} "
+            f"{report['per_type_frames'] / 2 ** 20:>13.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Synthetic wine catalogs of any size, statistically similar to the
+bundled one, written as the same per-type CSV files.
+
+Every synthetic wine starts from a wine of the bundled catalog drawn
+at random within its type (so type shares, the joint distribution of
+rating, number of ratings, price and year, the share of N.V. years
+per type and the country/region pairs all follow the real catalog),
+then gets:
+    - its rating, number of ratings and price jittered
+    - its year shifted by up to a year (N.V. wines stay N.V.)
+    - one of several variants of its winery and of its name, so that
+      the number of wineries and of names grows with the catalog like
+      in a real one (wineries ~ rows^0.8, names ~ rows^0.9), while
+      countries and regions keep their real cardinality.
+
+Usage:
+    python benchmarks/synthetic_catalog.py ROWS OUT_DIR [--seed N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.mymodules.dataset import DATASETS_DIR, WINE_FILES, read_wines
+
+
+CSV_COLUMNS = ['Name', 'Country', 'Region', 'Winery', 'Rating',
+               'NumberOfRatings', 'Price', 'Year']
+
+WINERY_SUFFIXES = ['Estate', 'Vineyards', 'Cellars', 'Family Wines',
+                   'Domaine', 'Heritage', 'Collection', 'Wine Co.']
+NAME_SUFFIXES = ['Reserve', 'Selection', 'Cuvée', 'Old Vines',
+                 'Single Vineyard', 'Classic', 'Limited', 'Grand Cru']
+
+
+def variants(base, scale, exponent, suffixes, rng):
+    """
+    Spread rows over variants of their base value, so that the number
+    of distinct values grows like len(base) * scale ** exponent.
+
+    Variant 0 is the base value itself; the others append a suffix
+    (and a number once the suffixes run out).
+
+    Parameters:
+        - base (np.ndarray): Base value of every row (strings).
+        - scale (float): Ratio of the catalog size to the real one.
+        - exponent (float): Growth exponent of the cardinality.
+        - suffixes (list): Suffixes naming the variants.
+        - rng (np.random.Generator): Random generator.
+
+    Returns:
+        - np.ndarray: Value of every row.
+    """
+    count = max(1, math.ceil(scale ** exponent))
+    variant = rng.integers(0, count, size=len(base))
+    if count == 1:
+        return base
+
+    codes, uniques = pd.factorize(base)
+    pairs, first = np.unique(codes * count + variant, return_index=True)
+    names = []
+    for pair in pairs:
+        value = uniques[pair // count]
+        k = pair % count
+        if k:
+            value = f"{value} {suffixes[(k - 1) % len(suffixes)]}"
+            if k > len(suffixes):
+                value = f"{value} {(k - 1) // len(suffixes) + 1}"
+        names.append(value)
+    return np.array(names, dtype=object)[
+        np.searchsorted(pairs, codes * count + variant)
+    ]
+
+
+def generate_catalog(rows, seed=0, source_dir=DATASETS_DIR):
+    """
+    Generate a synthetic wine catalog.
+
+    Parameters:
+        - rows (int): Number of wines to generate.
+        - seed (int): Seed of the random generator.
+        - source_dir (str): Directory of the real CSV files to imitate.
+
+    Returns:
+        - dict: Wine type -> DataFrame with the CSV columns.
+    """
+    rng = np.random.default_rng(seed)
+    real = read_wines(source_dir).reset_index(drop=True)
+    scale = rows / len(real)
+    shares = real['type'].value_counts(normalize=True)
+
+    catalog = {}
+    for wine_type in WINE_FILES:
+        source = real[real['type'] == wine_type]
+        count = int(round(rows * shares.get(wine_type, 0)))
+        sample = source.iloc[rng.integers(0, len(source), size=count)]
+
+        rating = np.clip(
+            np.round(
+                sample['rating'].to_numpy() + rng.normal(0, 0.1, count),
+                1
+            ),
+            1.0,
+            5.0
+        )
+        number_of_ratings = np.maximum(
+            25,
+            np.round(
+                sample['numberofratings'].to_numpy() *
+                np.exp(rng.normal(0, 0.3, count))
+            )
+        ).astype(np.int64)
+        price = np.maximum(
+            1.0,
+            np.round(
+                sample['price'].to_numpy() *
+                np.exp(rng.normal(0, 0.15, count)),
+                2
+            )
+        )
+
+        year = sample['year'].to_numpy(dtype='float64', na_value=np.nan)
+        year = np.minimum(
+            year + rng.choice([-1, 0, 1], size=count, p=[0.2, 0.6, 0.2]),
+            np.nanmax(real['year'].to_numpy(dtype='float64', na_value=np.nan))
+        )
+        year_text = np.where(
+            np.isnan(year),
+            'N.V.',
+            np.nan_to_num(year).astype(np.int64).astype(str)
+        ).astype(object)
+
+        stems = sample['name'].str.replace(
+            r'\s+(\d{4}|N\.V\.)$', '', regex=True
+        ).to_numpy(dtype=object)
+        names = variants(stems, scale, 0.9, NAME_SUFFIXES, rng)
+
+        catalog[wine_type] = pd.DataFrame({
+            'Name': names + ' ' + year_text,
+            'Country': sample['country'].to_numpy(),
+            'Region': sample['region'].to_numpy(),
+            'Winery': variants(
+                sample['winery'].to_numpy(dtype=object),
+                scale,
+                0.8,
+                WINERY_SUFFIXES,
+                rng
+            ),
+            'Rating': rating,
+            'NumberOfRatings': number_of_ratings,
+            'Price': price,
+            'Year': year_text,
+        }, columns=CSV_COLUMNS)
+    return catalog
+
+
+def write_catalog(catalog, out_dir):
+    """
+    Write a catalog as per-type CSV files, named like the bundled ones.
+
+    Parameters:
+        - catalog (dict): Wine type -> DataFrame, see generate_catalog.
+        - out_dir (str): Directory to write the CSV files to.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for wine_type, file_name in WINE_FILES.items():
+        catalog[wine_type].to_csv(
+            os.path.join(out_dir, file_name),
+            index=False
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('out_dir')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_catalog(generate_catalog(args.rows, args.seed), args.out_dir)
+    print(args.out_dir)
+
+
+if __name__ == '__main__':
+    main()
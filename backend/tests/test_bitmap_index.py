@@ -0,0 +1,98 @@
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.bitmap_index import BitmapIndex, bitmap_from_mask
+from app.mymodules.bitmap_index import bitmap_positions, bits_at
+from app.mymodules.bitmap_index import empty_bitmap, popcount, set_bits
+from app.mymodules.query import bitmap_index, query_cache, query_count
+from app.mymodules.utils import count_wines, filter_wines
+from benchmarks.baseline import baseline_filter_wines
+
+
+df_wines = datasets.current
+
+
+def test_bitmap_operations_match_masks():
+    rng = np.random.default_rng(0)
+    for n_rows, share in ((1000, 0.002), (1000, 0.5), (130, 0.3), (64, 1)):
+        mask = rng.random(n_rows) < share
+        positions = np.flatnonzero(mask)
+
+        words = set_bits(empty_bitmap(n_rows), rng.permutation(positions))
+
+        assert np.array_equal(words, bitmap_from_mask(mask))
+        assert popcount(words) == len(positions)
+        assert bitmap_positions(words, n_rows).tolist() == positions.tolist()
+        assert bitmap_positions(words, n_rows, 70, 90).tolist() == \
+            positions[(positions >= 70) & (positions < 90)].tolist()
+        assert bitmap_positions(words, n_rows, 90, 70).tolist() == []
+        probe = rng.integers(0, n_rows, 50)
+        assert bits_at(words, probe).tolist() == mask[probe].tolist()
+
+
+def test_bitmap_index_containers():
+    codes = np.array([0] * 60 + [1, 2, -1, 1] * 10)
+    index = BitmapIndex(codes, 4)
+
+    assert set(index.dense) == {0, 1, 2}
+    assert index.rows(3).tolist() == []
+    assert index.count([1, 2]) == 30
+    for matching in ([0], [1, 3], [0, 1, 2], []):
+        expected = np.flatnonzero(np.isin(codes, matching))
+        assert bitmap_positions(
+            index.bitmap(matching),
+            len(codes)
+        ).tolist() == expected.tolist()
+        assert index.select(matching).tolist() == expected.tolist()
+
+    sparse = BitmapIndex(np.arange(1000) % 100, 100)
+    assert sparse.dense == {}
+    assert bitmap_positions(sparse.bitmap([3, 97]), 1000).tolist() == \
+        np.flatnonzero(np.isin(np.arange(1000) % 100, [3, 97])).tolist()
+    assert sparse.select([3, 97]).tolist() == \
+        np.flatnonzero(np.isin(np.arange(1000) % 100, [3, 97])).tolist()
+
+
+def test_bitmap_index_of_the_catalog():
+    index = bitmap_index(df_wines, "country")
+    codes = df_wines["country"].cat.codes.to_numpy()
+    italy = list(df_wines["country"].cat.categories).index("Italy")
+
+    assert italy in index.dense
+    assert bitmap_positions(index.bitmap([italy]), len(df_wines)).tolist() \
+        == np.flatnonzero(codes == italy).tolist()
+
+
+def test_categorical_filters_match_baseline():
+    query_cache(df_wines).clear()
+    for filters in [
+        {"type": "RED"},
+        {"country": "ital", "type": "red"},
+        {"region": "toscana", "winery": "castell"},
+        {"country": "a", "type": "e"},
+        {"country": "france", "price": (12.5, 12.9)},
+        {"country": "france", "price": (5, 500), "year": (2000, 2020)},
+        {"winery": "estate", "rating": (4.0, 5.0), "name": "reserve"},
+        {"country": "nowhere"},
+    ]:
+        result = filter_wines(df_wines, filters)
+        expected = baseline_filter_wines(df_wines, filters)
+
+        assert result.equals(expected), filters
+        assert count_wines(df_wines, filters) == len(expected), filters
+        assert filter_wines(df_wines, filters, 5).equals(expected.head(5))
+
+
+def test_query_count_distinct():
+    for filters in [
+        {"country": "United States"},
+        {"country": "Austria", "type": "white"},
+        {"country": "Austria", "year": (2010, 2015)},
+    ]:
+        assert query_count(df_wines, filters, distinct=True) == len(
+            filter_wines(df_wines, filters, distinct=True)
+        ), filters
@@ -0,0 +1,122 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, response_cache
+from app.mymodules.cache import ResponseCache, normalize_query
+
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3, 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "bytes": 20,
+    }
+
+
+def test_cache_is_bounded_in_bytes():
+    cache = ResponseCache(max_bytes=25)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    cache.put("c", 3, 10)
+    cache.put("huge", 4, 26)
+
+    assert cache.get("a") is None
+    assert cache.get("huge") is None
+    assert cache.stats()["bytes"] == 20
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, clock=clock)
+    cache.put("a", 1, 10)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_query_normalization_ignores_parameter_order():
+    assert normalize_query(b"type=red&limit=5") == normalize_query(
+        b"limit=5&type=red"
+    )
+    assert normalize_query(b"limit=5") != normalize_query(b"limit=6")
+
+
+def test_endpoints_are_served_from_cache():
+    response_cache.clear()
+    before = response_cache.stats()
+
+    first = client.get("/advanced-search?type=red&country=Italy&limit=3")
+    second = client.get("/advanced-search?country=Italy&limit=3&type=red")
+    other = client.get("/advanced-search?type=red&limit=3")
+
+    stats = client.get("/cache-stats").json()
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert other.content != first.content
+    assert second.headers["content-type"] == "application/json"
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_errors_are_not_cached():
+    response_cache.clear()
+
+    assert client.get("/top-wines?limit=abc").status_code == 422
+    assert client.get("/top-wines?limit=abc").status_code == 422
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_catalog_responses_carry_validators():
+    response = client.get("/top-wines?limit=3")
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"')
+    assert "max-age" in response.headers["cache-control"]
+    assert client.get("/top-wines?limit=4").headers["etag"] != (
+        response.headers["etag"]
+    )
+
+
+def test_conditional_get_answers_not_modified():
+    etag = client.get("/types").headers["etag"]
+
+    not_modified = client.get("/types", headers={"If-None-Match": etag})
+    weak = client.get("/types", headers={"If-None-Match": f'"x", W/{etag}'})
+    stale = client.get("/types", headers={"If-None-Match": '"stale"'})
+
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+    assert weak.status_code == 304
+    assert stale.status_code == 200
+    assert stale.json() == ["red", "rose", "sparkling", "white"]
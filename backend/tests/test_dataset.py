@@ -0,0 +1,132 @@
+import os
+import shutil
+import sys
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules import dataset
+from app.mymodules.dataset import DATASETS_DIR, build_snapshot, load_wines
+from app.mymodules.dataset import read_wines
+from app.mymodules.encoding import CATEGORY_COLUMNS, is_categorical
+from app.mymodules.utils import (
+    countries_df,
+    filter_wines,
+    top_wines_by_rating,
+    types_df
+)
+from benchmarks.baseline import baseline_filter_wines
+
+
+df_wines = datasets.current
+
+
+def test_catalog_columns_are_dictionary_encoded():
+    df_plain = read_wines(DATASETS_DIR)
+
+    for column in CATEGORY_COLUMNS:
+        assert is_categorical(df_wines[column])
+        assert (
+            df_wines[column].astype(str).tolist() ==
+            df_plain[column].tolist()
+        )
+
+
+def test_countries_and_types_come_from_category_dictionary():
+    df_plain = read_wines(DATASETS_DIR)
+
+    assert countries_df(df_wines) == df_plain['country'].unique().tolist()
+    assert types_df(df_wines) == ["red", "rose", "sparkling", "white"]
+
+
+def test_categorical_filters_match_baseline():
+    for filters in (
+        {"type": "red"},
+        {"country": "Italy", "type": "white"},
+        {"region": "bordeaux", "price": (10, 50)},
+        {"winery": "ch", "country": "fr"},
+        {"country": "atlantis"},
+    ):
+        result = filter_wines(df_wines, filters)
+        expected = baseline_filter_wines(df_wines, filters)
+
+        assert result.equals(expected)
+
+
+def test_snapshot_round_trip(tmp_path):
+    df_parsed = load_wines(DATASETS_DIR, snapshot_dir=None)
+    df_loaded = load_wines(DATASETS_DIR, snapshot_dir=str(tmp_path))
+    df_snapshot = load_wines(DATASETS_DIR, snapshot_dir=str(tmp_path))
+
+    assert os.listdir(tmp_path) == [df_parsed.attrs['version']]
+    for df in (df_loaded, df_snapshot):
+        assert df.equals(df_parsed)
+        assert (df.dtypes == df_parsed.dtypes).all()
+        assert df.index.equals(df_parsed.index)
+        assert df.attrs == df_parsed.attrs
+
+
+def test_snapshot_is_rebuilt_when_csv_changes(tmp_path):
+    datasets_dir = tmp_path / "datasets"
+    snapshot_dir = tmp_path / "snapshot"
+    shutil.copytree(DATASETS_DIR, datasets_dir, ignore=shutil.ignore_patterns(
+        ".snapshot"
+    ))
+    old = load_wines(str(datasets_dir), str(snapshot_dir))
+
+    with open(datasets_dir / "Rose.csv", "a") as f:
+        f.write("Test Rose 2020,Italy,Toscana,Test Winery,4.9,100,9.5,2020\n")
+    new = load_wines(str(datasets_dir), str(snapshot_dir))
+
+    assert new.attrs['version'] != old.attrs['version']
+    assert len(new) == len(old) + 1
+    assert "Test Rose 2020" in new['name'].tolist()
+    assert os.listdir(snapshot_dir) == [new.attrs['version']]
+
+
+def test_snapshot_columns_are_shared_read_only_maps(tmp_path):
+    df_parsed = load_wines(DATASETS_DIR, snapshot_dir=None)
+    df_mapped = load_wines(DATASETS_DIR, snapshot_dir=str(tmp_path))
+
+    assert not df_mapped['rating'].to_numpy().flags.writeable
+    assert not df_mapped['country'].cat.codes.to_numpy().flags.writeable
+
+    filters = {"country": "italy", "price": (10, 30), "name": "rosso"}
+    assert filter_wines(df_mapped, filters).equals(
+        filter_wines(df_parsed, filters)
+    )
+    assert top_wines_by_rating(df_mapped, 20).equals(
+        top_wines_by_rating(df_parsed, 20)
+    )
+    assert countries_df(df_mapped) == countries_df(df_parsed)
+
+
+def test_snapshot_written_by_a_sibling_is_kept(tmp_path, monkeypatch):
+    # A sibling worker finishes its snapshot while this one parses.
+    parse_wines = dataset.parse_wines
+    written = []
+
+    def parse_slowly(datasets_dir):
+        monkeypatch.setattr(dataset, 'parse_wines', parse_wines)
+        path = build_snapshot(datasets_dir, str(tmp_path))
+        written.append(os.stat(os.path.join(path, 'meta.json')).st_ino)
+        return parse_wines(datasets_dir)
+
+    monkeypatch.setattr(dataset, 'parse_wines', parse_slowly)
+    df_mapped = load_wines(DATASETS_DIR, snapshot_dir=str(tmp_path))
+    path = os.path.join(tmp_path, df_mapped.attrs['version'])
+
+    assert build_snapshot(DATASETS_DIR, str(tmp_path)) == path
+    assert os.stat(os.path.join(path, 'meta.json')).st_ino == written[0]
+    assert not df_mapped['rating'].to_numpy().flags.writeable
+
+
+def test_unreadable_snapshot_is_replaced(tmp_path):
+    version = load_wines(DATASETS_DIR, snapshot_dir=None).attrs['version']
+    os.makedirs(tmp_path / version)
+    (tmp_path / version / "meta.json").write_text("{")
+
+    df_loaded = load_wines(DATASETS_DIR, snapshot_dir=str(tmp_path))
+
+    assert not df_loaded['rating'].to_numpy().flags.writeable
+    assert os.listdir(tmp_path) == [version]
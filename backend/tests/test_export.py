@@ -0,0 +1,66 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import io
+import json
+import pandas as pd
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.export import export_chunks
+from app.mymodules.utils import filter_wines
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def test_export_ndjson():
+    params = {"type": "red", "country": "Italy"}
+    response = client.get("/export", params=params)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    wines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(wines) == len(filter_wines(
+        df_wines,
+        {"type": "red", "country": "Italy"}
+    ))
+    assert wines[:5] == json.loads(client.get("/advanced-search", params={
+        **params,
+        "limit": 5,
+    }).text)
+
+
+def test_export_csv():
+    response = client.get("/export", params={
+        "name": "reserva",
+        "format": "csv",
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    wines = pd.read_csv(io.StringIO(response.text))
+    expected = filter_wines(df_wines, {"name": "reserva"})
+    assert list(wines.columns) == list(df_wines.columns)
+    assert wines["name"].tolist() == expected["name"].tolist()
+
+
+def test_export_is_chunked():
+    filters = {"price": (10, 20)}
+    chunks = list(export_chunks(df_wines, filters, block_rows=1000))
+
+    assert len(chunks) > 1
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == (
+        filter_wines(df_wines, filters)["name"].tolist()
+    )
+
+
+def test_export_unknown_format():
+    response = client.get("/export", params={"format": "xml"})
+
+    assert response.status_code == 422
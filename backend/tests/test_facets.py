@@ -0,0 +1,91 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import json
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.facets import PRICE_BUCKETS, PRICE_LABELS, wine_facets
+from app.mymodules.utils import filter_wines
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+FILTERS = {
+    "name": "rosso",
+    "country": "italy",
+    "type": "red",
+    "price": (5, 60),
+    "year": (2010, 2018),
+}
+
+
+def without(column):
+    return {c: v for c, v in FILTERS.items() if c != column}
+
+
+def test_total_counts_every_filter():
+    facets = wine_facets(df_wines, FILTERS)
+
+    assert facets["total"] == len(filter_wines(df_wines, FILTERS))
+
+
+def test_category_facets_ignore_their_own_filter():
+    facets = wine_facets(df_wines, FILTERS)
+
+    for facet in ("country", "type", "region"):
+        expected = filter_wines(df_wines, without(facet))[facet].astype(
+            str
+        ).value_counts()
+        assert facets[facet] == expected.to_dict()
+
+
+def test_bucket_facets_ignore_their_own_filter():
+    facets = wine_facets(df_wines, FILTERS)
+
+    prices = filter_wines(df_wines, without("price"))["price"]
+    expected = pd.cut(
+        prices,
+        list(PRICE_BUCKETS) + [np.inf],
+        right=False,
+        labels=PRICE_LABELS
+    ).value_counts()
+    assert facets["price"] == {
+        label: int(expected[label]) for label in PRICE_LABELS
+    }
+
+    years = filter_wines(df_wines, without("year"))["year"]
+    assert facets["year"]["N.V."] == int(years.isna().sum())
+    assert facets["year"]["2015-2019"] == int(
+        years.between(2015, 2019).sum()
+    )
+
+
+def test_facets_without_filters_cover_catalog():
+    facets = wine_facets(df_wines, {})
+
+    assert facets["total"] == len(df_wines)
+    assert list(facets["type"]) == ["red", "rose", "sparkling", "white"]
+    assert sum(facets["country"].values()) == len(df_wines)
+    assert sum(facets["price"].values()) == len(df_wines)
+    assert sum(facets["year"].values()) == len(df_wines)
+
+
+def test_facets_endpoint():
+    response = client.get("/facets", params={
+        "type": "sparkling",
+        "price_start": 10,
+        "price_end": 30,
+    })
+
+    assert response.status_code == 200
+    facets = json.loads(response.text)
+    assert facets == wine_facets(df_wines, {
+        "type": "sparkling",
+        "price": (10, 30),
+    })
+    assert facets["type"]["red"] > 0
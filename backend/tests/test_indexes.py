@@ -0,0 +1,65 @@
+import os
+import sys
+import pandas as pd
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.indexes import invalidate_indexes, sort_index
+from app.mymodules.utils import (
+    top_wines_by_rating,
+    wines_by_recent_year,
+    wines_by_least_recent_year
+)
+
+
+df_wines = datasets.current
+
+
+def test_top_wines_match_full_sort():
+    top_wines = top_wines_by_rating(df_wines, 50)
+    expected = df_wines.sort_values(by="rating", ascending=False).head(50)
+
+    assert top_wines['rating'].tolist() == expected['rating'].tolist()
+
+
+def test_year_rankings_skip_non_vintage():
+    most_recent = wines_by_recent_year(df_wines, 20)
+    least_recent = wines_by_least_recent_year(df_wines, 20)
+    vintage = df_wines.dropna(subset=['year'])
+
+    assert most_recent['year'].notna().all()
+    assert least_recent['year'].notna().all()
+    assert most_recent['year'].iloc[0] == vintage['year'].max()
+    assert least_recent['year'].iloc[0] == vintage['year'].min()
+    assert most_recent['year'].is_monotonic_decreasing
+    assert least_recent['year'].is_monotonic_increasing
+
+
+def test_sort_index_is_rebuilt_for_new_dataset():
+    assert sort_index(df_wines) is sort_index(df_wines)
+
+    df_small = pd.DataFrame({
+        "name": ["a", "b", "c"],
+        "rating": [3.0, 4.5, 4.0],
+        "year": pd.array([2010, None, 2001], dtype="Int64"),
+    })
+
+    assert top_wines_by_rating(df_small, 2)['name'].tolist() == ["b", "c"]
+    assert wines_by_recent_year(df_small)['name'].tolist() == ["a", "c"]
+    assert wines_by_least_recent_year(df_small)['name'].tolist() == ["c", "a"]
+
+
+def test_in_place_update_needs_invalidation():
+    df_small = pd.DataFrame({
+        "name": ["a", "b", "c"],
+        "rating": [3.0, 4.5, 4.0],
+        "year": pd.array([2010, 2012, 2001], dtype="Int64"),
+    })
+    assert top_wines_by_rating(df_small, 1)['name'].tolist() == ["b"]
+
+    df_small['rating'] = [5.0, 1.0, 1.0]
+    assert top_wines_by_rating(df_small, 1)['name'].tolist() == ["b"]
+
+    invalidate_indexes(df_small)
+    assert top_wines_by_rating(df_small, 1)['name'].tolist() == ["a"]
@@ -113,3 +113,29 @@ def test_get_least_recent_wines():
 
     for wine in least_recent_wines:
         assert set(wine.keys()) == expected_keys
+
+
+def test_get_rankings():
+    response = client.get("/rankings", params={
+        "lists": "top,recent,oldest",
+        "limit": 6
+    })
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    rankings = json.loads(response.text)
+    assert list(rankings) == ["top", "recent", "oldest"]
+    assert rankings["top"] == client.get("/top-wines?limit=6").json()
+    assert rankings["recent"] == client.get(
+        "/most-recent-wines?limit=6"
+    ).json()
+    assert rankings["oldest"] == client.get(
+        "/least-recent-wines?limit=6"
+    ).json()
+
+
+def test_get_rankings_unknown_list():
+    response = client.get("/rankings", params={"lists": "top,cheapest"})
+
+    assert response.status_code == 422
@@ -0,0 +1,156 @@
+import os
+import shutil
+import sys
+import time
+from fastapi.testclient import TestClient
+import pytest
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+import app.main as main
+from app.main import app
+from app.mymodules.dataset import DATASETS_DIR, load_wines
+from app.mymodules.manager import DatasetManager
+from app.mymodules.utils import build_indexes
+
+
+client = TestClient(app)
+
+BEST_ROSE = "Test Rose 2020,Italy,Toscana,Test Winery,5.0,100,9.5,2020\n"
+
+
+def copy_datasets(tmp_path):
+    datasets_dir = tmp_path / "datasets"
+    shutil.copytree(DATASETS_DIR, datasets_dir, ignore=shutil.ignore_patterns(
+        ".snapshot"
+    ))
+    return datasets_dir
+
+
+def make_manager(datasets_dir, **kwargs):
+    return DatasetManager(
+        str(datasets_dir),
+        loader=lambda path: load_wines(path, snapshot_dir=None),
+        prepare=build_indexes,
+        **kwargs
+    )
+
+
+def add_rose(datasets_dir):
+    with open(datasets_dir / "Rose.csv", "a") as f:
+        f.write(BEST_ROSE)
+
+
+def test_reload_swaps_catalog(tmp_path):
+    datasets_dir = copy_datasets(tmp_path)
+    swapped = []
+    manager = make_manager(datasets_dir, listeners=[swapped.append])
+    old = manager.current
+    old_rows = len(old)
+
+    assert manager.reload() is False
+    assert manager.current is old
+
+    add_rose(datasets_dir)
+
+    assert manager.reload() is True
+    assert manager.version != old.attrs['version']
+    assert len(manager.current) == old_rows + 1
+    assert swapped == [old, manager.current]
+    # Requests still holding the previous catalog keep it unchanged.
+    assert len(old) == old_rows
+
+
+def test_failed_reload_keeps_catalog(tmp_path):
+    datasets_dir = copy_datasets(tmp_path)
+    manager = make_manager(datasets_dir)
+    old = manager.current
+
+    def failing_loader(path):
+        raise OSError("disk error")
+
+    manager.loader = failing_loader
+    with pytest.raises(OSError):
+        manager.reload(force=True)
+
+    assert manager.current is old
+
+
+def test_watcher_reloads_changed_files(tmp_path):
+    datasets_dir = copy_datasets(tmp_path)
+    manager = make_manager(datasets_dir)
+    old_version = manager.version
+
+    manager.watch(interval=0.05)
+    try:
+        add_rose(datasets_dir)
+        deadline = time.monotonic() + 30
+        while manager.version == old_version:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        manager.stop()
+
+    assert "Test Rose 2020" in manager.current["name"].tolist()
+
+
+def test_admin_reload_serves_new_catalog(tmp_path, monkeypatch):
+    datasets_dir = copy_datasets(tmp_path)
+    manager = make_manager(
+        datasets_dir,
+        listeners=[lambda df_wines: main.response_cache.clear()]
+    )
+    monkeypatch.setattr(main, "datasets", manager)
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    admin = {"X-Admin-Token": "secret"}
+
+    before = client.get("/top-wines", params={"limit": 1})
+    version = client.get("/admin/version", headers=admin).json()
+
+    assert version["version"] == manager.version
+    assert version["rows"] == len(manager.current)
+
+    add_rose(datasets_dir)
+    response = client.post("/admin/reload", headers=admin)
+    after = client.get("/top-wines", params={"limit": 1})
+
+    assert response.status_code == 200
+    assert response.json()["reloaded"] is True
+    assert response.json()["version"] != version["version"]
+    assert before.json()[0]["name"] != "Test Rose 2020"
+    assert after.json()[0]["name"] == "Test Rose 2020"
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+
+    assert client.get("/admin/version").status_code == 404
+    assert client.post("/admin/reload?force=true").status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+
+    assert client.get("/admin/version").status_code == 403
+    assert client.get(
+        "/admin/version",
+        headers={"X-Admin-Token": "wrong"}
+    ).status_code == 403
+    assert client.get(
+        "/admin/version",
+        headers={"X-Admin-Token": "secret"}
+    ).status_code == 200
+
+
+def test_admin_reload_failure_hides_the_error(monkeypatch):
+    def fail(force):
+        raise OSError("/secret/path/Red.csv is unreadable")
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(main.datasets, "reload", fail)
+    response = client.post(
+        "/admin/reload",
+        headers={"X-Admin-Token": "secret"}
+    )
+
+    assert response.status_code == 500
+    assert "/secret/path" not in response.text
@@ -0,0 +1,125 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.metrics import Histogram, server_timing, span
+from app.mymodules.profiler import ProfilerMiddleware
+from app.mymodules.query import query_cache
+
+
+client = TestClient(app)
+
+
+def test_histogram_exposition():
+    histogram = Histogram('test_seconds', 'Test.', ('path',), (0.1, 1.0))
+    histogram.observe(0.05, '/a')
+    histogram.observe(0.1, '/a')
+    histogram.observe(2.0, '/a')
+
+    assert histogram.expose() == [
+        '# HELP test_seconds Test.',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{path="/a",le="0.1"} 2',
+        'test_seconds_bucket{path="/a",le="1.0"} 2',
+        'test_seconds_bucket{path="/a",le="+Inf"} 3',
+        'test_seconds_sum{path="/a"} 2.15',
+        'test_seconds_count{path="/a"} 3',
+    ]
+
+
+def test_server_timing_sums_spans():
+    assert server_timing(
+        [('match_text', 0.001), ('encode', 0.002), ('match_text', 0.003)],
+        0.01
+    ) == 'match_text;dur=4.000, encode;dur=2.000, total;dur=10.000'
+
+
+def test_search_reports_spans():
+    # Evaluate the filters rather than reuse a cached result
+    query_cache(datasets.current).clear()
+    response = client.get("/advanced-search", params={
+        "name": "rosso",
+        "price_start": 5,
+        "price_end": 50,
+        "limit": 3,
+    }, headers={"Cache-Control": "no-cache"})
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    for name in ("filter_wines", "query_positions", "range_positions",
+                 "match_text", "encode_records", "total"):
+        assert f"{name};dur=" in timing
+
+
+def test_metrics_endpoint():
+    client.get("/top-wines")
+    with span("test_span"):
+        pass
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'wines_request_duration_seconds_count{method="GET",'
+        'path="/top-wines",status="200"}'
+    ) in text
+    assert 'wines_span_duration_seconds_count{span="test_span"} ' in text
+    assert "# TYPE wines_response_cache_hits_total counter" in text
+    assert "wines_catalog_rows " in text
+
+
+def test_unknown_paths_share_one_series():
+    client.get("/no-such-page")
+
+    assert 'path="other",status="404"' in client.get("/metrics").text
+    assert "no-such-page" not in client.get("/metrics").text
+
+
+def test_profile_request():
+    profiled = TestClient(ProfilerMiddleware(app, interval=0.0005))
+    # Warm the cache: the profiled request must not be served from it.
+    params = {"type": "red", "limit": 5000}
+    profiled.get("/advanced-search", params=params)
+
+    response = profiled.get(
+        "/advanced-search",
+        params=params,
+        headers={"X-Profile": "1"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-status"] == "200"
+    lines = response.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("encode_records" in line for line in lines)
+
+
+def test_profile_leaves_out_other_threads():
+    profiled = TestClient(ProfilerMiddleware(app, interval=0.0005))
+    datasets.watch(0.001)
+    try:
+        response = profiled.get(
+            "/advanced-search",
+            params={"type": "red", "limit": 5000},
+            headers={"X-Profile": "1"}
+        )
+    finally:
+        datasets.stop()
+
+    assert "encode_records" in response.text
+    assert "_watch" not in response.text
+
+
+def test_requests_without_profile_header_are_untouched():
+    profiled = TestClient(ProfilerMiddleware(app))
+
+    response = profiled.get("/types")
+
+    assert response.json() == client.get("/types").json()
@@ -0,0 +1,118 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import json
+import pandas as pd
+import pytest
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.pagination import page_positions
+from app.mymodules.query import query_positions
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def all_pages(filters, limit, sort=None, order='desc'):
+    positions = []
+    cursor = None
+    while True:
+        page, cursor = page_positions(
+            df_wines, filters, limit, sort, order, cursor
+        )
+        assert len(page) <= limit
+        positions.extend(page.tolist())
+        if cursor is None:
+            return positions
+
+
+def sorted_positions(filters, sort, order):
+    positions = query_positions(df_wines, filters)
+    frame = pd.DataFrame({
+        'value': pd.to_numeric(
+            df_wines[sort].iloc[positions],
+            errors='coerce'
+        ).astype(float).to_numpy(),
+        'position': positions,
+    })
+    return frame.sort_values(
+        ['value', 'position'],
+        ascending=[order == 'asc', True],
+        na_position='last'
+    )['position'].tolist()
+
+
+@pytest.mark.parametrize('sort', ['rating', 'price', 'year'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_pages_follow_sort_order(sort, order):
+    filters = {"type": "rose", "price": (5, 40)}
+
+    assert all_pages(filters, 37, sort, order) == (
+        sorted_positions(filters, sort, order)
+    )
+
+
+def test_pages_without_filters():
+    assert all_pages({}, 1000, 'numberofratings', 'desc') == (
+        sorted_positions({}, 'numberofratings', 'desc')
+    )
+
+
+def test_pages_in_dataset_order():
+    filters = {"name": "reserva", "year": (2010, 2020)}
+
+    assert all_pages(filters, 9) == query_positions(df_wines, filters).tolist()
+
+
+def test_advanced_search_cursor():
+    params = {"type": "sparkling", "sort": "price", "order": "asc"}
+    first = client.get("/advanced-search", params={**params, "limit": 5})
+    both = client.get("/advanced-search", params={**params, "limit": 10})
+
+    assert first.status_code == 200
+    cursor = first.headers["x-next-cursor"]
+
+    second = client.get("/advanced-search", params={
+        **params,
+        "limit": 5,
+        "cursor": cursor,
+    })
+
+    assert second.status_code == 200
+    assert json.loads(first.text) + json.loads(second.text) == (
+        json.loads(both.text)
+    )
+
+
+def test_advanced_search_last_page_has_no_cursor():
+    response = client.get("/advanced-search", params={
+        "name": "xyzzy",
+        "sort": "rating",
+    })
+
+    assert response.status_code == 200
+    assert json.loads(response.text) == []
+    assert "x-next-cursor" not in response.headers
+
+
+def test_advanced_search_invalid_cursor():
+    response = client.get("/advanced-search", params={
+        "sort": "rating",
+        "cursor": "not-a-cursor",
+    })
+
+    assert response.status_code == 400
+
+
+def test_advanced_search_cursor_of_another_sort():
+    first = client.get("/advanced-search", params={"sort": "rating"})
+
+    response = client.get("/advanced-search", params={
+        "sort": "price",
+        "cursor": first.headers["x-next-cursor"],
+    })
+
+    assert response.status_code == 400
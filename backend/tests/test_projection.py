@@ -0,0 +1,149 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.pagination import page_positions
+from app.mymodules.projection import build_distinct_rows, parse_fields
+from app.mymodules.utils import filter_wines, top_wines_by_rating
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+# First occurrence of every (name, winery, year), computed with pandas
+DUPLICATES = pd.DataFrame({
+    "name": df_wines["name"],
+    "winery": df_wines["winery"].astype(object),
+    "year": df_wines["year"].astype("float64"),
+}).duplicated().to_numpy()
+
+
+def test_parse_fields():
+    assert parse_fields(df_wines, None) is None
+    assert parse_fields(df_wines, "price, name,price") == ["price", "name"]
+    assert parse_fields(df_wines, ",") is None
+    with pytest.raises(ValueError):
+        parse_fields(df_wines, "name,vintage")
+
+
+def test_distinct_rows_match_pandas():
+    distinct = build_distinct_rows(df_wines)
+
+    assert DUPLICATES.any()
+    assert (distinct["mask"] == ~DUPLICATES).all()
+    assert distinct["positions"].tolist() == \
+        np.flatnonzero(~DUPLICATES).tolist()
+
+
+def test_distinct_rows_group_missing_values():
+    df = pd.DataFrame({
+        "name": ["Rosé N.V.", "Rosé N.V.", "Rosé N.V.", "Rosé 2019"],
+        "winery": pd.Categorical(["A", "A", "B", "A"]),
+        "year": pd.array([None, None, None, 2019], dtype="Int64"),
+    })
+
+    assert build_distinct_rows(df)["positions"].tolist() == [0, 2, 3]
+
+
+def test_filter_wines_distinct():
+    filters = {"type": "red", "country": "United States"}
+    expected = df_wines[~DUPLICATES & (df_wines["type"] == "red") &
+                        (df_wines["country"] == "United States")]
+
+    assert filter_wines(df_wines, filters, distinct=True).equals(expected)
+    assert len(expected) < len(filter_wines(df_wines, filters))
+
+    cheap = filter_wines(df_wines, {"price": (10, 20)}, 3000, True)
+    assert cheap.equals(df_wines[
+        ~DUPLICATES & df_wines["price"].between(10, 20).to_numpy()
+    ].head(3000))
+
+
+def test_rankings_distinct():
+    top = top_wines_by_rating(df_wines, len(df_wines), distinct=True)
+
+    assert len(top) == (~DUPLICATES).sum()
+    assert not top.duplicated(["name", "winery", "year"]).any()
+
+
+def test_page_positions_distinct():
+    filters = {"country": "Austria"}
+    seen = []
+    cursor = None
+    while True:
+        positions, cursor = page_positions(
+            df_wines, filters, 500, "price", "asc", cursor, distinct=True
+        )
+        seen += positions.tolist()
+        if cursor is None:
+            break
+
+    expected = np.flatnonzero(
+        ~DUPLICATES & (df_wines["country"] == "Austria").to_numpy()
+    )
+    assert sorted(seen) == expected.tolist()
+
+
+def test_fields_projection():
+    response = client.get("/advanced-search", params={
+        "country": "Italy",
+        "limit": 5,
+        "fields": "name,price",
+    })
+
+    assert response.status_code == 200
+    wines = response.json()
+    expected = filter_wines(df_wines, {"country": "Italy"}, 5)
+    assert wines == expected[["name", "price"]].to_dict(orient="records")
+
+    rankings = client.get("/rankings", params={"fields": "name"}).json()
+    assert all(list(wine) == ["name"]
+               for wines in rankings.values() for wine in wines)
+
+    top = client.get("/top-wines", params={"fields": "rating,name"}).json()
+    assert list(top[0]) == ["rating", "name"]
+
+
+def test_fields_projection_export():
+    response = client.get("/export", params={
+        "name": "reserva",
+        "format": "csv",
+        "fields": "name,year",
+    })
+    wines = pd.read_csv(io.StringIO(response.text))
+    assert list(wines.columns) == ["name", "year"]
+
+    response = client.get("/export", params={
+        "name": "reserva",
+        "fields": "price",
+    })
+    assert all(list(json.loads(line)) == ["price"]
+               for line in response.text.splitlines())
+
+
+def test_unknown_field():
+    response = client.get("/advanced-search", params={"fields": "vintage"})
+
+    assert response.status_code == 422
+    assert "vintage" in response.json()["detail"]
+
+
+def test_distinct_endpoint():
+    params = {"country": "United States", "limit": 10000}
+    every = client.get("/advanced-search", params=params).json()
+    distinct = client.get(
+        "/advanced-search",
+        params={**params, "distinct": "true"}
+    ).json()
+
+    keys = [(wine["name"], wine["winery"], wine["year"]) for wine in distinct]
+    assert len(keys) == len(set(keys))
+    assert len(distinct) < len(every)
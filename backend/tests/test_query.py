@@ -0,0 +1,104 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.utils import filter_wines
+from benchmarks.baseline import baseline_filter_wines
+
+
+df_wines = datasets.current
+
+
+def test_filter_wines_matches_baseline():
+    filters = {
+        "name": "rosso",
+        "type": "red",
+        "country": "italy",
+        "region": None,
+        "winery": None,
+        "rating": (3.5, 4.5),
+        "numberofratings": None,
+        "price": (5, 60),
+        "year": (2010, 2018),
+    }
+
+    result = filter_wines(df_wines, filters)
+    expected = baseline_filter_wines(df_wines, filters)
+
+    assert len(result) > 0
+    assert result.equals(expected)
+
+
+def test_range_filters_match_baseline():
+    for filters in [
+        {"price": (12.5, 12.9)},
+        {"price": (10, 20), "rating": (4.0, 4.2), "year": (2015, 2016)},
+        {"numberofratings": (100, 100), "price": (1, 10000)},
+        {"year": (2020, 2010)},
+        {"price": (0, 1000000), "year": (1500, 2023)},
+    ]:
+        result = filter_wines(df_wines, filters)
+        expected = baseline_filter_wines(df_wines, filters)
+
+        assert result.equals(expected), filters
+
+
+def test_filter_wines_applies_limit():
+    filters = {"country": "france", "year": (2000, 2020)}
+
+    result = filter_wines(df_wines, filters, 7)
+    expected = baseline_filter_wines(df_wines, filters, 7)
+
+    assert result.equals(expected)
+
+
+def test_filter_wines_empty_result():
+    filters = {"price": (1, 2), "name": "pinot"}
+
+    assert filter_wines(df_wines, filters).empty
+
+
+def test_filter_wines_negative_limit_behaves_like_head():
+    filters = {"country": "italy"}
+
+    result = filter_wines(df_wines, filters, -1)
+    expected = baseline_filter_wines(df_wines, filters, -1)
+
+    assert result.equals(expected)
+
+
+def test_text_filters_match_substring_scan():
+    for column, value in (
+        ("name", "Château"),
+        ("name", "RESERVA"),
+        ("winery", "an"),
+        ("region", "toscana"),
+        ("region", "x"),
+    ):
+        result = filter_wines(df_wines, {column: value})
+        expected = baseline_filter_wines(df_wines, {column: value})
+
+        assert result.equals(expected)
+
+
+def test_text_filters_are_literal():
+    dots = filter_wines(df_wines, {"name": "."})
+
+    assert len(dots) > 0
+    assert len(dots) == df_wines['name'].str.count(r"\.").gt(0).sum()
+    assert filter_wines(df_wines, {"name": "(unclosed"}).empty
+
+
+def test_text_filters_ignore_case_like_contains():
+    for winery in ["ß", "SS", "us", "s"]:
+        result = filter_wines(df_wines, {"winery": winery})
+        expected = df_wines[
+            df_wines['winery'].str.contains(winery, case=False, na=False)
+        ]
+
+        assert result['winery'].tolist() == expected['winery'].tolist()
+    assert not filter_wines(df_wines, {"winery": "ß"}).equals(
+        filter_wines(df_wines, {"winery": "SS"})
+    )
@@ -0,0 +1,156 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import numpy as np
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.query import compile_filters, evaluate_predicates
+from app.mymodules.query import query_cache, query_positions
+from app.mymodules.result_cache import QueryResultCache, filter_key
+from app.mymodules.result_cache import residual_predicates, subsumes
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def key(filters, distinct=False):
+    return filter_key(compile_filters(df_wines, filters), distinct)
+
+
+def uncached(filters, distinct=False):
+    return evaluate_predicates(
+        df_wines,
+        compile_filters(df_wines, filters),
+        None,
+        0,
+        len(df_wines),
+        distinct
+    )
+
+
+def test_filter_key_ignores_order_and_case():
+    assert key({"type": "Red", "country": "italy", "year": None}) == \
+        key({"country": "ITALY", "type": "red"})
+    assert key({"type": "red"}) != key({"type": "red"}, distinct=True)
+    assert key({"price": (10, 20)}) != key({"price": (10, 30)})
+
+
+def test_subsumes():
+    broad = key({"type": "red", "price": (10, 50)})
+
+    assert subsumes(broad, broad)
+    assert subsumes(broad, key({"type": "red", "price": (20, 30)}))
+    assert subsumes(broad, key({
+        "type": "red", "price": (10, 50), "country": "italy"
+    }))
+    assert subsumes(key({"name": "pinot"}), key({"name": "Pinot Noir"}))
+    assert subsumes(key({"price": (None, 50)}), key({"price": (5, 20)}))
+    assert subsumes(broad, key({"type": "red", "price": (10, 50)}, True))
+
+    assert not subsumes(broad, key({"type": "red", "price": (5, 30)}))
+    assert not subsumes(broad, key({"type": "red", "price": (20, None)}))
+    assert not subsumes(broad, key({"type": "red"}))
+    assert not subsumes(key({"name": "pinot noir"}), key({"name": "pinot"}))
+    assert not subsumes(key({"type": "red"}, True), key({"type": "red"}))
+
+
+def test_residual_predicates():
+    predicates = compile_filters(df_wines, {
+        "type": "RED", "price": (10, 50), "country": "italy"
+    })
+
+    assert residual_predicates(predicates, key({"type": "red"})) == [
+        ("range", "price", (10, 50)),
+        ("text", "country", "italy"),
+    ]
+
+
+def test_refinements_reuse_the_broader_result():
+    steps = [
+        {"type": "red"},
+        {"type": "red", "country": "Italy"},
+        {"type": "red", "country": "Italy", "price": (10, 60)},
+        {"type": "red", "country": "Italy", "price": (20, 40)},
+        {"type": "red", "country": "Italy", "price": (20, 40),
+         "name": "rosso"},
+    ]
+    cache = query_cache(df_wines)
+    cache.clear()
+    before = cache.stats()
+
+    for filters in steps:
+        assert query_positions(df_wines, filters).tolist() == \
+            uncached(filters).tolist(), filters
+    stats = cache.stats()
+
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["refinements"] - before["refinements"] == len(steps) - 1
+    assert query_positions(df_wines, steps[-1]).tolist() == \
+        uncached(steps[-1]).tolist()
+    assert cache.stats()["hits"] == stats["hits"] + 1
+
+
+def test_refinements_with_distinct_and_limit():
+    filters = {"country": "United States", "year": (2010, 2015)}
+    query_positions(df_wines, {"country": "United States"})
+
+    positions = query_positions(df_wines, filters, distinct=True)
+    assert positions.tolist() == uncached(filters, True).tolist()
+    assert query_positions(df_wines, filters, 5, distinct=True).tolist() == \
+        positions[:5].tolist()
+    assert query_positions(df_wines, filters, -3).tolist() == \
+        uncached(filters)[:-3].tolist()
+
+
+def test_truncated_scans_are_not_cached():
+    cache = query_cache(df_wines)
+    filters = {"name": "reserva", "region": "rioja"}
+
+    limited = query_positions(df_wines, filters, 2)
+
+    assert cache.get(key(filters)) is None
+    assert limited.tolist() == uncached(filters)[:2].tolist()
+    assert query_positions(df_wines, filters).tolist() == \
+        uncached(filters).tolist()
+    assert cache.get(key(filters)) is not None
+
+
+def test_cache_stores_the_smaller_encoding():
+    cache = QueryResultCache(n_rows=10000)
+    sparse = np.array([3, 70, 9000])
+    dense = np.arange(0, 10000, 3)
+
+    cache.put(key({"type": "red"}), sparse)
+    cache.put(key({"type": "white"}), dense)
+
+    assert cache.get(key({"type": "red"})).tolist() == sparse.tolist()
+    assert cache.get(key({"type": "white"})).tolist() == dense.tolist()
+    assert cache.stats()["bytes"] == sparse.size * 4 + 10000 // 8
+
+
+def test_cache_evicts_least_recently_used_past_max_bytes():
+    cache = QueryResultCache(n_rows=10000, max_bytes=100)
+    a, b, c = (key({"price": (0, high)}) for high in (10, 20, 30))
+    cache.put(a, np.arange(10))
+    cache.put(b, np.arange(10))
+    assert cache.get(a) is not None
+
+    cache.put(c, np.arange(10))
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 80
+
+
+def test_cache_stats_endpoints():
+    stats = client.get("/cache-stats").json()["query_cache"]
+
+    assert set(stats) == {
+        "hits", "refinements", "misses", "evictions", "entries", "bytes"
+    }
+    assert "wines_query_cache_refinements_total" in \
+        client.get("/metrics").text
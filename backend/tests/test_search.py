@@ -0,0 +1,141 @@
+import math
+import os
+import sys
+from fastapi.testclient import TestClient
+import numpy as np
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.query import search_positions
+from app.mymodules.search_index import SearchIndex, edit_distance
+from app.mymodules.search_index import fold, tokenize, top_k
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def test_fold_and_tokenize():
+    assert fold("Château Lafôret") == "chateau laforet"
+    assert tokenize("Côtes-du-Rhône (Réserve) 2015") == \
+        ["cotes", "du", "rhone", "reserve", "2015"]
+    assert tokenize("  ") == []
+
+
+def test_edit_distance():
+    assert edit_distance("margaux", "margaux", 1) == 0
+    assert edit_distance("margaux", "margeaux", 1) == 1
+    assert edit_distance("margaux", "magraux", 1) == 1
+    assert edit_distance("margaux", "margot", 1) == 2
+    assert edit_distance("barolo", "brunello", 2) == 3
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    rows = np.arange(0, 3000, 3)
+    scores = rng.integers(0, 20, size=len(rows)).astype(float)
+    expected = rows[np.lexsort((rows, -scores))]
+
+    for k in (0, 1, 7, 100, len(rows), None):
+        assert top_k(rows, scores, k).tolist() == expected[:k].tolist()
+
+
+def test_search_index_scores_are_bm25():
+    texts = ["rosso di montalcino", "rosso", "brunello di montalcino",
+             "rosso rosso piceno"]
+    index = SearchIndex([(texts, np.arange(4), 1.0)], 4)
+
+    def bm25(term, row, k1=1.2, b=0.75):
+        documents = [text.split() for text in texts]
+        frequency = sum(term in document for document in documents)
+        idf = math.log(1 + (4 - frequency + 0.5) / (frequency + 0.5))
+        average = sum(map(len, documents)) / 4
+        tf = documents[row].count(term)
+        return idf * tf * (k1 + 1) / (
+            tf + k1 * (1 - b + b * len(documents[row]) / average)
+        )
+
+    rows, scores = index.search("Rosso Montalcino")
+    assert rows.tolist() == [0]
+    assert np.isclose(scores[0], bm25("rosso", 0) + bm25("montalcino", 0))
+
+    rows, scores = index.search("rosso")
+    assert rows.tolist() == [0, 1, 3]
+    assert np.allclose(scores, [bm25("rosso", row) for row in (0, 1, 3)])
+    # Shorter names weigh more: 'rosso' beats 'rosso rosso piceno'
+    assert top_k(rows, scores).tolist() == [1, 3, 0]
+
+
+def test_search_index_categorical_field():
+    index = SearchIndex([
+        (["Pinot Noir", "Pinot Grigio"], np.array([0, 1, -1, 0]), 1.0),
+        (["Alsace", "Friuli"], np.array([0, 1, 1, -1]), 0.5),
+    ], 4)
+
+    assert index.search("pinot")[0].tolist() == [0, 1, 3]
+    assert index.search("friuli")[0].tolist() == [1, 2]
+    assert index.search("pinot friuli")[0].tolist() == [1]
+    assert index.search("grigo")[0].tolist() == [1]
+    assert index.search("pinot xyz")[0].tolist() == []
+    assert index.search("-") is None
+
+
+def test_search_folds_accents_and_tolerates_typos():
+    margaux = df_wines.iloc[search_positions(
+        df_wines, "chateau margaux", {}, 10
+    )]
+    assert len(margaux) == 10
+    assert margaux["name"].str.contains("Château Margaux").iloc[0]
+
+    typo = search_positions(df_wines, "CHATEAU MARGEAUX", {}, 10)
+    assert df_wines.iloc[typo].equals(margaux)
+
+
+def test_search_ranks_exact_words_first():
+    wines = df_wines.iloc[search_positions(df_wines, "pinot noir", {}, 20)]
+
+    assert wines["name"].str.contains("Pinot Noir").all()
+
+
+def test_search_with_filters():
+    filters = {"country": "Italy", "price": (10, 40), "year": None}
+    positions = search_positions(df_wines, "rosso", filters)
+    every = search_positions(df_wines, "rosso", {})
+
+    allowed = set(np.flatnonzero(
+        (df_wines["country"] == "Italy").to_numpy() &
+        df_wines["price"].between(10, 40).to_numpy()
+    ).tolist())
+    assert 0 < len(positions) < len(every)
+    assert positions.tolist() == [p for p in every if p in allowed]
+    assert search_positions(df_wines, "rosso", filters, 5).tolist() == \
+        positions[:5].tolist()
+
+
+def test_search_without_words_filters_in_dataset_order():
+    positions = search_positions(df_wines, "  ", {"country": "Chile"}, 5)
+
+    assert positions.tolist() == np.flatnonzero(
+        (df_wines["country"] == "Chile").to_numpy()
+    )[:5].tolist()
+
+
+def test_advanced_search_q():
+    response = client.get("/advanced-search", params={
+        "q": "brunelo montalcino",
+        "type": "red",
+        "limit": 5,
+        "fields": "name",
+    })
+
+    assert response.status_code == 200
+    wines = response.json()
+    assert len(wines) == 5
+    assert all("Brunello di Montalcino" in wine["name"] for wine in wines)
+
+    response = client.get("/advanced-search", params={
+        "q": "barolo",
+        "sort": "price",
+    })
+    assert response.status_code == 400
@@ -0,0 +1,41 @@
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import datasets
+from app.mymodules.serialization import encode_records
+
+
+df_wines = datasets.current
+
+
+def test_encode_records_matches_json_response():
+    wines = df_wines.dropna(subset=['year']).iloc[::97]
+
+    expected = JSONResponse(content=wines.to_dict(orient='records')).body
+
+    assert encode_records(wines) == expected
+
+
+def test_encode_records_handles_missing_values():
+    df = pd.DataFrame({
+        "name": ['Brut "Réserve" N.V.', None],
+        "rating": [4.5, np.nan],
+        "year": pd.array([None, 2015], dtype="Int64"),
+        "type": pd.Categorical(["sparkling", None]),
+    })
+
+    assert json.loads(encode_records(df)) == [
+        {"name": 'Brut "Réserve" N.V.', "rating": 4.5, "year": None,
+         "type": "sparkling"},
+        {"name": None, "rating": None, "year": 2015, "type": None},
+    ]
+
+
+def test_encode_records_empty_frame():
+    assert encode_records(df_wines.iloc[:0]) == b"[]"
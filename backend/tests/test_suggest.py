@@ -0,0 +1,117 @@
+import os
+import sys
+from fastapi.testclient import TestClient
+import pandas as pd
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.main import app, datasets
+from app.mymodules.search_index import fold
+from app.mymodules.suggest import suggest
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def brute_force(prefix, column, sort):
+    """
+    Completions of a column starting with prefix at a word boundary,
+    with the suggest statistics, computed with pandas.
+    """
+    values = df_wines[column].astype(object)
+    if column == 'name':
+        values = values.str.replace(r'\s+(\d{4}|N\.V\.)$', '', regex=True)
+    stats = pd.DataFrame({
+        'text': values,
+        'rating': df_wines['rating'],
+        'numberofratings': df_wines['numberofratings'],
+    }).groupby('text').agg(
+        rating=('rating', 'max'),
+        numberofratings=('numberofratings', 'sum'),
+    )
+    words = stats.index.map(
+        lambda text: ' '.join(fold(text).replace('-', ' ').split())
+    )
+    matching = stats[[
+        text.startswith(prefix) or f' {prefix}' in text for text in words
+    ]]
+    other = 'rating' if sort == 'numberofratings' else 'numberofratings'
+    return matching.reset_index().sort_values(
+        [sort, other, 'text'],
+        ascending=[False, False, True]
+    ).set_index('text')
+
+
+def test_suggest_completes_any_word_ignoring_accents():
+    completions = suggest(df_wines, "CHATEAU marg", 20)
+    texts = [completion["text"] for completion in completions]
+
+    assert "Château Margaux" in texts
+    assert all("Marg" in text for text in texts)
+    assert suggest(df_wines, "margaux", 50) != []
+    assert any(
+        completion["text"] == "Pavillon Rouge du Château Margaux"
+        for completion in suggest(df_wines, "rouge du chat", 10)
+    )
+
+
+def test_suggest_ranks_by_number_of_ratings():
+    completions = suggest(df_wines, "pinot", 1000)
+    wineries = [c for c in completions if c["column"] == "winery"]
+    expected = brute_force("pinot", "winery", "numberofratings")
+
+    assert [c["numberofratings"] for c in completions] == sorted(
+        (c["numberofratings"] for c in completions), reverse=True
+    )
+    assert [c["text"] for c in wineries] == expected.index.tolist()
+
+
+def test_suggest_ranks_by_rating():
+    completions = suggest(df_wines, "barolo", 5, "rating")
+    expected = brute_force("barolo", "name", "rating")
+
+    assert len(completions) == 5
+    assert completions[0]["rating"] == max(
+        expected["rating"].max(),
+        brute_force("barolo", "region", "rating")["rating"].max()
+    )
+    assert [c["rating"] for c in completions] == sorted(
+        (c["rating"] for c in completions), reverse=True
+    )
+
+
+def test_suggest_limit_keeps_the_best():
+    every = suggest(df_wines, "c", 100000)
+    best = suggest(df_wines, "c", 7)
+
+    assert len(set(c["text"] + c["column"] for c in every)) == len(every)
+    assert best == every[:7]
+
+
+def test_suggest_without_match():
+    assert suggest(df_wines, "zzzz", 10) == []
+    assert suggest(df_wines, " - ", 10) == []
+    assert suggest(df_wines, "rioja", 0) == []
+
+
+def test_suggest_endpoint():
+    response = client.get("/suggest", params={"q": "brunello", "limit": 3})
+
+    assert response.status_code == 200
+    completions = response.json()
+    assert len(completions) == 3
+    assert completions[0] == {
+        "text": "Brunello di Montalcino",
+        "column": "region",
+        "wines": int((df_wines["region"] == "Brunello di Montalcino").sum()),
+        "rating": float(df_wines.loc[
+            df_wines["region"] == "Brunello di Montalcino", "rating"
+        ].max()),
+        "numberofratings": int(df_wines.loc[
+            df_wines["region"] == "Brunello di Montalcino", "numberofratings"
+        ].sum()),
+    }
+
+    response = client.get("/suggest", params={"q": "brunello", "sort": "x"})
+    assert response.status_code == 422
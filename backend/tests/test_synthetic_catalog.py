@@ -0,0 +1,37 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+from app.mymodules.dataset import load_wines, read_wines
+from benchmarks.synthetic_catalog import generate_catalog, write_catalog
+
+
+def test_synthetic_catalog_loads_like_the_real_one(tmp_path):
+    write_catalog(generate_catalog(30000, seed=1), str(tmp_path))
+
+    real = read_wines()
+    synthetic = load_wines(str(tmp_path), snapshot_dir=None)
+
+    assert abs(len(synthetic) - 30000) <= 4
+    assert list(synthetic.columns) == list(real.columns)
+    assert set(synthetic['country']) <= set(real['country'])
+    assert synthetic['winery'].nunique() > real['winery'].nunique()
+    assert synthetic['rating'].between(1, 5).all()
+    assert (synthetic['numberofratings'] >= 25).all()
+
+    shares = synthetic['type'].value_counts(normalize=True)
+    expected = real['type'].value_counts(normalize=True)
+    assert (shares - expected).abs().max() < 0.01
+
+    nv = synthetic['year'].isna().groupby(synthetic['type']).mean()
+    assert nv['sparkling'] > 0.5
+    assert nv['red'] < 0.05
+
+
+def test_synthetic_names_end_with_their_year():
+    red = generate_catalog(5000, seed=2)['red']
+
+    assert (
+        red['Name'].str.rsplit(' ', n=1).str[1] == red['Year']
+    ).all()
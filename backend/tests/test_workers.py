@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+import sys
+import threading
+from fastapi.testclient import TestClient
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..')
+))
+import app.main as main
+from app.main import app, datasets, query_pool
+from app.mymodules.dataset import DATASETS_DIR, load_catalog
+from app.mymodules.profiler import ProfilerMiddleware
+from app.mymodules.serialization import encode_records
+from app.mymodules.utils import filter_wines
+from app.mymodules.workers import (
+    Overloaded,
+    QueryPool,
+    facets_query,
+    search_query
+)
+
+
+df_wines = datasets.current
+client = TestClient(app)
+
+
+def blocking_query(df, started, release):
+    started.set()
+    release.wait(5)
+    return len(df)
+
+
+def test_pool_rejects_queries_past_max_pending():
+    pool = QueryPool(lambda: df_wines, DATASETS_DIR, 0, 2)
+    started = [threading.Event(), threading.Event()]
+    release = threading.Event()
+
+    async def scenario():
+        running = [
+            asyncio.ensure_future(pool.run(blocking_query, event, release))
+            for event in started
+        ]
+        while not all(event.is_set() for event in started):
+            await asyncio.sleep(0.01)
+        assert pool.pending == 2
+        try:
+            await pool.run(blocking_query, threading.Event(), release)
+        except Overloaded as e:
+            assert e.retry_after >= 1
+        else:
+            raise AssertionError("query was admitted")
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(scenario()) == [len(df_wines)] * 2
+    assert pool.pending == 0
+    assert pool.rejected == 1
+
+
+def test_threaded_queries_match_direct_calls():
+    pool = QueryPool(lambda: df_wines, DATASETS_DIR, 0, 4)
+    filters = {"country": "France", "type": "red", "year": None}
+
+    content, next_cursor = asyncio.run(pool.run(
+        search_query, filters, 5, None, None, "desc", None, None, False
+    ))
+
+    assert next_cursor is None
+    assert content == encode_records(filter_wines(df_wines, filters, 5))
+    assert asyncio.run(pool.run(facets_query, filters)) == \
+        facets_query(df_wines, filters)
+
+
+def test_worker_processes_serve_the_same_results():
+    pool = QueryPool(lambda: df_wines, DATASETS_DIR, 1, 4)
+    pool.start()
+    filters = {"country": "Italy", "year": None}
+    try:
+        result = asyncio.run(pool.run(
+            search_query, filters, 3, "barolo", None, "desc", None,
+            ["name"], False
+        ))
+        facets = asyncio.run(pool.run(facets_query, filters))
+    finally:
+        pool.stop()
+
+    assert result == search_query(
+        df_wines, filters, 3, "barolo", None, "desc", None, ["name"], False
+    )
+    assert facets == facets_query(df_wines, filters)
+
+
+def test_workers_serve_the_version_a_query_was_admitted_with(tmp_path):
+    datasets_dir = tmp_path / "datasets"
+    shutil.copytree(DATASETS_DIR, datasets_dir, ignore=shutil.ignore_patterns(
+        ".snapshot"
+    ))
+    old = load_catalog(str(datasets_dir))
+    serving = [old]
+    pool = QueryPool(lambda: serving[0], str(datasets_dir), 1, 4)
+    filters = {"name": "Test Rose 2020"}
+
+    def search():
+        return asyncio.run(pool.run(
+            search_query, filters, None, None, None, "desc", None,
+            ["name"], False
+        ))[0]
+
+    pool.start()
+    try:
+        with open(datasets_dir / "Rose.csv", "a") as f:
+            f.write("Test Rose 2020,Italy,Toscana,Test,4.9,100,9.5,2020\n")
+        new = load_catalog(str(datasets_dir))
+        pool.load(new)
+        before = search()
+        serving[0] = new
+        after = search()
+        stats = dict(pool.worker_cache_stats)
+        # A version no worker holds is served by a thread of the server.
+        serving[0] = old.copy()
+        serving[0].attrs["version"] = "unknown"
+        pid = asyncio.run(pool.run(lambda df: os.getpid()))
+    finally:
+        pool.stop()
+
+    assert before == b"[]"
+    assert b"Test Rose 2020" in after
+    assert list(stats) != [os.getpid()] and len(stats) == 1
+    assert pid == os.getpid()
+
+
+def test_overloaded_endpoint_returns_503_with_retry_after():
+    max_pending = query_pool.max_pending
+    query_pool.max_pending = 0
+    try:
+        response = client.get("/advanced-search", params={"country": "Peru"})
+        facets = client.get("/facets", params={"country": "Peru"})
+        export = client.get("/export", params={"country": "Peru"})
+        countries = client.get("/countries")
+    finally:
+        query_pool.max_pending = max_pending
+    exported = client.get("/export", params={"country": "Italy"})
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert facets.status_code == 503
+    assert export.status_code == 503
+    assert exported.status_code == 200
+    assert query_pool.pending == 0
+    assert countries.status_code == 200
+    assert "wines_query_pool_rejected_total" in client.get("/metrics").text
+
+
+def test_worker_spans_and_profiles_reach_the_server(monkeypatch):
+    monkeypatch.setattr(main, "WATCH_INTERVAL", 0)
+    monkeypatch.setattr(query_pool, "workers", 1)
+    params = {"country": "Spain", "limit": 3000}
+
+    with TestClient(ProfilerMiddleware(app)) as served:
+        response = served.get("/advanced-search", params=params)
+        metrics = served.get("/metrics").text
+        profile = served.get(
+            "/advanced-search",
+            params=params,
+            headers={"X-Profile": "1"}
+        )
+        stats = dict(query_pool.worker_cache_stats)
+
+    assert response.status_code == 200
+    assert "filter_wines;dur=" in response.headers["server-timing"]
+    assert "query;dur=" in response.headers["server-timing"]
+    assert 'span="filter_wines"' in metrics
+    assert len(stats) == 1 and os.getpid() not in stats
+    assert "encode_records" in profile.text
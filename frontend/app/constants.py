@@ -1,5 +1,8 @@
 import os
 
 BACKEND_HOST = 'http://backend/'
+# (connect, read) timeouts in seconds of every call to the backend
+BACKEND_TIMEOUT = (2, 5)
+BACKEND_POOL_SIZE = 16
 MAX_WINE_PRICE = 1000000
 SECRET_KEY = os.urandom(32)
@@ -1,63 +1,146 @@
+import threading
+from urllib.parse import urlencode
 import requests
-from constants import BACKEND_HOST
+from requests.adapters import HTTPAdapter
+from constants import BACKEND_HOST, BACKEND_POOL_SIZE, BACKEND_TIMEOUT
 
+MAX_LOCAL_COPIES = 256
 
-def fetch_top_wines(limit=10):
+_local_copies = {}
+_local_copies_lock = threading.Lock()
+
+
+def create_session():
+    """
+    Creates an HTTP session keeping a pool of keep-alive connections
+    to the backend, shared by all the fetch helpers.
+
+    :return: The session.
+    :rtype: requests.Session
+    """
+    new_session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=BACKEND_POOL_SIZE
+    )
+    new_session.mount("http://", adapter)
+    new_session.mount("https://", adapter)
+    return new_session
+
+
+session = create_session()
+
+HOMEPAGE_LISTS = {
+    "top": "top_wines",
+    "recent": "most_recent_wines",
+    "oldest": "least_recent_wines",
+}
+
+
+def fetch_json(url, timeout=BACKEND_TIMEOUT):
     """
-    Fetches the top wines from the backend.
+    Fetches JSON from the backend, revalidating the local copy of a
+    previous response instead of downloading it again.
+
+    The backend answers a request carrying the ETag of the local copy
+    (If-None-Match) with an empty 304 Not Modified while the copy is
+    current.
 
-    :param limit: Number of wines to retrieve (default is 10).
+    :param url: URL to fetch.
+    :type url: str
+    :param timeout: (connect, read) timeouts in seconds.
+    :type timeout: tuple
+    :return: Decoded JSON response.
+    :rtype: list or dict
+    :raises requests.exceptions.RequestException: If the request fails.
+    """
+    headers = {}
+    with _local_copies_lock:
+        local_copy = _local_copies.get(url)
+    if local_copy is not None:
+        headers["If-None-Match"] = local_copy[0]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and local_copy is not None:
+        return local_copy[1]
+    response.raise_for_status()
+
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        with _local_copies_lock:
+            _local_copies.pop(url, None)
+            _local_copies[url] = (etag, data)
+            if len(_local_copies) > MAX_LOCAL_COPIES:
+                del _local_copies[next(iter(_local_copies))]
+    return data
+
+
+def fetch_homepage_wines(limit=10):
+    """
+    Fetches the top, most recent and least recent wines from the
+    backend in a single call to its batched rankings endpoint.
+
+    :param limit: Number of wines to retrieve per list (default is 10).
     :type limit: int
-    :return: List of top wines.
-    :rtype: list or None
+    :return: Lists keyed by 'top_wines', 'most_recent_wines' and
+             'least_recent_wines' (None if the call failed).
+    :rtype: dict
     """
-    url = BACKEND_HOST + "top-wines?limit=" + str(limit)
+    url = (
+        BACKEND_HOST + "rankings?lists=" + ",".join(HOMEPAGE_LISTS) +
+        "&limit=" + str(limit)
+    )
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        print(response.json())
-        return response.json()
+        rankings = fetch_json(url)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching wines from backend: {e}")
-        return None
+        rankings = {}
+    return {
+        name: rankings.get(ranking)
+        for ranking, name in HOMEPAGE_LISTS.items()
+    }
 
 
-def fetch_most_recent_wines(limit=10):
+def fetch_facets(filters=None):
     """
-    Fetches the most recent wines from the backend.
+    Fetches the number of wines per country, type, region, price bucket
+    and year bucket from the backend, counted over the wines matching
+    the search filters (each facet ignoring its own filter).
 
-    :param limit: Number of wines to retrieve (default is 10).
-    :type limit: int
-    :return: List of most recent wines.
-    :rtype: list or None
+    :param filters: Query parameters of the search (default is none).
+    :type filters: dict
+    :return: 'total' and value -> count for every facet.
+    :rtype: dict or None
     """
-    url = BACKEND_HOST + "most-recent-wines?limit=" + str(limit)
+    url = BACKEND_HOST + "facets"
+    if filters:
+        url += "?" + urlencode(filters)
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return fetch_json(url)
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching wines from backend: {e}")
+        print(f"Error fetching facets from backend: {e}")
         return None
 
 
-def fetch_least_recent_wines(limit=10):
+def fetch_suggestions(text, limit=10):
     """
-    Fetches the most recent wines from the backend.
+    Fetches the completions of the beginning of a wine name, winery or
+    region from the backend, most rated first.
 
-    :param limit: Number of wines to retrieve (default is 10).
+    :param text: What was typed so far.
+    :type text: str
+    :param limit: Number of completions to retrieve (default is 10).
     :type limit: int
-    :return: List of most recent wines.
-    :rtype: list or None
+    :return: Completions, with their 'text' and 'column'.
+    :rtype: list
     """
-    url = BACKEND_HOST + "least-recent-wines?limit=" + str(limit)
+    url = BACKEND_HOST + "suggest?" + urlencode({"q": text, "limit": limit})
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return fetch_json(url)
     except requests.exceptions.RequestException as e:
-        print(f"Error fetching wines from backend: {e}")
-        return None
+        print(f"Error fetching suggestions from backend: {e}")
+        return []
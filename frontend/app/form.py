@@ -37,7 +37,11 @@ class SearchWinesForm(FlaskForm):
     
     name = StringField(
         label="Wine name...",
-        render_kw={"placeholder": "Wine name..."}
+        render_kw={
+            "placeholder": "Wine name...",
+            "list": "name-suggestions",
+            "autocomplete": "off",
+        }
     )
 
     type = SelectField(choices=[DEFAULT_TYPE_CHOICE] + TYPES)
@@ -78,3 +82,23 @@ class SearchWinesForm(FlaskForm):
     }, validators=[validators.Optional()])
 
     submit = SubmitField('Search Wines!')
+
+    def set_facet_choices(self, catalog, facets=None):
+        """
+        Offers the types and countries of the catalog, labelled with the
+        number of wines each would return when facet counts are given.
+
+        :param catalog: Facet counts of the whole catalog (from /facets).
+        :type catalog: dict
+        :param facets: Facet counts for the current search (optional).
+        :type facets: dict
+        """
+        for field, facet, default in (
+            (self.type, "type", DEFAULT_TYPE_CHOICE),
+            (self.country, "country", DEFAULT_COUNTRY_CHOICE),
+        ):
+            counts = facets[facet] if facets else catalog[facet]
+            field.choices = [(default, default)] + [
+                (value, f"{value} ({counts.get(value, 0)})")
+                for value in catalog[facet]
+            ]
@@ -5,16 +5,16 @@ This module defines a simple Flask application
 that serves as the frontend for the project.
 """
 
-from flask import Flask, render_template
+from flask import Flask, jsonify, render_template, request
 import requests
 from countries import DEFAULT_COUNTRY_CHOICE
-from fetch import fetch_least_recent_wines
-from fetch import fetch_most_recent_wines
-from fetch import fetch_top_wines
+from fetch import fetch_facets, fetch_homepage_wines, fetch_suggestions
+from fetch import session
 from wine_types import DEFAULT_TYPE_CHOICE
 from form import SearchWinesForm
 import datetime
-from constants import BACKEND_HOST, MAX_WINE_PRICE, SECRET_KEY
+from constants import BACKEND_HOST, BACKEND_TIMEOUT, MAX_WINE_PRICE
+from constants import SECRET_KEY
 
 
 app = Flask(__name__)
@@ -30,12 +30,22 @@ def index():
         str: Rendered HTML content for the index page.
     """
 
-    return render_template(
-        'index.html',
-        top_wines=fetch_top_wines(6),
-        most_recent_wines=fetch_most_recent_wines(6),
-        least_recent_wines=fetch_least_recent_wines(6)
-    )
+    return render_template('index.html', **fetch_homepage_wines(6))
+
+
+@app.route('/suggest')
+def suggest():
+    """
+    Complete the wine name typed in the advanced search form.
+
+    Returns:
+        Response: JSON list of wine names, most rated first.
+    """
+    completions = fetch_suggestions(request.args.get('q', ''), 20)
+    return jsonify([
+        completion['text'] for completion in completions
+        if completion['column'] == 'name'
+    ][:8])
 
 
 @app.route('/advanced-search', methods=['GET', 'POST'])
@@ -49,6 +59,12 @@ def advanced_search():
 
     form = SearchWinesForm()
     error_message = None  # Initialize error message
+    total = None
+
+    # Offer the types and countries of the catalog (hardcoded fallback)
+    catalog = fetch_facets()
+    if catalog:
+        form.set_facet_choices(catalog)
 
     if form.validate_on_submit():
         type = form.type.data
@@ -61,16 +77,16 @@ def advanced_search():
         price_start = form.price_start.data
         price_end = form.price_end.data
 
-        url = f'{BACKEND_HOST}advanced-search?limit=24&'
+        filters = {}
 
         if name != "":
-            url += f'name={name}&'
+            filters['name'] = name
 
         if type != DEFAULT_TYPE_CHOICE:
-            url += f'type={type}&'
+            filters['type'] = type
 
         if country != DEFAULT_COUNTRY_CHOICE:
-            url += f'country={country}&'
+            filters['country'] = country
 
         if year_start is None:
             year_start = 1500
@@ -90,20 +106,45 @@ def advanced_search():
         if price_end is None:
             price_end = MAX_WINE_PRICE
 
-        url += f'year_start={year_start}&year_end={year_end}&'
-        url += f'rating_start={rating_start}&rating_end={rating_end}&'
-        url += f'price_start={price_start}&price_end={price_end}&'
-
-        response = requests.get(url)
+        filters.update(
+            year_start=year_start, year_end=year_end,
+            rating_start=rating_start, rating_end=rating_end,
+            price_start=price_start, price_end=price_end
+        )
+
+        # Live counts: the number of matches, and per type and country
+        facets = fetch_facets(filters)
+        if facets:
+            total = facets['total']
+            if catalog:
+                form.set_facet_choices(catalog, facets)
+
+        try:
+            response = session.get(
+                f'{BACKEND_HOST}advanced-search',
+                params=dict(filters, limit=24),
+                timeout=BACKEND_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching wines from backend: {e}")
+            response = None
 
-        if response.status_code == 200:
+        if response is None:
+            error_message = 'Error: Unable to reach the FastAPI Backend'
+        elif response.status_code == 200:
             data = response.json()
             return render_template(
                 'advanced-search.html',
                 form=form,
                 result=data,
+                total=total,
                 error_message=error_message
             )
+        elif response.status_code == 503:
+            error_message = (
+                'The wine search is busy, please retry in '
+                f'{response.headers.get("Retry-After", "a few")} seconds'
+            )
         else:
             error_message = f'Error: Unable to fetch data from FastAPI Backend'
 
@@ -111,6 +152,7 @@ def advanced_search():
         'advanced-search.html',
         form=form,
         result=None,
+        total=total,
         error_message=error_message
     )
 